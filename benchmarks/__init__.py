@@ -0,0 +1,7 @@
+"""
+Benchmarks Module
+
+Offline benchmarks for the hot paths of the OCR pipeline.
+"""
+
+__all__ = ["file_processor"]
@@ -0,0 +1,402 @@
+"""
+File processor benchmarks
+
+Measures wall time, peak traced memory and output bytes for the
+core.services.file_processor hot path (pdf_to_images, pdf_to_base64_images,
+image_to_base64, process_file, pdf_to_image_files) on the sample PDFs in
+docs/ and the page images in output/images/, across zoom factors and image
+formats.
+
+Runs fully offline. Results can be saved as a named baseline and later
+compared against, so regressions show up as numbers.
+
+Usage:
+    python -m benchmarks.file_processor
+    python -m benchmarks.file_processor --save main
+    python -m benchmarks.file_processor --compare main --fail-on-regression
+    python -m benchmarks.file_processor --filter pdf_to_image_files --zoom 1 2 3
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+import PIL
+from PIL import Image
+
+from core.services import file_processor
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_PDF_DIR = PROJECT_ROOT / "docs"
+DEFAULT_IMAGE_DIRS = [PROJECT_ROOT / "output" / "images", PROJECT_ROOT / "docs"]
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+@dataclass
+class BenchCase:
+    """One benchmarked call: `run` performs it and returns the output size in bytes."""
+
+    name: str
+    function: str
+    input: str
+    run: Callable[[], int]
+
+
+@dataclass
+class BenchResult:
+    """Measurements for one case."""
+
+    name: str
+    function: str
+    input: str
+    wall_ms: float
+    wall_min_ms: float
+    peak_mb: float
+    output_bytes: int
+    repeat: int
+
+
+def measure(case: BenchCase, repeat: int = 5, warmup: int = 1) -> BenchResult:
+    """Benchmark a case.
+
+    Wall time is the median over `repeat` untraced runs. Peak memory comes
+    from one extra run under tracemalloc, so tracing overhead does not skew
+    the timings. It covers Python-level allocations (encoded buffers, base64
+    strings, PIL image objects' Python side), not memory allocated inside
+    MuPDF or Pillow's C code.
+
+    Args:
+        case: Case to run
+        repeat: Number of timed runs
+        warmup: Number of untimed runs before timing
+
+    Returns:
+        BenchResult: Measurements for the case
+    """
+    for _ in range(warmup):
+        case.run()
+
+    timings = []
+    output_bytes = 0
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        output_bytes = case.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=case.name,
+        function=case.function,
+        input=case.input,
+        wall_ms=round(statistics.median(timings), 3),
+        wall_min_ms=round(min(timings), 3),
+        peak_mb=round(peak / (1024 * 1024), 3),
+        output_bytes=output_bytes,
+        repeat=len(timings)
+    )
+
+
+def find_inputs(directories: List[Path], extensions: set) -> List[Path]:
+    """List files with the given extensions in the directories, sorted by name."""
+    found = []
+    for directory in directories:
+        if directory.is_dir():
+            found.extend(sorted(p for p in directory.iterdir() if p.suffix.lower() in extensions))
+    return found
+
+
+def build_cases(
+    pdfs: List[Path],
+    images: List[Path],
+    zooms: List[float],
+    formats: List[str],
+    work_dir: str
+) -> List[BenchCase]:
+    """Build the benchmark matrix.
+
+    Args:
+        pdfs: PDF inputs
+        images: Image inputs
+        zooms: Zoom factors for the functions that take one
+        formats: Image formats for the functions that take one
+        work_dir: Scratch directory for files written by the benchmarks
+
+    Returns:
+        List[BenchCase]: Cases in a stable order
+    """
+    cases: List[BenchCase] = []
+
+    for pdf in pdfs:
+        path = str(pdf)
+
+        def run_pdf_to_images(path=path) -> int:
+            pages = file_processor.pdf_to_images(path)
+            return sum(img.width * img.height * len(img.getbands()) for img in pages)
+
+        cases.append(BenchCase(f"pdf_to_images:{pdf.name}", "pdf_to_images", pdf.name, run_pdf_to_images))
+
+    for image_path in images:
+        with Image.open(image_path) as img:
+            image = img.copy()
+        for fmt in formats:
+            def run_image_to_base64(image=image, fmt=fmt) -> int:
+                return len(file_processor.image_to_base64(image, fmt))
+
+            cases.append(BenchCase(
+                f"image_to_base64[format={fmt}]:{image_path.name}",
+                "image_to_base64",
+                image_path.name,
+                run_image_to_base64
+            ))
+
+    for input_path in pdfs + images:
+        path = str(input_path)
+
+        def run_process_file(path=path) -> int:
+            store, _ = file_processor.process_file(path)
+            with store:
+                return sum(len(b64) for b64 in store)
+
+        cases.append(BenchCase(f"process_file:{input_path.name}", "process_file", input_path.name, run_process_file))
+
+    for pdf in pdfs:
+        # None: adaptive per-page zoom
+        for zoom in [*zooms, None]:
+            # AUTO: grayscale with the smallest faithful format
+            for fmt in [*formats, "AUTO"]:
+                def run_pdf_to_base64_images(path=str(pdf), fmt=fmt, zoom=zoom) -> int:
+                    return sum(len(b64) for b64 in file_processor.pdf_to_base64_images(path, fmt, zoom))
+
+                zoom_label = "auto" if zoom is None else f"{zoom:g}"
+                cases.append(BenchCase(
+                    f"pdf_to_base64_images[zoom={zoom_label},format={fmt}]:{pdf.name}",
+                    "pdf_to_base64_images",
+                    pdf.name,
+                    run_pdf_to_base64_images
+                ))
+
+    for pdf in pdfs:
+        for zoom in zooms:
+            for fmt in formats:
+                out_dir = os.path.join(work_dir, f"{pdf.stem}_{zoom:g}_{fmt.lower()}")
+
+                def run_pdf_to_image_files(path=str(pdf), out_dir=out_dir, fmt=fmt, zoom=zoom) -> int:
+                    saved = file_processor.pdf_to_image_files(path, out_dir, image_format=fmt, zoom=zoom)
+                    return sum(os.path.getsize(f) for f in saved)
+
+                cases.append(BenchCase(
+                    f"pdf_to_image_files[zoom={zoom:g},format={fmt}]:{pdf.name}",
+                    "pdf_to_image_files",
+                    pdf.name,
+                    run_pdf_to_image_files
+                ))
+
+    return cases
+
+
+def environment_info() -> Dict[str, str]:
+    """Versions and platform the results were measured on."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "pymupdf": fitz.VersionBind,
+        "pillow": PIL.__version__,
+        "cpu_count": str(os.cpu_count())
+    }
+
+
+def save_baseline(name: str, results: List[BenchResult], directory: Path = BASELINE_DIR) -> Path:
+    """Write results to `<directory>/<name>.json`.
+
+    Returns:
+        Path: Path of the saved baseline
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.json"
+    payload = {
+        "name": name,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "results": {result.name: asdict(result) for result in results}
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def load_baseline(name: str, directory: Path = BASELINE_DIR) -> Dict:
+    """Load a baseline saved by `save_baseline`, by name or path.
+
+    Raises:
+        FileNotFoundError: If the baseline does not exist
+    """
+    path = Path(name) if name.endswith(".json") else directory / f"{name}.json"
+    if not path.exists():
+        raise FileNotFoundError(f"Baseline not found: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+COMPARED_METRICS = ("wall_ms", "peak_mb", "output_bytes")
+
+
+def compare_results(
+    baseline: Dict[str, Dict],
+    results: List[BenchResult],
+    threshold: float = 0.10
+) -> List[Dict]:
+    """Compare results with a baseline, metric by metric.
+
+    A metric regresses when it grew by more than `threshold` (a fraction)
+    relative to the baseline. Cases missing from the baseline are skipped.
+
+    Args:
+        baseline: Baseline results keyed by case name
+        results: Current results
+        threshold: Allowed relative growth before flagging a regression
+
+    Returns:
+        List[Dict]: One row per case and metric with base, current, change
+        and regression fields
+    """
+    rows = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before = base.get(metric)
+            after = getattr(result, metric)
+            if before is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            rows.append({
+                "name": result.name,
+                "metric": metric,
+                "base": before,
+                "current": after,
+                "change": change,
+                "regression": change > threshold
+            })
+    return rows
+
+
+def format_results(results: List[BenchResult]) -> str:
+    """Render results as a fixed-width table."""
+    width = max([len(r.name) for r in results] + [4])
+    lines = [f"{'case':<{width}}  {'wall ms':>10}  {'min ms':>10}  {'peak MB':>9}  {'out bytes':>12}"]
+    for r in results:
+        lines.append(
+            f"{r.name:<{width}}  {r.wall_ms:>10.2f}  {r.wall_min_ms:>10.2f}  {r.peak_mb:>9.2f}  {r.output_bytes:>12,}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    """Render a comparison as a fixed-width table, flagging regressions."""
+    if not rows:
+        return "No cases in common with the baseline."
+    width = max(len(r["name"]) for r in rows)
+    lines = [f"{'case':<{width}}  {'metric':<12}  {'base':>12}  {'current':>12}  {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['name']:<{width}}  {r['metric']:<12}  {r['base']:>12,.2f}  {r['current']:>12,.2f}  "
+            f"{r['change']:>+7.1%}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def run(
+    pdf_dir: Path = DEFAULT_PDF_DIR,
+    image_dirs: Optional[List[Path]] = None,
+    zooms: Optional[List[float]] = None,
+    formats: Optional[List[str]] = None,
+    repeat: int = 5,
+    name_filter: Optional[str] = None
+) -> List[BenchResult]:
+    """Build and measure the benchmark matrix.
+
+    Returns:
+        List[BenchResult]: One result per case
+    """
+    pdfs = find_inputs([pdf_dir], {".pdf"})
+    images = find_inputs(image_dirs if image_dirs is not None else DEFAULT_IMAGE_DIRS, IMAGE_EXTENSIONS)
+
+    with tempfile.TemporaryDirectory(prefix="wrongmath-bench-") as work_dir:
+        cases = build_cases(pdfs, images, zooms or [1.0, 2.0], formats or ["PNG", "JPEG"], work_dir)
+        if name_filter:
+            cases = [case for case in cases if name_filter in case.name]
+        return [measure(case, repeat=repeat) for case in cases]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the file_processor hot path")
+    parser.add_argument("--pdf-dir", type=Path, default=DEFAULT_PDF_DIR, help="directory with sample PDFs")
+    parser.add_argument("--image-dir", type=Path, action="append", help="directory with sample images (repeatable)")
+    parser.add_argument("--zoom", type=float, nargs="+", default=[1.0, 2.0], help="zoom factors")
+    parser.add_argument("--format", type=str.upper, nargs="+", default=["PNG", "JPEG"], help="image formats")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--filter", dest="name_filter", help="only run cases whose name contains this text")
+    parser.add_argument("--save", metavar="NAME", help="save results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="compare results with baseline NAME")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative growth flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    # Per-page INFO logs would dominate the output and the timings
+    logging.getLogger("file_processor").setLevel(logging.WARNING)
+    for handler in logging.getLogger("file_processor").handlers:
+        handler.setLevel(logging.WARNING)
+
+    results = run(
+        pdf_dir=args.pdf_dir,
+        image_dirs=args.image_dir,
+        zooms=args.zoom,
+        formats=args.format,
+        repeat=args.repeat,
+        name_filter=args.name_filter
+    )
+    print(format_results(results))
+
+    if args.save:
+        print(f"\nSaved baseline: {save_baseline(args.save, results)}")
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        rows = compare_results(baseline["results"], results, threshold=args.threshold)
+        print(f"\nComparison with baseline '{baseline['name']}' ({baseline['created_at']}):")
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            if args.fail_on_regression:
+                return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,5 +6,16 @@ Core service implementations for OCR and file processing.
 
 from .ocr_service import *
 from .file_processor import *
+from .ocr_cache import *
+from .ocr_backends import *
+from .rasterizer import *
+from .resolution import *
+from .page_encoder import *
+from .page_filter import *
+from .page_store import *
+from .segmenter import *
+from .text_layer import *
+from .jobs import *
+from .blocking import *
 
-__all__ = ["ocr_service", "file_processor"]
+__all__ = ["ocr_service", "file_processor", "ocr_cache", "ocr_backends", "rasterizer", "resolution", "page_encoder", "page_filter", "page_store", "segmenter", "text_layer", "jobs", "blocking"]
@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from core.utils.logger import setup_logger
+from core.utils.metrics import IN_FLIGHT, STAGE_SECONDS
+
+logger = setup_logger("blocking")
+
+T = TypeVar("T")
+
+# Process-wide executor for blocking work, created on first use
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def blocking_workers() -> int:
+    """Executor size from OCR_BLOCKING_WORKERS (default: 4)."""
+    return max(1, int(os.getenv("OCR_BLOCKING_WORKERS", "4")))
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Get the shared executor for blocking work called from async code.
+
+    File processing, file metadata and result writes run here instead of
+    on the event loop, so one large document does not stall every other
+    request. A dedicated, sized pool keeps that work from crowding out
+    ``asyncio.to_thread`` users (and vice versa); documents large enough
+    for the render pool are rasterized in its worker processes.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor with ``blocking_workers()`` threads
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = blocking_workers()
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blocking")
+            logger.info(f"Started blocking executor with {workers} threads")
+        return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking call in the shared executor and await its result.
+
+    Context variables are carried over to the worker thread, like
+    ``asyncio.to_thread``. The time spent waiting for a free thread is
+    recorded as the ``executor_wait`` stage, and running calls as the
+    ``blocking`` in-flight operation.
+
+    Args:
+        fn: Blocking function
+        *args: Positional arguments for `fn`
+        **kwargs: Keyword arguments for `fn`
+
+    Returns:
+        The return value of `fn`
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    submitted = time.perf_counter()
+
+    def run() -> T:
+        STAGE_SECONDS.observe(time.perf_counter() - submitted, stage="executor_wait")
+        with IN_FLIGHT.track(operation="blocking"):
+            return call()
+
+    return await asyncio.get_running_loop().run_in_executor(get_blocking_executor(), run)
+
+
+def close_blocking_executor() -> None:
+    """Shut down the shared executor, if it was started."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+        logger.info("Blocking executor shut down")
@@ -1,12 +1,23 @@
+import asyncio
 import base64
 import os
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import List, Tuple
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import fitz  # PyMuPDF
-from PIL import Image
-
+from PIL import Image, ImageOps
+
+from core.services.blocking import run_blocking
+from core.services.page_encoder import EncodedPage, EncodePolicy, PageImage, encode_page, log_savings, record_page
+from core.services.page_filter import PageFilter, page_signature
+from core.services.page_store import MemoryBudget, PageStore
+from core.services.rasterizer import RenderPool, get_render_pool
+from core.services.resolution import ZoomPolicy, default_zoom, page_zoom
+from core.services.segmenter import SegmentPolicy, segment_page
+from core.services.text_layer import MODE_OCR, PageLayout, PageText, TextLayerPolicy, analyze_page, layout_items
 from core.utils.logger import setup_logger
+from core.utils.metrics import IMAGE_INPUTS, PAGE_BLOCKS, PAGES, TEXT_LAYER_PAGES, span
 from core.utils.validators import ValidationError, FileNotFoundError
 
 logger = setup_logger("file_processor")
@@ -27,11 +38,268 @@ class ImageProcessingError(FileProcessingError):
     pass
 
 
-def pdf_to_images(file_path: str) -> List[Image.Image]:
+# Encoded formats the OCR API accepts as-is
+PASSTHROUGH_FORMATS = {"JPEG", "PNG"}
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION = 0x0112
+
+# PIL modes for pixmaps by number of components (PyMuPDF renders RGB by default)
+PIXMAP_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+
+def pixmap_to_image(pix: fitz.Pixmap) -> Image.Image:
+    """Wrap a rendered pixmap's samples in a PIL Image, without encoding.
+    
+    Args:
+        pix: Rendered PyMuPDF pixmap
+        
+    Returns:
+        Image.Image: PIL Image sharing the pixmap's dimensions and channels
+    """
+    mode = PIXMAP_MODES.get(pix.n)
+    if mode is None:
+        # CMYK or other colorspaces: let MuPDF convert to RGB first
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+        mode = "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+
+def _parallel_pool(page_count: int, parallel: Optional[bool]) -> Optional[RenderPool]:
+    """Pick the shared render pool for a document, or None to render in-process.
+    
+    Args:
+        page_count: Number of pages in the document
+        parallel: True to force the pool, False to disable it, None to decide
+            from the document size
+    """
+    if parallel is False:
+        return None
+    pool = get_render_pool()
+    if pool is None or not (parallel or pool.should_parallelize(page_count)):
+        return None
+    return pool
+
+
+def _render_page(
+    page: fitz.Page,
+    zoom: Optional[float],
+    policy: Optional[ZoomPolicy],
+    grayscale: bool = False,
+    clip: Optional[fitz.Rect] = None
+) -> fitz.Pixmap:
+    """Render one page (or the `clip` area of it) at `zoom`, or at an adaptive zoom when it is None."""
+    if zoom is None:
+        with span("choose_zoom"):
+            zoom = page_zoom(page, None, policy)
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    with span("pdf_render"):
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False, clip=clip)
+
+
+def _analyze_page(page: fitz.Page, text_layer: Optional[TextLayerPolicy]) -> PageLayout:
+    """Which parts of a page can skip OCR (none without `text_layer`)."""
+    if text_layer is None or not text_layer.enabled:
+        return PageLayout(MODE_OCR)
+    with span("text_layer"):
+        layout = analyze_page(page, text_layer)
+    TEXT_LAYER_PAGES.inc(mode=layout.mode)
+    return layout
+
+
+def _encoding_policy(format: Optional[str]) -> EncodePolicy:
+    """Encoding for an explicit format, or the configured OCR encoding for None/"AUTO"."""
+    if format is None or format.upper() == "AUTO":
+        return EncodePolicy.from_env()
+    return EncodePolicy.fixed(format)
+
+
+def _encode_page(pix: fitz.Pixmap, encoding: EncodePolicy) -> EncodedPage:
+    with span("image_encode"):
+        return encode_page(pix, encoding)
+
+
+def _keep_page(pix: fitz.Pixmap, page_filter: Optional[PageFilter]) -> bool:
+    """Whether a rendered page should be OCR'd, according to `page_filter`."""
+    if page_filter is None:
+        return True
+    if not page_filter.enabled:
+        return page_filter.check(None)
+    with span("page_signature"):
+        signature = page_signature(pix)
+    return page_filter.check(signature)
+
+
+def _segment_page(pix: fitz.Pixmap, segments: Optional[SegmentPolicy]) -> List[fitz.Pixmap]:
+    """Split a rendered page into question blocks (or keep it whole without `segments`)."""
+    if segments is None:
+        return [pix]
+    with span("segment"):
+        return segment_page(pix, segments)
+
+
+def _encoded_pages(
+    file_path: str,
+    encoding: Optional[EncodePolicy],
+    zoom: Optional[float],
+    parallel: Optional[bool],
+    page_filter: Optional[PageFilter],
+    segments: Optional[SegmentPolicy],
+    window: Optional[int] = None
+) -> Iterator[EncodedPage]:
+    """Render, encode and yield the kept pages (or blocks) of a PDF, in page order.
+    
+    The render pool renders `window` pages at a time (None: all at once),
+    so only one window of encoded pages is held before it is consumed;
+    in-process rendering holds one page. If the pool breaks, rendering
+    continues in-process from the first page it did not return.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"PDF file not found: {file_path}")
+    
+    encoding = encoding or EncodePolicy.from_env()
+    if zoom is None:
+        zoom = default_zoom()
+    policy = ZoomPolicy.from_env() if zoom is None else None
+    source = os.path.basename(file_path)
+    count, total, saved = 0, 0, 0
+    
+    def kept(page: EncodedPage) -> EncodedPage:
+        nonlocal count, total, saved
+        count += 1
+        if page.block == 0:
+            PAGES.inc(source="pdf")
+        if page.blocks > 1:
+            PAGE_BLOCKS.inc()
+        record_page(page, source, page.page)
+        total += page.size
+        saved += page.bytes_saved
+        return page
+    
+    try:
+        with fitz.open(file_path) as doc:
+            page_count = len(doc)
+            rendered = 0
+            pool = _parallel_pool(page_count, parallel)
+            if pool is not None:
+                try:
+                    keep = True
+                    for start in range(0, page_count, window or page_count):
+                        stop = min(page_count, start + (window or page_count))
+                        with span("pdf_render_parallel"):
+                            pages = pool.render_encoded(
+                                file_path, stop, zoom, encoding, policy,
+                                signatures=page_filter is not None and page_filter.enabled,
+                                segments=segments,
+                                start=start
+                            )
+                        rendered = stop
+                        for page in pages:
+                            # A page's signature is on its first block
+                            if page_filter is not None and page.block == 0:
+                                keep = page_filter.check(page.signature)
+                            if keep:
+                                yield kept(page)
+                        del pages
+                    logger.info(f"Rendered {page_count} PDF pages on {pool.workers} workers")
+                except BrokenProcessPool as e:
+                    logger.warning(f"Render pool failed ({e}); rendering in-process from page {rendered + 1}")
+            
+            for page_num in range(rendered, page_count):
+                pix = _render_page(doc[page_num], zoom, policy, encoding.grayscale)
+                if not _keep_page(pix, page_filter):
+                    continue
+                crops = _segment_page(pix, segments)
+                del pix
+                for block, crop in enumerate(crops):
+                    page = _encode_page(crop, encoding)
+                    page.block, page.blocks = block, len(crops)
+                    page.page = page_num + 1
+                    yield kept(page)
+                del crops
+        
+    except Exception as e:
+        logger.error(f"Failed to process PDF: {e}")
+        raise PDFProcessingError(f"PDF processing failed: {e}")
+    
+    log_savings(source, count, total, saved)
+
+
+def pdf_to_encoded_pages(
+    file_path: str,
+    encoding: Optional[EncodePolicy] = None,
+    zoom: Optional[float] = None,
+    parallel: Optional[bool] = None,
+    page_filter: Optional[PageFilter] = None,
+    segments: Optional[SegmentPolicy] = None
+) -> List[EncodedPage]:
+    """Render and encode PDF pages, recording the bytes saved per page.
+    
+    Args:
+        file_path: Path to PDF file
+        encoding: Page encoding (default: ``EncodePolicy.from_env()``,
+            grayscale with the smallest faithful format)
+        zoom: Zoom factor (1.0 = 72 DPI, 2.0 = 144 DPI); None uses
+            OCR_PDF_ZOOM, which defaults to a per-page adaptive zoom
+        parallel: Render page ranges in the shared process pool (None: when
+            the document has at least OCR_RENDER_MIN_PAGES pages)
+        page_filter: Drops blank and duplicate pages (None: keep every page)
+        segments: Splits pages into question blocks, returned as separate
+            items in reading order (None: whole pages)
+        
+    Returns:
+        List[EncodedPage]: Encoded pages (or blocks) that were kept, in page order
+        
+    Raises:
+        FileNotFoundError: If the PDF file does not exist
+        PDFProcessingError: If PDF processing fails
+    """
+    pages = list(_encoded_pages(file_path, encoding, zoom, parallel, page_filter, segments))
+    logger.info(f"Successfully rendered {len(pages)} pages from PDF")
+    return pages
+
+
+def pdf_to_base64_images(
+    file_path: str,
+    format: Optional[str] = "PNG",
+    zoom: Optional[float] = None,
+    parallel: Optional[bool] = None
+) -> List[str]:
+    """Render PDF pages directly to base64 encoded images.
+    
+    Args:
+        file_path: Path to PDF file
+        format: Output format (PNG, JPEG or WEBP); None or "AUTO" applies the
+            configured OCR encoding (see ``EncodePolicy.from_env``)
+        zoom: Zoom factor (1.0 = 72 DPI, 2.0 = 144 DPI); None uses
+            OCR_PDF_ZOOM, which defaults to a per-page adaptive zoom
+        parallel: Render page ranges in the shared process pool (None: when
+            the document has at least OCR_RENDER_MIN_PAGES pages)
+        
+    Returns:
+        List[str]: Base64 encoded page images, in page order
+        
+    Raises:
+        FileNotFoundError: If the PDF file does not exist
+        PDFProcessingError: If PDF processing fails
+    """
+    pages = pdf_to_encoded_pages(file_path, _encoding_policy(format), zoom, parallel)
+    return [page.data for page in pages]
+
+
+def pdf_to_images(
+    file_path: str,
+    parallel: Optional[bool] = None,
+    zoom: Optional[float] = None
+) -> List[Image.Image]:
     """Convert PDF to list of images.
     
     Args:
         file_path: Path to PDF file
+        parallel: Render page ranges in the shared process pool (None: decide
+            from the page count)
+        zoom: Zoom factor (1.0 = 72 DPI, 2.0 = 144 DPI); None uses
+            OCR_PDF_ZOOM, which defaults to a per-page adaptive zoom
         
     Returns:
         List[Image.Image]: List of PIL Images
@@ -44,18 +312,30 @@ def pdf_to_images(file_path: str) -> List[Image.Image]:
             raise FileNotFoundError(f"PDF file not found: {file_path}")
         
         doc = fitz.open(file_path)
+        if zoom is None:
+            zoom = default_zoom()
+        policy = ZoomPolicy.from_env() if zoom is None else None
+        
+        pool = _parallel_pool(len(doc), parallel)
+        if pool is not None:
+            try:
+                with span("pdf_render_parallel"):
+                    raw_pages = pool.render_raw(file_path, len(doc), zoom, policy)
+                doc.close()
+                PAGES.inc(len(raw_pages), source="pdf")
+                logger.info(f"Successfully converted {len(raw_pages)} pages from PDF on {pool.workers} workers")
+                return [Image.frombytes(mode, size, samples) for mode, size, samples in raw_pages]
+            except BrokenProcessPool as e:
+                logger.warning(f"Render pool failed ({e}); rendering in-process")
+        
         images = []
         
         for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            mat = fitz.Matrix(1.0, 1.0)
-            pix = page.get_pixmap(matrix=mat)
+            pix = _render_page(doc[page_num], zoom, policy)
             
-            # Convert to PIL Image
-            img_data = pix.tobytes("png")
-            img = Image.open(BytesIO(img_data))
-            images.append(img)
+            # Convert to PIL Image (raw samples, no PNG round trip)
+            images.append(pixmap_to_image(pix))
+            PAGES.inc(source="pdf")
             
             logger.info(f"Converted PDF page {page_num + 1} to image")
         
@@ -84,10 +364,12 @@ def image_to_base64(image: Image.Image, format: str = "PNG") -> str:
         if format.upper() == "JPEG":
             image = image.convert("RGB")
         
-        image.save(buffered, format=format.upper())
-        img_data = buffered.getvalue()
+        with span("image_encode"):
+            image.save(buffered, format=format.upper())
+            img_data = buffered.getvalue()
         
-        base64_string = base64.b64encode(img_data).decode('utf-8')
+        with span("base64"):
+            base64_string = base64.b64encode(img_data).decode('utf-8')
         logger.debug(f"Successfully converted image to base64 ({len(img_data)} bytes)")
         
         return base64_string
@@ -97,14 +379,105 @@ def image_to_base64(image: Image.Image, format: str = "PNG") -> str:
         raise ImageProcessingError(f"Image processing failed: {e}")
 
 
-def process_file(file_path: str) -> Tuple[List[str], int]:
-    """Process file and return list of base64 encoded images.
+def image_file_to_base64(
+    file_path: str,
+    max_side: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> str:
+    """Encode an image file for OCR, sending the original bytes when possible.
+    
+    JPEG and PNG files (detected from their content, not the extension) that
+    are within the size and dimension limits and need no EXIF rotation are
+    base64 encoded as-is. Anything else is decoded once, rotated upright,
+    downscaled to fit ``max_side`` and re-encoded: JPEG stays JPEG, PNG stays
+    PNG unless the file is over ``max_bytes``, and other formats become PNG.
+    
+    Args:
+        file_path: Path to image file
+        max_side: Largest width or height sent as-is (default OCR_MAX_IMAGE_SIDE, 2048)
+        max_bytes: Largest file size sent as-is (default OCR_MAX_IMAGE_MB, 10 MB)
+        
+    Returns:
+        str: Base64 encoded image data
+        
+    Raises:
+        ImageProcessingError: If the image cannot be read or encoded
+    """
+    if max_side is None:
+        max_side = int(os.getenv("OCR_MAX_IMAGE_SIDE", "2048"))
+    if max_bytes is None:
+        max_bytes = int(float(os.getenv("OCR_MAX_IMAGE_MB", "10")) * 1024 * 1024)
+    
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        
+        # Opening only parses the header; pixels are decoded on first use
+        with Image.open(BytesIO(data)) as image:
+            source_format = image.format
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+            
+            if (
+                source_format in PASSTHROUGH_FORMATS
+                and len(data) <= max_bytes
+                and max(image.size) <= max_side
+                and orientation == 1
+            ):
+                IMAGE_INPUTS.inc(mode="passthrough")
+                logger.debug(f"Sending {source_format} image as-is ({len(data)} bytes)")
+                with span("base64"):
+                    return base64.b64encode(data).decode('utf-8')
+            
+            with span("image_decode"):
+                image = ImageOps.exif_transpose(image)
+                if max(image.size) > max_side:
+                    image.thumbnail((max_side, max_side), Image.LANCZOS)
+            
+            if source_format == "JPEG" or (source_format in PASSTHROUGH_FORMATS and len(data) > max_bytes):
+                target_format = "JPEG"
+            else:
+                target_format = "PNG"
+            
+            IMAGE_INPUTS.inc(mode="transcoded")
+            logger.debug(f"Transcoding {source_format} image to {target_format} at {image.size}")
+            return image_to_base64(image, target_format)
+    
+    except ImageProcessingError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to process image: {e}")
+        raise ImageProcessingError(f"Image processing failed: {e}")
+
+
+def process_file(
+    file_path: str,
+    zoom: Optional[float] = None,
+    page_filter: Optional[PageFilter] = None,
+    segments: Optional[SegmentPolicy] = None,
+    budget: Optional[MemoryBudget] = None
+) -> Tuple[PageStore, int]:
+    """Process file and return its base64 encoded images in a PageStore.
+    
+    PDF pages are encoded by the configured OCR encoding (grayscale,
+    smallest faithful format; see ``EncodePolicy.from_env``). Blank pages
+    and repeats of earlier pages are left out (see ``PageFilter``), and
+    pages are split into question blocks, each its own image, in reading
+    order (see ``segment_page``).
+    
+    Pages are rendered in windows and collected in a ``PageStore``, which
+    spills them to disk beyond the memory budget; close it (or use it as a
+    context manager) once the pages have been sent.
     
     Args:
         file_path: Path to file (PDF or image)
+        zoom: Zoom factor for PDF pages (None: OCR_PDF_ZOOM, adaptive by default)
+        page_filter: Filter for PDF pages, which records what it skipped
+            (default: ``PageFilter.from_env()``)
+        segments: Segmentation of PDF pages (default: ``SegmentPolicy.from_env()``)
+        budget: Memory budget for the encoded pages (default: ``MemoryBudget.from_env()``)
         
     Returns:
-        Tuple[List[str], int]: (list of base64 images, number of pages)
+        Tuple[PageStore, int]: (base64 images, number of pages in the file)
         
     Raises:
         ValidationError: If file validation fails
@@ -112,35 +485,280 @@ def process_file(file_path: str) -> Tuple[List[str], int]:
     """
     _, ext = os.path.splitext(file_path.lower())
     
+    budget = budget or MemoryBudget.from_env()
     if ext == ".pdf":
-        images = pdf_to_images(file_path)
-        base64_images = [image_to_base64(img) for img in images]
-        return base64_images, len(images)
+        page_filter = page_filter or PageFilter.from_env()
+        segments = segments or SegmentPolicy.from_env()
+        store = PageStore(budget)
+        try:
+            with span("process_file"):
+                for page in _encoded_pages(file_path, None, zoom, None, page_filter, segments, budget.window):
+                    store.append(page.data)
+        except BaseException:
+            store.close()
+            raise
+        if store.spilled:
+            logger.info(f"Spilled {store.spilled} of {len(store)} pages to disk")
+        return store, page_filter.pages
     
     elif ext in {".jpg", ".jpeg", ".png"}:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Image file not found: {file_path}")
+        
+        store = PageStore(budget)
+        with span("process_file"):
+            store.append(image_file_to_base64(file_path))
+        PAGES.inc(source="image")
+        return store, 1
+    
+    else:
+        raise ValidationError(f"Unsupported file type: {ext}")
+
+
+def iter_file_pages(
+    file_path: str,
+    format: Optional[str] = None,
+    zoom: Optional[float] = None,
+    page_filter: Optional[PageFilter] = None,
+    segments: Optional[SegmentPolicy] = None,
+    text_layer: Optional[TextLayerPolicy] = None
+) -> Iterator[Union[PageImage, PageText]]:
+    """Yield a file's pages as base64 encoded images, one at a time.
+    
+    Lazy counterpart of ``process_file``: each PDF page is rendered and
+    encoded only when the next item is requested, so callers can start
+    working on page 1 before page N exists. Skipped pages are not encoded.
+    Segmented pages yield one image per question block.
+    
+    With `text_layer`, text that a PDF page's text layer gives reliably is
+    yielded as ``PageText`` without rendering; only the regions that still
+    need OCR (formulas, figures, images) are rendered, in reading order
+    between the text. Pages without a usable text layer are rendered whole.
+    Documents of at least OCR_RENDER_MIN_PAGES pages render their whole
+    pages on the shared render pool, a window of one page per worker at a
+    time; with `text_layer`, each window is analyzed first and only the
+    pages needing whole-page OCR are sent to the pool, while the regions of
+    text layer pages are rendered in-process.
+    
+    Args:
+        file_path: Path to file (PDF or image)
+        format: Output format for PDF pages (PNG, JPEG or WEBP); None
+            applies the configured OCR encoding
+        zoom: Zoom factor for PDF pages (1.0 = 72 DPI); None uses
+            OCR_PDF_ZOOM, which defaults to a per-page adaptive zoom
+        page_filter: Filter for PDF pages, which records what it skipped
+            (default: ``PageFilter.from_env()``)
+        segments: Segmentation of PDF pages (default: ``SegmentPolicy.from_env()``)
+        text_layer: Use of PDF text layers (None: OCR every page)
+        
+    Yields:
+        Union[PageImage, PageText]: Base64 encoded page image (or question
+        block), or text from the text layer, in page order; both carry the
+        one-based number of the page they came from
+        
+    Raises:
+        ValidationError: If the file type is not supported
+        FileProcessingError: If file processing fails
+    """
+    _, ext = os.path.splitext(file_path.lower())
+    
+    if ext == ".pdf":
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"PDF file not found: {file_path}")
+        
+        encoding = _encoding_policy(format)
+        page_filter = page_filter or PageFilter.from_env()
+        segments = segments or SegmentPolicy.from_env()
+        if text_layer is None or not text_layer.enabled:
+            # Every page is rendered whole: large documents go to the render
+            # pool one page per worker at a time
+            pool = get_render_pool()
+            window = pool.workers if pool is not None else None
+            for encoded in _encoded_pages(file_path, encoding, zoom, None, page_filter, segments, window):
+                yield PageImage(encoded.data, encoded.page)
+            return
+        
         try:
-            image = Image.open(file_path)
-            if ext == ".jpg" or ext == ".jpeg":
-                format = "JPEG"
-            else:
-                format = "PNG"
-            
-            base64_image = image_to_base64(image, format)
-            return [base64_image], 1
-            
+            doc = fitz.open(file_path)
         except Exception as e:
-            logger.error(f"Failed to process image: {e}")
-            raise ImageProcessingError(f"Image processing failed: {e}")
+            logger.error(f"Failed to process PDF: {e}")
+            raise PDFProcessingError(f"PDF processing failed: {e}")
+        
+        if zoom is None:
+            zoom = default_zoom()
+        policy = ZoomPolicy.from_env() if zoom is None else None
+        source = os.path.basename(file_path)
+        kept = total = saved = 0
+        
+        with doc:
+            page_count = len(doc)
+            pool = _parallel_pool(page_count, None)
+            window = pool.workers if pool is not None else 1
+            layouts: Dict[int, PageLayout] = {}
+            pooled: Dict[int, List[EncodedPage]] = {}
+            for page_num in range(page_count):
+                page = doc[page_num]
+                if page_num not in layouts:
+                    # Analyze the next window, then render its whole pages on the pool
+                    stop = min(page_count, page_num + window)
+                    for number in range(page_num, stop):
+                        try:
+                            layouts[number] = _analyze_page(doc[number], text_layer)
+                        except Exception as e:
+                            logger.error(f"Failed to render PDF page {number + 1}: {e}")
+                            raise PDFProcessingError(f"PDF processing failed on page {number + 1}: {e}")
+                    whole = [number for number in range(page_num, stop) if layouts[number].mode == MODE_OCR]
+                    if pool is not None and whole:
+                        try:
+                            with span("pdf_render_parallel"):
+                                for encoded in pool.render_encoded(
+                                    file_path, page_count, zoom, encoding, policy,
+                                    signatures=page_filter.enabled,
+                                    segments=segments,
+                                    pages=whole
+                                ):
+                                    pooled.setdefault(encoded.page - 1, []).append(encoded)
+                        except BrokenProcessPool as e:
+                            logger.warning(f"Render pool failed ({e}); rendering in-process from page {page_num + 1}")
+                            pool, pooled = None, {}
+                layout = layouts.pop(page_num)
+                try:
+                    if page_num in pooled:
+                        # A page's signature is on its first block
+                        parts = pooled.pop(page_num)
+                        if not page_filter.check(parts[0].signature):
+                            continue
+                        if len(parts) > 1:
+                            PAGE_BLOCKS.inc(len(parts))
+                    elif layout.mode == MODE_OCR:
+                        pix = _render_page(page, zoom, policy, encoding.grayscale)
+                        if not _keep_page(pix, page_filter):
+                            continue
+                        parts = _segment_page(pix, segments)
+                        if len(parts) > 1:
+                            PAGE_BLOCKS.inc(len(parts))
+                    else:
+                        # Text layer fast path: only the regions needing OCR are rendered
+                        page_filter.check(None)
+                        parts = [
+                            item if isinstance(item, PageText)
+                            else _render_page(page, zoom, policy, encoding.grayscale, clip=item)
+                            for item in layout_items(layout)
+                        ]
+                except Exception as e:
+                    logger.error(f"Failed to render PDF page {page_num + 1}: {e}")
+                    raise PDFProcessingError(f"PDF processing failed on page {page_num + 1}: {e}")
+                PAGES.inc(source="pdf")
+                kept += 1
+                for part in parts:
+                    if isinstance(part, PageText):
+                        part.page = page_num + 1
+                        yield part
+                        continue
+                    try:
+                        encoded = part if isinstance(part, EncodedPage) else _encode_page(part, encoding)
+                    except Exception as e:
+                        logger.error(f"Failed to encode PDF page {page_num + 1}: {e}")
+                        raise PDFProcessingError(f"PDF processing failed on page {page_num + 1}: {e}")
+                    record_page(encoded, source, page_num + 1)
+                    total += encoded.size
+                    saved += encoded.bytes_saved
+                    yield PageImage(encoded.data, page_num + 1)
+            log_savings(source, kept, total, saved)
+    
+    elif ext in {".jpg", ".jpeg", ".png"}:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Image file not found: {file_path}")
+        image_b64 = image_file_to_base64(file_path)
+        PAGES.inc(source="image")
+        yield PageImage(image_b64, 1)
     
     else:
         raise ValidationError(f"Unsupported file type: {ext}")
 
 
+async def aiter_file_pages(file_path: str, buffer_size: int = 2, **kwargs) -> AsyncIterator[Union[PageImage, PageText]]:
+    """Render a file's pages off the event loop, yielding each when ready.
+    
+    Each page is produced by ``iter_file_pages`` on the shared blocking
+    executor (``run_blocking``), so concurrent documents share its
+    OCR_BLOCKING_WORKERS threads instead of each starting a thread of its
+    own, and no thread sits waiting for the consumer. Rendering runs ahead
+    of the consumer by at most ``buffer_size`` pages; when the buffer is
+    full the producer waits, so memory stays flat no matter how long the
+    document is.
+    
+    Args:
+        file_path: Path to file (PDF or image)
+        buffer_size: Pages rendered ahead of the consumer
+        **kwargs: Passed to ``iter_file_pages`` (format, zoom, page_filter,
+            segments, text_layer)
+        
+    Yields:
+        Union[PageImage, PageText]: Base64 encoded page image (or question
+        block), or text from the text layer, in page order; both carry the
+        one-based number of the page they came from
+        
+    Raises:
+        ValidationError: If the file type is not supported
+        FileProcessingError: If file processing fails
+    """
+    pages = iter_file_pages(file_path, **kwargs)
+    buffer: "asyncio.Queue[Tuple[str, object]]" = asyncio.Queue(maxsize=max(1, buffer_size))
+    stopped = False
+    
+    async def produce() -> None:
+        try:
+            while not stopped:
+                page = await run_blocking(next, pages, None)
+                if page is None:
+                    await buffer.put(("done", None))
+                    return
+                await buffer.put(("page", page))
+        except Exception as e:
+            await buffer.put(("error", e))
+        finally:
+            # The generator is only touched from one executor call at a time
+            await run_blocking(pages.close)
+    
+    producer = asyncio.create_task(produce())
+    _producers.add(producer)
+    producer.add_done_callback(_producers.discard)
+    try:
+        while True:
+            kind, value = await buffer.get()
+            if kind == "page":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        # Let the producer finish the page it is on, then stop and close the file
+        stopped = True
+        while not buffer.empty():
+            buffer.get_nowait()
+
+
+# Running page producers, referenced so they are not garbage collected early
+_producers: Set["asyncio.Task[None]"] = set()
+
+
+def count_pages(file_path: str) -> int:
+    """Number of pages a file will produce (PDF page count, or 1 for images)."""
+    _, ext = os.path.splitext(file_path.lower())
+    if ext != ".pdf":
+        return 1
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+
 def pdf_to_image_files(
     pdf_path: str,
     output_dir: str,
     image_format: str = "PNG",
-    zoom: float = 1.0
+    zoom: float = 1.0,
+    parallel: Optional[bool] = None
 ) -> List[str]:
     """Convert PDF pages to image files and save to output directory.
 
@@ -149,6 +767,8 @@ def pdf_to_image_files(
         output_dir: Directory to save images
         image_format: Image format (PNG, JPEG, JPG)
         zoom: Zoom factor for image quality (1.0 = 72 DPI, 2.0 = 144 DPI)
+        parallel: Render page ranges in the shared process pool (None: decide
+            from the page count)
 
     Returns:
         List[str]: List of saved image file paths
@@ -170,26 +790,38 @@ def pdf_to_image_files(
         doc = fitz.open(pdf_path)
         saved_files: List[str] = []
 
+        # Determine output file paths
+        pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        ext = ".jpg" if image_format.upper() in {"JPEG", "JPG"} else ".png"
+        output_paths = [
+            os.path.join(output_dir, f"{pdf_name}_page_{page_num + 1:03d}{ext}")
+            for page_num in range(len(doc))
+        ]
+
+        pool = _parallel_pool(len(doc), parallel)
+        if pool is not None:
+            try:
+                with span("pdf_render_parallel"):
+                    saved_files = pool.render_files(pdf_path, len(doc), zoom, output_paths)
+                doc.close()
+                logger.info(f"Successfully converted {len(saved_files)} pages to {output_dir} on {pool.workers} workers")
+                return saved_files
+            except BrokenProcessPool as e:
+                logger.warning(f"Render pool failed ({e}); rendering in-process")
+
         for page_num in range(len(doc)):
             page = doc[page_num]
 
             # Apply zoom for higher quality
             mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-
-            # Determine output file path
-            pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-            if image_format.upper() in {"JPEG", "JPG"}:
-                ext = ".jpg"
-                output_filename = f"{pdf_name}_page_{page_num + 1:03d}.jpg"
-            else:
-                ext = ".png"
-                output_filename = f"{pdf_name}_page_{page_num + 1:03d}.png"
+            with span("pdf_render"):
+                pix = page.get_pixmap(matrix=mat)
 
-            output_path = os.path.join(output_dir, output_filename)
+            output_path = output_paths[page_num]
 
             # Save image to file
-            pix.save(output_path)
+            with span("image_save"):
+                pix.save(output_path)
             saved_files.append(output_path)
 
             logger.info(f"Saved: {output_path}")
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from core.utils.logger import setup_logger
+
+logger = setup_logger("hedging")
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add one observed latency in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency at `percent` (0-100) of the window.
+
+        Returns:
+            Optional[float]: Seconds, or None until `min_samples` calls were seen
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+
+        rank = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """Caps hedged calls to a fraction of all hedge-eligible calls."""
+
+    def __init__(self, max_fraction: float = 0.1):
+        self.max_fraction = max_fraction
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        """Count a call that could have been hedged."""
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self) -> bool:
+        """Reserve one hedge if the budget allows it."""
+        with self._lock:
+            if self.hedged + 1 > self.max_fraction * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def record_win(self) -> None:
+        """Count a hedge that finished before the original call."""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hedging counters.
+
+        Returns:
+            Dict[str, Any]: Hedge budget statistics
+        """
+        with self._lock:
+            return {
+                "max_fraction": self.max_fraction,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedged_fraction": self.hedged / self.calls if self.calls else 0.0
+            }
+
+
+async def run_hedged(
+    make_call: Callable[[], Awaitable[T]],
+    make_hedge: Callable[[], Awaitable[T]],
+    hedge_after: Optional[float],
+    budget: HedgeBudget
+) -> T:
+    """Run a call, firing a duplicate if it is slower than `hedge_after`.
+
+    The first call to succeed wins and the other one is cancelled. If the
+    first to finish fails, the other is still awaited; the call only fails
+    when both have failed.
+
+    Args:
+        make_call: Starts the original call
+        make_hedge: Starts the duplicate call
+        hedge_after: Seconds to wait before hedging (None disables hedging)
+        budget: Shared budget limiting the fraction of hedged calls
+
+    Returns:
+        The result of whichever call succeeded first
+    """
+    budget.record_call()
+    primary = asyncio.ensure_future(make_call())
+    hedge: Optional["asyncio.Future[T]"] = None
+    try:
+        if hedge_after is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done or not budget.try_spend():
+            return await primary
+
+        logger.info(f"Call exceeded {hedge_after:.2f}s; sending hedged request")
+        hedge = asyncio.ensure_future(make_hedge())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    if task is hedge:
+                        budget.record_win()
+                    return task.result()
+                error = task.exception()
+        raise error if error is not None else asyncio.CancelledError()
+    finally:
+        # Cancel the loser (or both, if the caller itself was cancelled)
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
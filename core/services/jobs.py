@@ -0,0 +1,230 @@
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.utils.logger import setup_logger
+from core.utils.metrics import JOBS, JOBS_QUEUED
+
+logger = setup_logger("jobs")
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobError(Exception):
+    """Base exception for job queue errors."""
+    pass
+
+
+class JobQueueFullError(JobError):
+    """Raised when a job is submitted while the queue is full."""
+    pass
+
+
+class JobNotFoundError(JobError):
+    """Raised when a job id is unknown or its job has expired."""
+    pass
+
+
+@dataclass
+class Job:
+    """One queued unit of work and its progress.
+
+    Progress is counted in pages of the document, out of ``pages``:
+    ``rendered`` pages have been rendered (or read from their text layer,
+    or skipped as blank or duplicate) and ``recognized`` pages have all of
+    their content recognized. A page split into question blocks counts
+    once.
+    """
+
+    id: str
+    run: Callable[["Job"], Awaitable[Any]] = field(repr=False)
+    status: str = JOB_QUEUED
+    pages: int = 0
+    rendered: int = 0
+    recognized: int = 0
+    result: Any = field(default=None, repr=False)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional["asyncio.Task[Any]"] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def advance(self, rendered: int = 0, recognized: int = 0) -> None:
+        """Record progress."""
+        self.rendered += rendered
+        self.recognized += recognized
+
+    def _finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        JOBS.inc(status=status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Job status without its result."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": {"pages": self.pages, "rendered": self.rendered, "recognized": self.recognized},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """Bounded queue of jobs run by a fixed number of worker coroutines.
+
+    At most `workers` jobs run at once, which caps the OCR traffic jobs
+    generate; at most `max_queued` more wait. Submitting to a full queue
+    fails immediately instead of waiting. Finished jobs are kept for
+    `retention` seconds so their results can be fetched.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 100, retention: float = 3600.0):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.retention = retention
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._workers: List["asyncio.Task[None]"] = []
+        self._jobs: Dict[str, Job] = {}
+        self._closing = False
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """Build a queue from OCR_JOB_WORKERS, OCR_JOB_QUEUE_SIZE and OCR_JOB_RETENTION_SECONDS."""
+        return cls(
+            workers=int(os.getenv("OCR_JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("OCR_JOB_QUEUE_SIZE", "100")),
+            retention=float(os.getenv("OCR_JOB_RETENTION_SECONDS", "3600"))
+        )
+
+    def start(self) -> None:
+        """Start the workers on the running event loop (done by ``submit`` if needed)."""
+        if self._workers:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Started job queue with {self.workers} workers, up to {self.max_queued} queued jobs")
+
+    def submit(self, run: Callable[[Job], Awaitable[Any]], pages: int = 0) -> Job:
+        """Queue a job.
+
+        Args:
+            run: Coroutine function doing the work; it receives the job to
+                report progress on, and its return value becomes the result
+            pages: Page count of the document, for progress reports
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFullError: If ``max_queued`` jobs are already waiting
+        """
+        self.start()
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, run=run, pages=pages)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+        self._jobs[job.id] = job
+        JOBS_QUEUED.inc()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """Look up a job.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Job not found: {job_id}")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a waiting or running job; finished jobs are left as they are.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        job = self.get(job_id)
+        if job.status == JOB_QUEUED:
+            # The worker that dequeues it skips it
+            job._finish(JOB_CANCELLED)
+            JOBS_QUEUED.dec()
+        elif job.status == JOB_RUNNING and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != JOB_QUEUED:
+                    continue
+                JOBS_QUEUED.dec()
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        job.task = asyncio.create_task(job.run(job))
+        try:
+            job.result = await job.task
+            job._finish(JOB_SUCCEEDED)
+            logger.info(f"Job {job.id} succeeded in {job.finished_at - job.started_at:.1f}s")
+        except asyncio.CancelledError:
+            job._finish(JOB_CANCELLED)
+            logger.info(f"Job {job.id} cancelled")
+            if self._closing:
+                raise
+        except Exception as e:
+            job._finish(JOB_FAILED, str(e))
+            logger.error(f"Job {job.id} failed: {e}")
+        finally:
+            job.task = None
+
+    def _prune(self) -> None:
+        """Forget jobs that finished more than ``retention`` seconds ago."""
+        cutoff = time.time() - self.retention
+        for job_id in [job.id for job in self._jobs.values() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    async def close(self) -> None:
+        """Cancel all jobs and stop the workers."""
+        self._closing = True
+        for job in self._jobs.values():
+            if job.status == JOB_QUEUED:
+                job._finish(JOB_CANCELLED)
+                JOBS_QUEUED.dec()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Job queue closed")
+
+    def stats(self) -> dict:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"workers": self.workers, "max_queued": self.max_queued, "jobs": statuses}
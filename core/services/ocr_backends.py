@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import math
+import os
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from core.utils.logger import setup_logger
+from core.utils.validators import ValidationError
+
+logger = setup_logger("ocr_backends")
+
+
+class OCRBackend:
+    """Base class for OCR providers.
+
+    A backend exposes an OpenAI-compatible ``client`` (anything with
+    ``client.chat.completions.create(...)``), which ``OCRService`` drives for
+    both regular and streamed completions, plus lifecycle and info hooks.
+    """
+
+    name = "base"
+    provider = "Unknown"
+    client: Any = None
+
+    async def close(self) -> None:
+        """Release any resources held by the backend."""
+
+    def info(self) -> Dict[str, Any]:
+        """Get backend configuration for diagnostics.
+
+        Returns:
+            Dict[str, Any]: Backend information
+        """
+        return {"name": self.name, "provider": self.provider}
+
+
+class SiliconFlowBackend(OCRBackend):
+    """SiliconFlow's OpenAI-compatible API over a pooled HTTP client."""
+
+    name = "siliconflow"
+    provider = "SiliconFlow"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        self.api_key = api_key or os.getenv("SILICONFLOW_API_KEY")
+        self.base_url = base_url or os.getenv("SILICONFLOW_BASE_URL", "https://api.siliconflow.cn/v1")
+
+        # HTTP connection pool settings
+        self.pool_size = int(os.getenv("OCR_POOL_SIZE", "10"))
+        self.keepalive_expiry = float(os.getenv("OCR_KEEPALIVE_SECONDS", "60"))
+        self.timeout = float(os.getenv("OCR_TIMEOUT_SECONDS", "120"))
+        self.connect_timeout = float(os.getenv("OCR_CONNECT_TIMEOUT_SECONDS", "10"))
+
+        if not self.api_key:
+            raise ValidationError("SILICONFLOW_API_KEY environment variable is required")
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        )
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.http_client,
+            max_retries=0  # Retries are handled by OCRService, with the rate limiter
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **super().info(),
+            "base_url": self.base_url,
+            "pool_size": self.pool_size,
+            "timeout": self.timeout
+        }
+
+
+# Canned OCR output returned by the fake backend, one entry per page image
+FAKE_PAGES = [
+    """## 题目 1
+已知函数 $f(x) = x^2 + 2x + 1$，求 $f'(x)$ 在 $x = 1$ 处的值。
+
+## 题目 2
+解方程：$$2x^2 - 3x - 2 = 0$$""",
+    """## 题目 1
+如图，在 $\\triangle ABC$ 中，$AB = AC$，$\\angle A = 40^\\circ$，求 $\\angle B$ 的度数。
+
+## 题目 2
+计算：$$\\int_0^2 x^2 \\, dx$$""",
+    """## 题目 1
+一个长方形的长是 $12\\text{cm}$，宽是长的 $\\frac{2}{3}$，求它的面积。
+
+## 题目 2
+求极限：$$\\lim_{x \\to 0} \\frac{\\sin x}{x}$$""",
+]
+
+
+class SimulatedProviderError(Exception):
+    """An HTTP error injected by the fake backend."""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """Response headers to send along with the error."""
+        if self.retry_after is None:
+            return {}
+        return {"retry-after": f"{self.retry_after:g}"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about two characters per token for Chinese + LaTeX."""
+    return max(1, math.ceil(len(text) / 2))
+
+
+class FakeBackend(OCRBackend):
+    """In-process stand-in for the OCR provider.
+
+    Returns canned Markdown for each page image after a log-normally
+    distributed delay, and injects 429s (with Retry-After) and 500s at
+    configurable rates. Output longer than ``max_tokens`` is truncated with
+    ``finish_reason == "length"``, like the real API.
+
+    Configured through OCR_FAKE_LATENCY_MS (median), OCR_FAKE_LATENCY_SIGMA,
+    OCR_FAKE_ERROR_RATE, OCR_FAKE_THROTTLE_RATE, OCR_FAKE_RETRY_AFTER and
+    OCR_FAKE_SEED.
+    """
+
+    name = "fake"
+    provider = "Fake"
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        latency_sigma: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        throttle_rate: Optional[float] = None,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("OCR_FAKE_LATENCY_MS", "800"))
+        self.latency_sigma = latency_sigma if latency_sigma is not None else float(os.getenv("OCR_FAKE_LATENCY_SIGMA", "0.5"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("OCR_FAKE_ERROR_RATE", "0"))
+        self.throttle_rate = throttle_rate if throttle_rate is not None else float(os.getenv("OCR_FAKE_THROTTLE_RATE", "0"))
+        self.retry_after = retry_after if retry_after is not None else float(os.getenv("OCR_FAKE_RETRY_AFTER", "1"))
+        if seed is None and os.getenv("OCR_FAKE_SEED"):
+            seed = int(os.getenv("OCR_FAKE_SEED"))
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.client = _FakeClient(self)
+
+    def sample_latency(self) -> float:
+        """Draw one response latency in seconds."""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self._rng.lognormvariate(math.log(self.latency_ms / 1000), self.latency_sigma)
+
+    def render(self, messages: List[Dict[str, Any]], max_tokens: int) -> Tuple[str, str, int]:
+        """Build the canned answer for a request.
+
+        Returns:
+            Tuple[str, str, int]: (text, finish_reason, completion_tokens)
+        """
+        pages = []
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, list):
+                continue
+            for part in content:
+                if part.get("type") != "image_url":
+                    continue
+                url = part["image_url"]["url"]
+                digest = int(hashlib.sha256(url.encode("utf-8")).hexdigest(), 16)
+                pages.append(FAKE_PAGES[digest % len(FAKE_PAGES)])
+
+        text = "\n\n".join(pages) or FAKE_PAGES[0]
+        if estimate_tokens(text) > max_tokens:
+            return text[:max_tokens * 2], "length", max_tokens
+        return text, "stop", estimate_tokens(text)
+
+    async def respond(self, messages: List[Dict[str, Any]], max_tokens: int) -> Tuple[str, str, int]:
+        """Wait for a simulated latency, then answer or fail.
+
+        Raises:
+            SimulatedProviderError: For injected 429 and 500 responses
+        """
+        self.requests += 1
+        await asyncio.sleep(self.sample_latency())
+
+        roll = self._rng.random()
+        if roll < self.throttle_rate:
+            raise SimulatedProviderError(429, "Rate limit exceeded (simulated)", retry_after=self.retry_after)
+        if roll < self.throttle_rate + self.error_rate:
+            raise SimulatedProviderError(500, "Internal server error (simulated)")
+
+        return self.render(messages, max_tokens)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **super().info(),
+            "latency_ms": self.latency_ms,
+            "latency_sigma": self.latency_sigma,
+            "error_rate": self.error_rate,
+            "throttle_rate": self.throttle_rate,
+            "requests": self.requests
+        }
+
+
+def to_openai_error(error: SimulatedProviderError) -> openai.APIStatusError:
+    """Convert an injected error into the exception the OpenAI SDK would raise."""
+    request = httpx.Request("POST", "http://fake-ocr/v1/chat/completions")
+    response = httpx.Response(error.status_code, headers=error.headers(), request=request)
+    if error.status_code == 429:
+        return openai.RateLimitError(str(error), response=response, body=None)
+    if error.status_code >= 500:
+        return openai.InternalServerError(str(error), response=response, body=None)
+    return openai.APIStatusError(str(error), response=response, body=None)
+
+
+class _FakeCompletions:
+    def __init__(self, backend: FakeBackend):
+        self._backend = backend
+
+    async def create(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int = 2048,
+        stream: bool = False,
+        **kwargs: Any
+    ) -> Any:
+        try:
+            text, finish_reason, completion_tokens = await self._backend.respond(messages, max_tokens)
+        except SimulatedProviderError as e:
+            raise to_openai_error(e)
+
+        if stream:
+            return stream_chunks(model, text, finish_reason)
+        return build_completion(model, text, finish_reason, completion_tokens)
+
+
+class _FakeChat:
+    def __init__(self, backend: FakeBackend):
+        self.completions = _FakeCompletions(backend)
+
+
+class _FakeClient:
+    """Minimal OpenAI-compatible client backed by a FakeBackend."""
+
+    def __init__(self, backend: FakeBackend):
+        self.chat = _FakeChat(backend)
+
+    async def close(self) -> None:
+        pass
+
+
+def build_completion(model: str, text: str, finish_reason: str, completion_tokens: int) -> ChatCompletion:
+    """Build a chat completion object as returned by the OpenAI SDK."""
+    return ChatCompletion.model_validate({
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": text}
+        }],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": completion_tokens,
+            "total_tokens": completion_tokens
+        }
+    })
+
+
+def chunk_text(text: str, size: int = 16) -> List[str]:
+    """Split text into stream-sized deltas."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+async def stream_chunks(model: str, text: str, finish_reason: str) -> AsyncIterator[ChatCompletionChunk]:
+    """Yield chat completion chunks for `text`, as a streamed response would."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    deltas = chunk_text(text)
+    for i, delta in enumerate(deltas):
+        yield ChatCompletionChunk.model_validate({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": {"content": delta},
+                "finish_reason": finish_reason if i == len(deltas) - 1 else None
+            }]
+        })
+        await asyncio.sleep(0)
+
+
+BACKENDS = {
+    SiliconFlowBackend.name: SiliconFlowBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> OCRBackend:
+    """Create the OCR backend selected by `name` or the OCR_BACKEND variable.
+
+    Args:
+        name: Backend name ("siliconflow" or "fake")
+
+    Returns:
+        OCRBackend: Configured backend
+
+    Raises:
+        ValidationError: If the backend is unknown or misconfigured
+    """
+    name = (name or os.getenv("OCR_BACKEND", SiliconFlowBackend.name)).lower()
+    if name not in BACKENDS:
+        raise ValidationError(f"Unknown OCR backend: {name}. Available: {', '.join(sorted(BACKENDS))}")
+
+    logger.info(f"Using OCR backend: {name}")
+    return BACKENDS[name]()
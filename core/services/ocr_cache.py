@@ -0,0 +1,211 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.utils.logger import setup_logger
+
+logger = setup_logger("ocr_cache")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "cache" / "ocr"
+
+
+class OCRCache:
+    """Content-addressed on-disk cache for OCR results.
+
+    Entries are keyed on a SHA-256 of the model name, the prompt and the
+    page images, and stored as one Markdown file per key. The total size of
+    the store is bounded; the least recently used entries are evicted first.
+
+    The web server and the MCP server point at the same directory, so a page
+    recognized by one is a hit for the other. Each process keeps its own
+    in-memory LRU index, rebuilt from file modification times on startup.
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 256.0):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from the files on disk, oldest first."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.md"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+        logger.info(f"OCR cache loaded: {len(self._index)} entries, {self._size} bytes in {self.cache_dir}")
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.md"
+
+    @staticmethod
+    def make_key(images: List[str], model: str, prompt: str) -> str:
+        """Build a cache key from base64 page images, model name and prompt.
+
+        Args:
+            images: List of base64 encoded images
+            model: OCR model name
+            prompt: Prompt sent with the images
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        for image_b64 in images:
+            digest.update(b"\0")
+            digest.update(image_b64.encode("ascii"))
+        return digest.hexdigest()
+
+    def get(self, key: str, record: bool = True) -> Optional[str]:
+        """Return the cached result for `key`, or None on a miss.
+
+        With ``record=False`` the hit/miss counters are left alone, for
+        callers that probe several keys for one lookup and count it
+        themselves with ``record_lookup``.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                if record:
+                    self.misses += 1
+                size = self._index.pop(key, None)
+                if size is not None:
+                    self._size -= size
+            return None
+
+        with self._lock:
+            if record:
+                self.hits += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # Written by another process sharing the directory
+                size = len(content.encode("utf-8"))
+                self._index[key] = size
+                self._size += size
+
+        logger.debug(f"OCR cache hit: {key[:12]}")
+        return content
+
+    def record_lookup(self, hit: bool) -> None:
+        """Count one lookup made of probes with ``get(key, record=False)``."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key: str, content: str) -> None:
+        """Store `content` under `key` and evict old entries if needed."""
+        data = content.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write OCR cache entry {key[:12]}: {e}")
+            return
+
+        with self._lock:
+            previous = self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._size += len(data) - previous
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the store fits the budget."""
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._index.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and size of the cache.
+
+        Returns:
+            Dict[str, Any]: Cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_dir": str(self.cache_dir),
+                "entries": len(self._index),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_shared_cache: Optional[OCRCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Return the process-wide OCR cache, or None if caching is disabled.
+
+    Configured through OCR_CACHE_ENABLED, OCR_CACHE_DIR and OCR_CACHE_MAX_MB.
+    """
+    global _shared_cache
+
+    if os.getenv("OCR_CACHE_ENABLED", "true").lower() in {"0", "false", "no"}:
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = OCRCache(
+                cache_dir=os.getenv("OCR_CACHE_DIR", str(DEFAULT_CACHE_DIR)),
+                max_size_mb=float(os.getenv("OCR_CACHE_MAX_MB", "256"))
+            )
+        return _shared_cache
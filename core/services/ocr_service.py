@@ -1,14 +1,41 @@
 import asyncio
-import asyncio
 import os
 import time
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterable, AsyncIterator, Callable, List, Dict, Any, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
 import openai
-from openai import AsyncOpenAI
 
+from core.services.blocking import run_blocking
+from core.services.hedging import HedgeBudget, LatencyTracker, run_hedged
+from core.services.ocr_backends import OCRBackend, create_backend
+from core.services.ocr_cache import get_ocr_cache
+from core.services.page_planner import (
+    BatchPacker,
+    PageBatch,
+    PageProgress,
+    TokenEstimator,
+    page_number,
+    split_batch
+)
+from core.services.rate_limiter import (
+    RateLimiter,
+    THROTTLE_STATUS_CODES,
+    backoff_delay,
+    is_retryable_status,
+    parse_retry_after
+)
+from core.services.text_layer import PageText
 from core.utils.logger import setup_logger
+from core.utils.metrics import (
+    IN_FLIGHT,
+    OCR_BYTES_SENT,
+    OCR_CACHE_LOOKUPS,
+    OCR_COMPLETION_TOKENS,
+    OCR_REQUESTS,
+    OCR_RETRIES,
+    span
+)
 from core.utils.validators import ValidationError
 
 logger = setup_logger("ocr_service")
@@ -34,70 +61,239 @@ class EmptyResponseError(OCRError):
     pass
 
 
+class TruncatedOutputError(OCRError):
+    """Raised when OCR output was cut off by the max_tokens limit."""
+    
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+# OCR prompt (shortened to fit token limit)
+OCR_PROMPT = """识别图片中的数学公式和文字。用 Markdown + LaTeX 格式输出。
+
+要求：
+- 数学公式用 $...$ 或 $$...$$
+- 题目用中文
+- 每个题目之间用空行分隔，以便于阅读
+- 保留题目编号和格式
+- 尽可能保留原始文档的排版结构
+
+开始识别："""
+
+# Asked for between pages in multi-page requests, so each page's text can be cached on its own
+PAGE_SEPARATOR = "<!-- page -->"
+
+MULTI_PAGE_PROMPT = OCR_PROMPT.replace(
+    "\n\n开始识别：",
+    f"\n- 图片按页序给出，每张图片的内容结束后单独一行输出 {PAGE_SEPARATOR}\n\n开始识别："
+)
+
+
 class OCRService:
-    """Service for handling OCR operations with SiliconFlow DeepSeek-OCR."""
+    """Service for handling OCR operations with SiliconFlow DeepSeek-OCR.
     
-    def __init__(self):
-        self.api_key = os.getenv("SILICONFLOW_API_KEY")
-        self.base_url = os.getenv("SILICONFLOW_BASE_URL", "https://api.siliconflow.cn/v1")
+    Requests go through a pluggable ``OCRBackend`` (OCR_BACKEND), so the
+    same pipeline can run against SiliconFlow or a local stand-in.
+    """
+    
+    def __init__(self, backend: Optional[OCRBackend] = None):
         self.model = os.getenv("DEEPSEEK_OCR_MODEL", "deepseek-ai/DeepSeek-OCR")
         self.max_retries = 3
         self.retry_delay = 1.0
+        self.max_retry_delay = float(os.getenv("OCR_MAX_RETRY_DELAY_SECONDS", "30"))
+        self.max_tokens = int(os.getenv("OCR_MAX_TOKENS", "2048"))
+        self.max_concurrency = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+        # 0 lets the token-budget planner decide how many pages go in each request
+        self.pages_per_request = int(os.getenv("OCR_PAGES_PER_REQUEST", "0"))
+        self.max_pages_per_request = int(os.getenv("OCR_MAX_PAGES_PER_REQUEST", "4"))
+        self.page_retries = 1
         
-        if not self.api_key:
-            raise ValidationError("SILICONFLOW_API_KEY environment variable is required")
+        self.backend = backend or create_backend()
+        self.client = self.backend.client
+        self.api_key = getattr(self.backend, "api_key", None)
+        self.base_url = getattr(self.backend, "base_url", None)
         
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
+        # Client-side limits so concurrent requests stay under the provider's quota
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=float(os.getenv("OCR_REQUESTS_PER_MINUTE", "60")),
+            tokens_per_minute=float(os.getenv("OCR_TOKENS_PER_MINUTE", "0"))
         )
+        
+        # Shared content-addressed result cache (None when disabled)
+        self.cache = get_ocr_cache()
+        
+        # Learns output tokens per page from completed requests
+        self.token_estimator = TokenEstimator()
+        
+        # Opt-in hedging: duplicate requests slower than a latency percentile
+        self.hedging = os.getenv("OCR_HEDGING", "false").lower() in {"1", "true", "yes"}
+        self.hedge_percentile = float(os.getenv("OCR_HEDGE_PERCENTILE", "95"))
+        self.latency_tracker = LatencyTracker()
+        self.hedge_budget = HedgeBudget(float(os.getenv("OCR_HEDGE_BUDGET", "0.1")))
+    
+    def _build_content(self, images: List[str], prompt: str = OCR_PROMPT) -> List[Dict[str, Any]]:
+        """Build the chat message content for a list of base64 images."""
+        image_content = []
+        for image_b64 in images:
+            image_content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{image_mime_type(image_b64)};base64,{image_b64}"
+                }
+            })
+        
+        # Add text prompt
+        image_content.append({
+            "type": "text",
+            "text": prompt
+        })
+        return image_content
+    
+    def _page_key(self, image_b64: str) -> str:
+        return self.cache.make_key([image_b64], self.model, OCR_PROMPT)
+    
+    def _cached_pages(self, images: List[str]) -> List[Optional[str]]:
+        """Cached text of each page, None for misses (blocking; run via ``run_blocking``)."""
+        texts = []
+        for image_b64 in images:
+            text = self.cache.get(self._page_key(image_b64))
+            OCR_CACHE_LOOKUPS.inc(result="miss" if text is None else "hit")
+            texts.append(text)
+        return texts
     
-    async def recognize_text(self, images: List[str]) -> str:
+    def _cache_lookup(self, images: List[str], prompt: str) -> Optional[str]:
+        """Cached text for a request (blocking; run via ``run_blocking``).
+        
+        Every page's own entry is tried first, then an entry for the request
+        as a whole (stored when a multi-page answer could not be split).
+        The probes count as one hit or miss, in the cache stats as in
+        ``OCR_CACHE_LOOKUPS``.
+        """
+        texts = []
+        for image_b64 in images:
+            text = self.cache.get(self._page_key(image_b64), record=False)
+            if text is None:
+                break
+            texts.append(text)
+        
+        cached = "\n\n".join(texts) if len(texts) == len(images) else None
+        if cached is None and len(images) > 1:
+            cached = self.cache.get(self.cache.make_key(images, self.model, prompt), record=False)
+        self.cache.record_lookup(cached is not None)
+        OCR_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        return cached
+    
+    def _cache_store(self, images: List[str], prompt: str, result: str, pages: Optional[List[str]]) -> None:
+        """Store a request's result per page, or as a whole if it was not split (blocking)."""
+        if pages is not None:
+            for image_b64, text in zip(images, pages):
+                self.cache.put(self._page_key(image_b64), text)
+        else:
+            self.cache.put(self.cache.make_key(images, self.model, prompt), result)
+    
+    async def recognize_text(
+        self,
+        images: List[str],
+        max_tokens: Optional[int] = None,
+        allow_truncated: bool = True,
+        check_cache: bool = True
+    ) -> str:
         """Recognize text from images using DeepSeek-OCR.
         
+        All images are sent in a single chat completion. Use
+        ``recognize_pages`` to fan multi-page documents out into
+        concurrent per-page requests. With several images the model is asked
+        to separate pages, so each page's text is cached on its own.
+        
         Args:
             images: List of base64 encoded images
+            max_tokens: Output token limit for this request (defaults to ``self.max_tokens``)
+            allow_truncated: Return output cut off by ``max_tokens`` instead of raising
+            check_cache: Look the pages up in the result cache first (callers
+                that already looked them up pass False); results are stored
+                either way
             
         Returns:
             str: Recognized text in Markdown + LaTeX format
             
         Raises:
+            TruncatedOutputError: If output hit ``max_tokens`` and ``allow_truncated`` is False
             OCRError: If OCR operation fails
         """
-        try:
-            # Create OCR prompt (shortened to fit token limit)
-            prompt = """识别图片中的数学公式和文字。用 Markdown + LaTeX 格式输出。
-
-要求：
-- 数学公式用 $...$ 或 $$...$$
-- 题目用中文
-- 每个题目之间用空行分隔，以便于阅读
-- 保留题目编号和格式
-- 尽可能保留原始文档的排版结构
-
-开始识别："""
-
-            # Prepare image content for OpenAI API
-            image_content = []
-            for i, image_b64 in enumerate(images):
-                image_content.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/png;base64,{image_b64}"
-                    }
-                })
+        max_tokens = max_tokens or self.max_tokens
+        prompt = MULTI_PAGE_PROMPT if len(images) > 1 else OCR_PROMPT
+        
+        if self.cache is not None and check_cache:
+            cached = await run_blocking(self._cache_lookup, images, prompt)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {len(images)} images")
+                return cached
+        
+        # Prepare image content for OpenAI API
+        image_content = self._build_content(images, prompt)
+        
+        logger.info(f"Starting OCR recognition for {len(images)} images")
+        
+        # Make API call with retry logic; backoff is computed per call
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries):
+            with span("rate_limit_wait"):
+                await self.rate_limiter.acquire(max_tokens)
             
-            # Add text prompt
-            image_content.append({
-                "type": "text",
-                "text": prompt
-            })
+            try:
+                response = await self._create_completion(image_content, max_tokens)
+            except Exception as e:
+                last_error = e
+                delay = self._retry_delay(e, attempt)
+            else:
+                self.rate_limiter.on_success()
+                
+                try:
+                    pages, result = split_pages(completion_text(response), len(images))
+                except EmptyResponseError as e:
+                    # An empty answer is usually transient; retry it like an API error
+                    last_error = e
+                    delay = backoff_delay(attempt, self.retry_delay, self.max_retry_delay)
+                else:
+                    if response.choices[0].finish_reason == "length":
+                        if not allow_truncated:
+                            raise TruncatedOutputError(f"OCR output truncated at {max_tokens} tokens", text=result)
+                        logger.warning(f"OCR output truncated at {max_tokens} tokens")
+                        return result
+                    
+                    completion_tokens = getattr(getattr(response, "usage", None), "completion_tokens", None)
+                    if isinstance(completion_tokens, int):
+                        self.token_estimator.observe(images, completion_tokens)
+                        OCR_COMPLETION_TOKENS.inc(completion_tokens)
+                    
+                    logger.info(f"OCR recognition completed successfully on attempt {attempt + 1}")
+                    if self.cache is not None:
+                        await run_blocking(self._cache_store, images, prompt, result, pages)
+                    return result
             
-            logger.info(f"Starting OCR recognition for {len(images)} images")
+            if attempt == self.max_retries - 1:
+                break
             
-            # Make API call with retry logic
-            for attempt in range(self.max_retries):
-                try:
+            logger.warning(f"OCR attempt {attempt + 1} failed: {last_error}. Retrying in {delay:.2f}s...")
+            OCR_RETRIES.inc(reason=error_label(last_error))
+            await asyncio.sleep(delay)
+        
+        self._raise_exhausted(last_error)
+    
+    async def _create_completion(self, image_content: List[Dict[str, Any]], max_tokens: int) -> Any:
+        """Send one chat completion, hedging it when hedging is enabled.
+        
+        Latency of every successful call is recorded. With hedging on, a call
+        still running after the tracked ``hedge_percentile`` latency gets a
+        duplicate (within the hedge budget); the first to finish wins and the
+        other is cancelled.
+        """
+        async def timed_call() -> Any:
+            OCR_BYTES_SENT.inc(content_bytes(image_content))
+            start = time.monotonic()
+            try:
+                with IN_FLIGHT.track(operation="ocr_request"), span("ocr_request"):
                     response = await self.client.chat.completions.create(
                         model=self.model,
                         messages=[
@@ -106,48 +302,602 @@ class OCRService:
                                 "content": image_content
                             }
                         ],
-                        max_tokens=2048,
+                        max_tokens=max_tokens,
                         temperature=0.1
                     )
+            except Exception as e:
+                OCR_REQUESTS.inc(outcome=error_label(e))
+                raise
+            OCR_REQUESTS.inc(outcome="success")
+            self.latency_tracker.record(time.monotonic() - start)
+            return response
+        
+        if not self.hedging:
+            return await timed_call()
+        
+        async def hedge_call() -> Any:
+            with span("rate_limit_wait"):
+                await self.rate_limiter.acquire(max_tokens)
+            return await timed_call()
+        
+        hedge_after = self.latency_tracker.percentile(self.hedge_percentile)
+        return await run_hedged(timed_call, hedge_call, hedge_after, self.hedge_budget)
+    
+    async def stream_text(
+        self,
+        images: List[str],
+        max_tokens: Optional[int] = None,
+        allow_truncated: bool = True
+    ) -> AsyncIterator[str]:
+        """Recognize text from images, yielding output as it is generated.
+        
+        Same request as ``recognize_text`` but with ``stream=True``, so the
+        first characters reach the caller while the model is still writing.
+        Failed attempts are only retried if nothing has been yielded yet.
+        
+        Args:
+            images: List of base64 encoded images
+            max_tokens: Output token limit for this request (defaults to ``self.max_tokens``)
+            allow_truncated: End normally when output is cut off by ``max_tokens``
+                instead of raising once the partial output has been yielded
+            
+        Yields:
+            str: Successive chunks of the Markdown + LaTeX output
+            
+        Raises:
+            TruncatedOutputError: If output hit ``max_tokens`` and ``allow_truncated`` is False
+            OCRError: If OCR operation fails
+        """
+        if self.cache is not None:
+            cached = await run_blocking(self._cache_lookup, images, OCR_PROMPT)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {len(images)} images")
+                yield cached
+                return
+        
+        max_tokens = max_tokens or self.max_tokens
+        image_content = self._build_content(images)
+        
+        logger.info(f"Starting streaming OCR recognition for {len(images)} images")
+        
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries):
+            with span("rate_limit_wait"):
+                await self.rate_limiter.acquire(max_tokens)
+            chunks: List[str] = []
+            finish_reason = None
+            OCR_BYTES_SENT.inc(content_bytes(image_content))
+            
+            try:
+                with span("ocr_stream_first_token"):
+                    stream = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": image_content
+                            }
+                        ],
+                        max_tokens=max_tokens,
+                        temperature=0.1,
+                        stream=True
+                    )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+            except Exception as e:
+                OCR_REQUESTS.inc(outcome=error_label(e))
+                if chunks:
+                    # Part of the answer is already out; a retry would duplicate it
+                    logger.error(f"OCR stream interrupted: {e}")
+                    raise OCRError(f"OCR stream interrupted: {e}")
+                last_error = e
+                delay = self._retry_delay(e, attempt)
+            else:
+                OCR_REQUESTS.inc(outcome="success")
+                self.rate_limiter.on_success()
+                
+                result = "".join(chunks).strip()
+                if not result:
+                    # Nothing but whitespace was sent, so the attempt can be retried
+                    last_error = EmptyResponseError("OCR API returned empty content")
+                    delay = backoff_delay(attempt, self.retry_delay, self.max_retry_delay)
+                else:
+                    if finish_reason == "length":
+                        if not allow_truncated:
+                            raise TruncatedOutputError(f"OCR output truncated at {max_tokens} tokens", text=result)
+                        logger.warning(f"Streamed OCR output truncated at {max_tokens} tokens")
+                        return
                     
-                    if not response.choices or not response.choices[0].message.content:
-                        raise EmptyResponseError("OCR API returned empty response")
-                    
-                    result = response.choices[0].message.content.strip()
-                    
-                    if not result:
-                        raise EmptyResponseError("OCR API returned empty content")
-                    
-                    logger.info(f"OCR recognition completed successfully on attempt {attempt + 1}")
-                    return result
-                    
-                except openai.APIError as e:
-                    if "401" in str(e) or "authentication" in str(e).lower():
-                        raise AuthenticationError(f"API authentication failed: {e}")
-                    
-                    if attempt == self.max_retries - 1:
-                        logger.error(f"OCR failed after {self.max_retries} attempts: {e}")
-                        raise OCRError(f"OCR operation failed: {e}")
-                    
-                    logger.warning(f"OCR attempt {attempt + 1} failed: {e}. Retrying in {self.retry_delay}s...")
-                    await asyncio.sleep(self.retry_delay)
-                    self.retry_delay *= 2  # Exponential backoff
-                    
-                except Exception as e:
-                    if attempt == self.max_retries - 1:
-                        logger.error(f"OCR failed after {self.max_retries} attempts: {e}")
-                        raise OCRError(f"OCR operation failed: {e}")
-                    
-                    logger.warning(f"OCR attempt {attempt + 1} failed: {e}. Retrying in {self.retry_delay}s...")
-                    await asyncio.sleep(self.retry_delay)
-                    self.retry_delay *= 2
+                    logger.info(f"Streaming OCR recognition completed on attempt {attempt + 1}")
+                    if self.cache is not None:
+                        pages = [result] if len(images) == 1 else None
+                        await run_blocking(self._cache_store, images, OCR_PROMPT, result, pages)
+                    return
             
-            # This should not be reached, but just in case
-            raise OCRTimeoutError("OCR operation timed out after all retries")
+            if attempt == self.max_retries - 1:
+                break
             
-        except Exception as e:
-            logger.error(f"OCR service error: {e}")
-            raise OCRError(f"OCR service failed: {e}")
+            logger.warning(f"OCR attempt {attempt + 1} failed: {last_error}. Retrying in {delay:.2f}s...")
+            OCR_RETRIES.inc(reason=error_label(last_error))
+            await asyncio.sleep(delay)
+        
+        self._raise_exhausted(last_error)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Classify a failed API call and return the delay before retrying.
+        
+        Args:
+            error: Exception raised by the API call
+            attempt: Zero-based attempt number
+            
+        Returns:
+            float: Seconds to wait before the next attempt
+            
+        Raises:
+            AuthenticationError: If the API key was rejected
+            OCRError: If the error is not worth retrying
+        """
+        if isinstance(error, openai.AuthenticationError):
+            raise AuthenticationError(f"API authentication failed: {error}")
+        
+        if isinstance(error, openai.APIStatusError):
+            if not is_retryable_status(error.status_code):
+                logger.error(f"OCR request rejected with status {error.status_code}: {error}")
+                raise OCRError(f"OCR operation failed: {error}")
+            
+            if error.status_code in THROTTLE_STATUS_CODES:
+                # A bad or huge Retry-After must not hold every caller indefinitely
+                retry_after = parse_retry_after(error.response.headers.get("retry-after"), self.max_retry_delay)
+                self.rate_limiter.on_throttle(retry_after)
+                if retry_after is not None:
+                    # The limiter holds every caller until the provider is ready
+                    return 0.0
+        elif not isinstance(error, openai.APIError):
+            logger.error(f"OCR service error: {error}")
+            raise OCRError(f"OCR service failed: {error}")
+        
+        # Connection errors, timeouts and transient server errors
+        return backoff_delay(attempt, self.retry_delay, self.max_retry_delay)
+    
+    def _raise_exhausted(self, last_error: Optional[Exception]) -> None:
+        """Raise the final error once all retry attempts are used up."""
+        logger.error(f"OCR failed after {self.max_retries} attempts: {last_error}")
+        if isinstance(last_error, EmptyResponseError):
+            raise last_error
+        if isinstance(last_error, openai.APITimeoutError):
+            raise OCRTimeoutError(f"OCR operation timed out: {last_error}")
+        raise OCRError(f"OCR operation failed: {last_error}")
+    
+    def _packer(self, pages_per_request: Optional[int] = None) -> BatchPacker:
+        group_size = pages_per_request or self.pages_per_request
+        if group_size:
+            return BatchPacker(self.max_tokens, group_size, fixed=True)
+        return BatchPacker(self.max_tokens, self.max_pages_per_request)
+    
+    def plan_requests(
+        self,
+        images: List[str],
+        pages_per_request: Optional[int] = None,
+        cached: Optional[List[Optional[str]]] = None
+    ) -> List[PageBatch]:
+        """Decide which pages go in which request, and each request's max_tokens.
+        
+        With a fixed ``pages_per_request`` pages are grouped that many at a
+        time. Otherwise the token-budget planner packs consecutive pages by
+        their estimated output so each request stays under ``max_tokens``.
+        Pages with a ``cached`` result are left out, and no batch spans one,
+        so results can be merged back in page order.
+        
+        Args:
+            images: List of base64 encoded images, in page order
+            pages_per_request: Fixed number of pages per request (0/None to plan)
+            cached: Cached text per page (None for pages to recognize)
+            
+        Returns:
+            List[PageBatch]: Requests covering every uncached page, in page order
+        """
+        packer = self._packer(pages_per_request)
+        batches = []
+        for index, image_b64 in enumerate(images):
+            if cached is not None and cached[index] is not None:
+                batches.append(packer.flush())
+                continue
+            estimate = 0 if packer.fixed else self.token_estimator.estimate(image_b64)
+            batches.append(packer.add(index, estimate, page_number(image_b64, index)))
+        batches.append(packer.flush())
+        return [batch for batch in batches if batch is not None]
+    
+    async def _recognize_batch(
+        self,
+        images: List[str],
+        batch: PageBatch,
+        semaphore: asyncio.Semaphore,
+        check_cache: bool = False
+    ) -> str:
+        """Recognize one planned batch, splitting it if the output overflows.
+        
+        When the model stops with ``finish_reason == "length"`` the batch is
+        split in two and only its halves are resubmitted, each with the full
+        token limit. A single page already at the limit is returned truncated.
+        """
+        batch_images = [images[i] for i in batch.indices]
+        async with semaphore:
+            try:
+                return await self.recognize_text(
+                    batch_images, max_tokens=batch.max_tokens, allow_truncated=False, check_cache=check_cache
+                )
+            except TruncatedOutputError as e:
+                if len(batch.indices) == 1 and batch.max_tokens >= self.max_tokens:
+                    logger.warning(f"Page {batch.pages[0]} output truncated at {self.max_tokens} tokens")
+                    return e.text
+        
+        parts = split_batch(batch, self.max_tokens)
+        logger.info(f"Output for pages {batch.pages} hit max_tokens; resubmitting as {[part.pages for part in parts]}")
+        results = await asyncio.gather(
+            *(self._recognize_batch(images, part, semaphore, check_cache) for part in parts)
+        )
+        return "\n\n".join(results)
+    
+    async def recognize_pages(
+        self,
+        images: List[str],
+        concurrency: Optional[int] = None,
+        pages_per_request: Optional[int] = None
+    ) -> str:
+        """Recognize a multi-page document with one request per page batch.
+        
+        Pages are first looked up in the result cache one by one; only the
+        misses are packed into batches by ``plan_requests``, so a page's
+        cached text is reused however the pages around it are batched. Each
+        batch is sent as its own chat completion, with at most
+        ``concurrency`` requests in flight. Results are merged back in page
+        order. Batches that fail are retried on their own, so a single bad
+        page does not force the whole document to be recognized again.
+        
+        Args:
+            images: List of base64 encoded images, in page order
+            concurrency: Maximum number of concurrent requests
+            pages_per_request: Fixed number of pages per request (None to plan)
+            
+        Returns:
+            str: Recognized text of all pages in Markdown + LaTeX format
+            
+        Raises:
+            OCRError: If any page batch still fails after retries
+        """
+        if not images:
+            raise OCRError("No images to recognize")
+        
+        concurrency = max(1, concurrency or self.max_concurrency)
+        cached: List[Optional[str]] = [None] * len(images)
+        if self.cache is not None:
+            cached = await run_blocking(self._cached_pages, images)
+        batches = self.plan_requests(images, pages_per_request, cached)
+        
+        logger.info(
+            f"Starting page-parallel OCR for {len(images)} pages "
+            f"({len(images) - len([text for text in cached if text is None])} cached, "
+            f"{len(batches)} requests, concurrency {concurrency})"
+        )
+        
+        with IN_FLIGHT.track(operation="ocr_document"), span("ocr_document"):
+            results = await self._recognize_planned(images, batches, asyncio.Semaphore(concurrency))
+        
+        # Cached pages and batch results, keyed by their first page
+        parts = {index: text for index, text in enumerate(cached) if text is not None}
+        parts.update({batch.indices[0]: text for batch, text in zip(batches, results)})
+        
+        logger.info(f"Page-parallel OCR completed for {len(images)} pages")
+        return "\n\n".join(parts[index] for index in sorted(parts))
+    
+    async def _recognize_planned(
+        self,
+        images: List[Optional[str]],
+        batches: List[PageBatch],
+        semaphore: asyncio.Semaphore,
+        rounds: Optional[int] = None
+    ) -> List[str]:
+        """Run planned page batches concurrently, retrying failed batches.
+        
+        Args:
+            images: Page images, indexed by the batches' page indices
+            batches: Batches to recognize
+            semaphore: Limits the number of concurrent requests
+            rounds: Attempts per batch (defaults to ``page_retries + 1``)
+            
+        Returns:
+            List[str]: Recognized text per batch, in batch order
+        """
+        rounds = self.page_retries + 1 if rounds is None else rounds
+        results: List[Optional[str]] = [None] * len(batches)
+        errors: Dict[int, Exception] = {}
+        pending = list(range(len(batches)))
+        
+        for round_num in range(rounds):
+            outcomes = await asyncio.gather(
+                *(self._recognize_batch(images, batches[i], semaphore) for i in pending),
+                return_exceptions=True
+            )
+            
+            failed = []
+            for index, outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    errors[index] = outcome
+                    failed.append(index)
+                else:
+                    results[index] = outcome
+                    errors.pop(index, None)
+            
+            if not failed:
+                break
+            
+            pending = failed
+            if round_num < rounds - 1:
+                logger.warning(f"Retrying failed pages: {[page for i in failed for page in batches[i].pages]}")
+        
+        if errors:
+            raise self._failed_pages_error(batches, errors)
+        
+        return results
+    
+    def _failed_pages_error(self, batches: List[PageBatch], errors: Dict[int, BaseException]) -> OCRError:
+        """Build the error reporting which pages could not be recognized."""
+        failed_pages = [page for index in sorted(errors) for page in batches[index].pages]
+        first_error = errors[min(errors)]
+        logger.error(f"OCR failed for pages {failed_pages}: {first_error}")
+        return OCRError(f"OCR failed for pages {failed_pages}: {first_error}")
+    
+    async def recognize_page_stream(
+        self,
+        pages: AsyncIterable[Union[str, PageText]],
+        concurrency: Optional[int] = None,
+        pages_per_request: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+        total_pages: Optional[int] = None
+    ) -> str:
+        """Recognize pages while they are still being produced.
+        
+        Runs the ``stream_pages`` pipeline without streaming any batch token
+        by token, and joins the text of its ``page`` events in page order.
+        
+        Args:
+            pages: Base64 encoded images or ``PageText``, in page order
+            concurrency: Maximum number of concurrent requests
+            pages_per_request: Fixed number of pages per request (None to pack by estimate)
+            progress: Called with the number of source pages newly finished
+                (see ``stream_pages``)
+            total_pages: Page count of the document, if known
+            
+        Returns:
+            str: Recognized text of all pages in Markdown + LaTeX format
+            
+        Raises:
+            OCRError: If there are no pages or a batch still fails after retries
+        """
+        texts = []
+        async for event in self.stream_pages(
+            pages, concurrency, pages_per_request, progress=progress, total_pages=total_pages, stream_first=False
+        ):
+            texts.append(event["text"])
+        
+        logger.info(f"Pipelined OCR completed for {len(texts)} items")
+        return "\n\n".join(texts)
+    
+    async def stream_pages(
+        self,
+        pages: Union[Sequence[str], AsyncIterable[Union[str, PageText]]],
+        concurrency: Optional[int] = None,
+        pages_per_request: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+        total_pages: Optional[int] = None,
+        stream_first: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Recognize pages while they are produced, reporting results in page order.
+        
+        Pages found in the result cache are used as they are; the others
+        are packed into batches as they arrive (see ``BatchPacker``) and each
+        batch is sent as soon as it is closed, so the first request is on the
+        network while later pages are still rendering. At most
+        ``2 * concurrency`` batches are queued or in flight; beyond that
+        `pages` is not read from, which bounds how many rendered pages are
+        held in memory. Pages are released once their batch is recognized.
+        ``PageText`` items (text read from a PDF's text layer) and cached
+        pages close the current batch and are reported as they are, in order.
+        
+        Failed batches are retried on their own and batches whose output
+        hits ``max_tokens`` are split, as in ``recognize_pages``. Requests
+        hold their concurrency slot only while they run, never while the
+        caller is handling an event.
+        
+        Progress is counted in source pages (see ``PageProgress``): a page
+        split into question blocks is finished once all of its blocks are,
+        and skipped pages count as finished along with the next page.
+        
+        With `stream_first`, the first batch is streamed token by token. If
+        that stream fails or is cut off, the batch is recognized again
+        without streaming; its ``page`` event carries the final text, which
+        replaces the deltas.
+        
+        Args:
+            pages: Base64 encoded images or ``PageText``, in page order
+            concurrency: Maximum number of concurrent requests
+            pages_per_request: Fixed number of pages per request (None to pack by estimate)
+            progress: Called with the number of source pages newly finished,
+                as batches are recognized (in any order)
+            total_pages: Page count of the document, so that skipped pages
+                at its end are counted and ``page`` events carry a total
+            stream_first: Stream the first batch as ``delta`` events
+            
+        Yields:
+            Dict[str, Any]: ``{"type": "delta", "index", "text"}`` for streamed
+            chunks of the first batch and ``{"type": "page", "index", "pages",
+            "text", "completed", "total"}`` for each batch or text item, in
+            page order. ``pages`` are its source pages, ``completed`` counts
+            the pages reported so far and ``total`` is `total_pages` (without
+            it, the last page read, or None until every page has been read)
+            
+        Raises:
+            OCRError: If there are no pages or a batch still fails after retries
+        """
+        source = pages if isinstance(pages, AsyncIterable) else iterate(pages)
+        concurrency = max(1, concurrency or self.max_concurrency)
+        packer = self._packer(pages_per_request)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        slots = asyncio.Semaphore(2 * concurrency)
+        images: List[Optional[str]] = []
+        # (batch, its text, whether it streams) per item to report, in order;
+        # None once the reader has stopped
+        entries: "asyncio.Queue[Optional[Tuple[PageBatch, asyncio.Future[str], bool]]]" = asyncio.Queue()
+        # Chunks of the streamed batch; None once its stream has ended
+        deltas: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        tasks: List["asyncio.Future[str]"] = []
+        planned = 0
+        read_all = False
+        stream_next = stream_first
+        # Pages finished by recognition (any order) and by what has been reported (page order)
+        finished = PageProgress(progress)
+        reported_pages = PageProgress()
+        
+        def release(batch: PageBatch) -> None:
+            for index in batch.indices:
+                images[index] = None
+            finished.finish(batch.page_numbers)
+        
+        async def recognize(batch: PageBatch) -> str:
+            try:
+                text = (await self._recognize_planned(images, [batch], semaphore))[0]
+            finally:
+                slots.release()
+            release(batch)
+            return text
+        
+        async def stream(batch: PageBatch) -> str:
+            try:
+                chunks: List[str] = []
+                try:
+                    async with semaphore:
+                        async for delta in self.stream_text(
+                            [images[i] for i in batch.indices], max_tokens=self.max_tokens, allow_truncated=False
+                        ):
+                            chunks.append(delta)
+                            deltas.put_nowait(delta)
+                    text = "".join(chunks).strip()
+                except TruncatedOutputError as e:
+                    if len(batch.indices) == 1:
+                        logger.warning(f"Page {batch.pages[0]} output truncated at {self.max_tokens} tokens")
+                        text = e.text
+                    else:
+                        parts = split_batch(batch, self.max_tokens)
+                        logger.info(f"Output for pages {batch.pages} hit max_tokens; resubmitting as {[part.pages for part in parts]}")
+                        text = "\n\n".join(await self._recognize_planned(images, parts, semaphore))
+                except Exception as e:
+                    if not self.page_retries:
+                        raise self._failed_pages_error([batch], {0: e})
+                    logger.warning(f"Streaming pages {batch.pages} failed ({e}); retrying without streaming")
+                    text = (await self._recognize_planned(images, [batch], semaphore, rounds=self.page_retries))[0]
+            finally:
+                deltas.put_nowait(None)
+                slots.release()
+            release(batch)
+            return text
+        
+        async def dispatch(batch: Optional[PageBatch]) -> None:
+            nonlocal planned, stream_next
+            if batch is None:
+                return
+            await slots.acquire()
+            streamed, stream_next = stream_next, False
+            task = asyncio.create_task(stream(batch) if streamed else recognize(batch))
+            tasks.append(task)
+            entries.put_nowait((batch, task, streamed))
+            planned += 1
+        
+        def report_text(text: str, page: int) -> None:
+            nonlocal planned
+            done: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+            done.set_result(text)
+            entries.put_nowait((PageBatch(indices=[], max_tokens=0, page_numbers=[page]), done, False))
+            planned += 1
+            finished.finish([page])
+        
+        async def read() -> None:
+            nonlocal read_all
+            position = 0
+            try:
+                async for page in source:
+                    number = page_number(page, position)
+                    position += 1
+                    finished.read(number)
+                    reported_pages.read(number)
+                    text = page.text if isinstance(page, PageText) else None
+                    if text is None and self.cache is not None:
+                        text = (await run_blocking(self._cached_pages, [page]))[0]
+                    if text is not None:
+                        # Keep the text between the batches before and after it
+                        await dispatch(packer.flush())
+                        report_text(text, number)
+                        continue
+                    images.append(page)
+                    await dispatch(packer.add(len(images) - 1, self.token_estimator.estimate(page), number))
+                await dispatch(packer.flush())
+                read_all = True
+                finished.close(total_pages)
+                reported_pages.close(total_pages)
+                logger.info(f"All {len(images)} pages read; {planned} items to report")
+            finally:
+                entries.put_nowait(None)
+                close = getattr(source, "aclose", None)
+                if close is not None:
+                    await close()
+        
+        async def result_of(done: "asyncio.Future[str]") -> str:
+            # A page that fails to render ends the stream without waiting for the batches before it
+            if not reader.done():
+                await asyncio.wait((done, reader), return_when=asyncio.FIRST_COMPLETED)
+            if reader.done() and reader.exception() is not None:
+                raise reader.exception()
+            return await done
+        
+        with IN_FLIGHT.track(operation="ocr_document"), span("ocr_document"):
+            reader = asyncio.create_task(read())
+            reported = 0
+            try:
+                while True:
+                    entry = await entries.get()
+                    if entry is None:
+                        break
+                    batch, done, streamed = entry
+                    while streamed:
+                        delta = await deltas.get()
+                        if delta is None:
+                            break
+                        yield {"type": "delta", "index": reported, "text": delta}
+                    text = await result_of(done)
+                    reported += 1
+                    reported_pages.finish(batch.page_numbers)
+                    yield {
+                        "type": "page",
+                        "index": reported - 1,
+                        "pages": batch.pages,
+                        "text": text,
+                        "completed": reported_pages.done,
+                        "total": total_pages or (reported_pages.last if read_all else None)
+                    }
+                await reader
+            finally:
+                for task in (reader, *tasks):
+                    task.cancel()
+                await asyncio.gather(reader, *tasks, return_exceptions=True)
+        
+        if not reported:
+            raise OCRError("No images to recognize")
     
     def get_service_info(self) -> Dict[str, Any]:
         """Get information about the OCR service.
@@ -156,18 +906,127 @@ class OCRService:
             Dict[str, Any]: Service information
         """
         return {
-            "api_provider": "SiliconFlow",
+            "api_provider": self.backend.provider,
+            "backend": self.backend.info(),
             "model": self.model,
             "max_retries": self.max_retries,
             "retry_delay": self.retry_delay,
+            "max_retry_delay": self.max_retry_delay,
+            "rate_limit": self.rate_limiter.stats(),
+            "max_concurrency": self.max_concurrency,
+            "pages_per_request": self.pages_per_request,
+            "max_pages_per_request": self.max_pages_per_request,
+            "max_tokens": self.max_tokens,
+            "token_estimator": self.token_estimator.stats(),
+            "hedging": {
+                "enabled": self.hedging,
+                "percentile": self.hedge_percentile,
+                "hedge_after": self.latency_tracker.percentile(self.hedge_percentile),
+                **self.hedge_budget.stats()
+            },
+            "cache": self.cache.stats() if self.cache is not None else None,
             "supported_formats": ["pdf", "jpg", "jpeg", "png"],
             "output_format": "markdown_with_latex"
         }
+    
+    async def close(self) -> None:
+        """Close the backend and its HTTP connection pool."""
+        await self.backend.close()
+        logger.info("OCR service backend closed")
+
+
+# Leading base64 characters of each image format's magic bytes
+BASE64_SIGNATURES = (
+    ("/9j/", "image/jpeg"),
+    ("iVBORw0KGgo", "image/png"),
+    ("UklGR", "image/webp"),
+    ("R0lGOD", "image/gif"),
+)
+
+
+def image_mime_type(image_b64: str) -> str:
+    """MIME type of a base64 encoded image, sniffed from its first bytes.
+    
+    Falls back to image/png for unrecognized data.
+    """
+    for prefix, mime_type in BASE64_SIGNATURES:
+        if image_b64.startswith(prefix):
+            return mime_type
+    return "image/png"
+
+
+async def iterate(items: Sequence[str]) -> AsyncIterator[str]:
+    """Yield the items of a sequence as an async iterator."""
+    for item in items:
+        yield item
+
+
+def split_pages(text: str, pages: int) -> Tuple[Optional[List[str]], str]:
+    """Split a model answer on ``PAGE_SEPARATOR``.
+    
+    Args:
+        text: Answer for a request of `pages` images
+        pages: Number of images in the request
+        
+    Returns:
+        Tuple[Optional[List[str]], str]: Text of each page (None unless the
+        answer has exactly one non-empty part per page), and the answer with
+        the separators removed
+    """
+    parts = [part.strip() for part in text.split(PAGE_SEPARATOR)]
+    joined = "\n\n".join(part for part in parts if part)
+    if parts and not parts[-1]:
+        # Separator after the last page too
+        parts.pop()
+    if len(parts) != pages or not all(parts):
+        return None, joined
+    return parts, joined
+
+
+def completion_text(response: Any) -> str:
+    """Stripped text of a chat completion.
+    
+    Raises:
+        EmptyResponseError: If the completion has no choices or no text
+    """
+    if not response.choices or not response.choices[0].message.content:
+        raise EmptyResponseError("OCR API returned empty response")
+    
+    result = response.choices[0].message.content.strip()
+    if not result:
+        raise EmptyResponseError("OCR API returned empty content")
+    return result
+
+
+def error_label(error: BaseException) -> str:
+    """Short, low-cardinality label for a failed API call, used in metrics."""
+    if isinstance(error, openai.APIStatusError):
+        return str(error.status_code)
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, EmptyResponseError):
+        return "empty"
+    return "error"
+
+
+def content_bytes(image_content: List[Dict[str, Any]]) -> int:
+    """Size of the image data URLs in a chat message content list."""
+    return sum(len(part["image_url"]["url"]) for part in image_content if part.get("type") == "image_url")
+
+
+# Process-wide OCR service, shared by all requests
+_shared_service: Optional[OCRService] = None
 
 
 # Helper function to create OCR service instance
 async def create_ocr_service() -> OCRService:
-    """Create and return OCR service instance.
+    """Return the process-wide OCR service, creating it on first use.
+    
+    The service and its HTTP connection pool are created once and reused
+    across requests, so connections stay warm between calls. Servers should
+    call this at startup and ``close_ocr_service`` on shutdown.
     
     Returns:
         OCRService: Configured OCR service
@@ -175,7 +1034,21 @@ async def create_ocr_service() -> OCRService:
     Raises:
         ValidationError: If configuration is invalid
     """
-    return OCRService()
+    global _shared_service
+    
+    if _shared_service is None:
+        _shared_service = OCRService()
+        logger.info(f"Created shared OCR service ({_shared_service.backend.name} backend)")
+    return _shared_service
+
+
+async def close_ocr_service() -> None:
+    """Close the process-wide OCR service, if it was created."""
+    global _shared_service
+    
+    if _shared_service is not None:
+        service, _shared_service = _shared_service, None
+        await service.close()
 
 
 def save_ocr_result_to_markdown(ocr_result: str, file_path: str, output_dir: str = "output") -> str:
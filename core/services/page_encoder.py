@@ -0,0 +1,302 @@
+import base64
+import math
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageChops, features
+
+from core.services.page_filter import PageSignature
+from core.utils.logger import setup_logger
+from core.utils.metrics import PAGE_BYTES_SAVED, PAGE_ENCODED_BYTES
+from core.utils.validators import ValidationError
+
+logger = setup_logger("page_encoder")
+
+LOSSLESS_FORMATS = ("PNG",)
+LOSSY_FORMATS = ("JPEG", "WEBP")
+
+# WebP encoder effort (0-6): 2 is within a few percent of the default's size
+# at a third of its encode time
+WEBP_METHOD = 2
+
+
+@dataclass
+class EncodePolicy:
+    """How rendered PDF pages are encoded for the OCR request.
+
+    Exam pages are black text on white paper, so by default pages are
+    rendered in grayscale and encoded as the smallest of the candidate
+    `formats`. Lossy formats are tried at each of `qualities` (lowest
+    first, by bisection) and only count if the decoded image stays at or
+    above `min_psnr` dB against the rendered page. With `binarize`, pages
+    are first reduced to pure black and white (Otsu threshold) and the
+    binarized page becomes the fidelity reference.
+    """
+
+    formats: Tuple[str, ...] = ("PNG", "JPEG", "WEBP")
+    grayscale: bool = True
+    binarize: bool = False
+    min_psnr: float = 40.0
+    qualities: Tuple[int, ...] = (40, 50, 60, 70, 80, 90)
+
+    @classmethod
+    def from_env(cls) -> "EncodePolicy":
+        """Build a policy from OCR_PAGE_FORMATS, OCR_PAGE_GRAYSCALE, OCR_PAGE_BINARIZE and OCR_MIN_PSNR.
+
+        Raises:
+            ValidationError: If OCR_PAGE_FORMATS names an unknown format
+        """
+        return cls(
+            formats=parse_formats(os.getenv("OCR_PAGE_FORMATS", "PNG,JPEG,WEBP")),
+            grayscale=os.getenv("OCR_PAGE_GRAYSCALE", "true").lower() == "true",
+            binarize=os.getenv("OCR_PAGE_BINARIZE", "false").lower() == "true",
+            min_psnr=float(os.getenv("OCR_MIN_PSNR", "40"))
+        )
+
+    @classmethod
+    def fixed(cls, format: str, quality: int = 90) -> "EncodePolicy":
+        """Policy for one explicit format: full color, no search."""
+        return cls(formats=parse_formats(format), grayscale=False, qualities=(quality,), min_psnr=0.0)
+
+    @property
+    def is_fixed(self) -> bool:
+        return len(self.formats) == 1 and not self.grayscale and not self.binarize
+
+
+@dataclass
+class EncodedPage:
+    """One encoded page (or question block of a page) and what it cost compared with lossless PNG."""
+
+    data: str
+    format: str
+    size: int
+    png_size: int
+    quality: Optional[int] = None
+    psnr: Optional[float] = None
+    signature: Optional[PageSignature] = None
+    block: int = 0
+    blocks: int = 1
+    # One-based page number in the document (0: not known)
+    page: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes saved against a PNG of the same render."""
+        return max(0, self.png_size - self.size)
+
+
+class PageImage(str):
+    """A base64 encoded page image (or question block) that knows which page it came from.
+
+    Behaves as the base64 string itself, so it can go anywhere a page image
+    can; ``page`` is the one-based page number in the source document.
+    """
+
+    page: int
+
+    def __new__(cls, data: str, page: int) -> "PageImage":
+        image = super().__new__(cls, data)
+        image.page = page
+        return image
+
+
+def parse_formats(value: str) -> Tuple[str, ...]:
+    """Parse a comma separated list of image formats ("JPG" is accepted for JPEG).
+
+    Raises:
+        ValidationError: If a format is not supported
+    """
+    formats = []
+    for name in value.split(","):
+        name = name.strip().upper()
+        if not name:
+            continue
+        name = "JPEG" if name == "JPG" else name
+        if name not in LOSSLESS_FORMATS + LOSSY_FORMATS:
+            raise ValidationError(f"Unsupported page format: {name}")
+        if name == "WEBP" and not features.check("webp"):
+            logger.warning("Pillow was built without WebP support; skipping WEBP")
+            continue
+        if name not in formats:
+            formats.append(name)
+    if not formats:
+        raise ValidationError(f"No usable page formats in {value!r}")
+    return tuple(formats)
+
+
+def otsu_threshold(histogram: Sequence[int]) -> int:
+    """Grey level separating ink from paper, maximizing between-class variance."""
+    total = sum(histogram)
+    total_sum = sum(level * count for level, count in enumerate(histogram))
+    background = background_sum = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (total_sum - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def binarize(image: Image.Image) -> Image.Image:
+    """Reduce a page to pure black and white (still mode L, 0 or 255)."""
+    gray = image.convert("L")
+    threshold = otsu_threshold(gray.histogram())
+    return gray.point(lambda value: 255 if value > threshold else 0)
+
+
+def psnr(reference: Image.Image, data: bytes) -> float:
+    """Peak signal-to-noise ratio in dB of encoded `data` against `reference`."""
+    with Image.open(BytesIO(data)) as decoded:
+        decoded = decoded.convert(reference.mode)
+    histogram = ImageChops.difference(reference, decoded).histogram()
+    bands = len(reference.getbands())
+    squared_error = sum(count * (index % 256) ** 2 for index, count in enumerate(histogram))
+    mse = squared_error / (reference.width * reference.height * bands)
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+def _encode(image: Image.Image, format: str, quality: int) -> bytes:
+    buffer = BytesIO()
+    if format == "WEBP":
+        image.save(buffer, "WEBP", quality=quality, method=WEBP_METHOD)
+    else:
+        image.save(buffer, format, quality=quality)
+    return buffer.getvalue()
+
+
+def _search_quality(
+    image: Image.Image,
+    format: str,
+    policy: EncodePolicy,
+    size_limit: int
+) -> Optional[Tuple[bytes, int, float]]:
+    """Lowest quality of `format` meeting the fidelity threshold.
+
+    Returns:
+        Optional[Tuple[bytes, int, float]]: (data, quality, psnr), or None if
+        no quality passes or the passing encoding is not under `size_limit`
+    """
+    qualities = sorted(policy.qualities)
+    low, high = 0, len(qualities) - 1
+    best = None
+    while low <= high:
+        middle = (low + high) // 2
+        data = _encode(image, format, qualities[middle])
+        if len(data) >= size_limit:
+            # Higher qualities only get bigger
+            high = middle - 1
+            continue
+        score = psnr(image, data)
+        if score >= policy.min_psnr:
+            best = (data, qualities[middle], score)
+            high = middle - 1
+        else:
+            low = middle + 1
+    return best
+
+
+def pixmap_image(pix: fitz.Pixmap) -> Image.Image:
+    """Wrap a gray or RGB pixmap's samples in a PIL Image."""
+    if pix.alpha or pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix, 0)
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+
+def encode_page(pix: fitz.Pixmap, policy: EncodePolicy) -> EncodedPage:
+    """Encode a rendered page as the smallest candidate meeting the policy.
+
+    Lossless PNG is always encoded, as the baseline for the savings report
+    and as the fallback when no lossy encoding is faithful enough.
+
+    Args:
+        pix: Rendered page
+        policy: Encoding policy
+
+    Returns:
+        EncodedPage: Chosen encoding
+    """
+    if policy.is_fixed:
+        # Explicit format: encode once, without measuring
+        format, quality = policy.formats[0], policy.qualities[0]
+        if format == "PNG":
+            data, quality = pix.tobytes("png"), None
+        elif format == "JPEG":
+            data = pix.tobytes("jpeg", jpg_quality=quality)
+        else:
+            data = _encode(pixmap_image(pix), format, quality)
+        return EncodedPage(
+            data=base64.b64encode(data).decode("utf-8"),
+            format=format,
+            size=len(data),
+            png_size=len(data),
+            quality=quality
+        )
+
+    image = pixmap_image(pix)
+    if policy.binarize:
+        image = binarize(image)
+        # 1-bit PNG
+        buffer = BytesIO()
+        image.convert("1").save(buffer, "PNG")
+        png = buffer.getvalue()
+    else:
+        png = pix.tobytes("png")
+
+    best_data, best_format, best_quality, best_psnr = png, "PNG", None, math.inf
+    for format in policy.formats:
+        if format not in LOSSY_FORMATS:
+            continue
+        found = _search_quality(image, format, policy, size_limit=len(best_data))
+        if found is not None:
+            best_data, best_quality, best_psnr = found
+            best_format = format
+
+    return EncodedPage(
+        data=base64.b64encode(best_data).decode("utf-8"),
+        format=best_format,
+        size=len(best_data),
+        png_size=len(png),
+        quality=best_quality,
+        psnr=best_psnr
+    )
+
+
+def record_page(page: EncodedPage, source: str, page_num: int) -> None:
+    """Count a page's encoded bytes and savings, and log them.
+
+    Args:
+        page: Encoded page
+        source: Name of the document, for the log
+        page_num: One-based page number
+    """
+    PAGE_ENCODED_BYTES.inc(page.size, format=page.format)
+    PAGE_BYTES_SAVED.inc(page.bytes_saved)
+    quality = f" q={page.quality}" if page.quality is not None else ""
+    logger.debug(
+        f"{source} page {page_num}: {page.format}{quality} {page.size / 1024:.0f} KB "
+        f"(PNG {page.png_size / 1024:.0f} KB, saved {page.bytes_saved / 1024:.0f} KB)"
+    )
+
+
+def log_savings(source: str, pages: int, total: int, saved: int) -> None:
+    """Log how much smaller a document's pages were than PNG."""
+    if saved:
+        logger.info(
+            f"Encoded {pages} pages of {source}: {total / 1024:.0f} KB, "
+            f"saved {saved / 1024:.0f} KB ({saved / (total + saved):.0%}) against PNG"
+        )
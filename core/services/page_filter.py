@@ -0,0 +1,182 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageChops
+
+from core.services.resolution import INK_THRESHOLD
+from core.utils.logger import setup_logger
+from core.utils.metrics import PAGES_SKIPPED
+
+logger = setup_logger("page_filter")
+
+# Difference hash grid: HASH_SIZE x HASH_SIZE bits
+HASH_SIZE = 16
+
+# Grayscale thumbnail compared pixel by pixel to confirm a hash match
+THUMBNAIL_SIZE = (96, 128)
+
+# Thumbnail grey levels below which a pixel holds some ink, and the change in
+# grey level that counts as a real difference rather than resampling noise
+THUMBNAIL_INK = 192
+STRONG_DIFFERENCE = 48
+
+
+@dataclass
+class PageSignature:
+    """Cheap fingerprint of a rendered page."""
+
+    dhash: int
+    ink_ratio: float
+    thumbnail: bytes
+
+
+def page_signature(pix: fitz.Pixmap) -> PageSignature:
+    """Compute a page's perceptual hash, ink coverage and thumbnail.
+
+    The difference hash compares each cell of a (HASH_SIZE + 1) x HASH_SIZE
+    grayscale thumbnail with its right neighbour, so it survives small
+    changes in resolution, compression and scanner noise. Ink coverage is
+    the fraction of pixels darker than INK_THRESHOLD.
+
+    Args:
+        pix: Rendered page
+
+    Returns:
+        PageSignature: Page fingerprint
+    """
+    if pix.n != 1 or pix.alpha:
+        pix = fitz.Pixmap(fitz.Pixmap(fitz.csGRAY, pix), 0)
+    gray = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    ink_ratio = sum(gray.histogram()[:INK_THRESHOLD]) / max(1, gray.width * gray.height)
+
+    grid = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX).tobytes()
+    dhash = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            dhash = (dhash << 1) | (grid[offset + col] > grid[offset + col + 1])
+
+    thumbnail = gray.resize(THUMBNAIL_SIZE, Image.BOX).tobytes()
+    return PageSignature(dhash=dhash, ink_ratio=ink_ratio, thumbnail=thumbnail)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def thumbnail_difference(a: bytes, b: bytes) -> float:
+    """Share of two thumbnails' ink that differs between them.
+
+    Counts pixels whose grey levels differ by at least STRONG_DIFFERENCE,
+    relative to the inked pixels of the darker thumbnail. Resampling and
+    compression noise stay below that level, so a page rendered at another
+    zoom scores 0.0, while changing one character on a sparse page scores
+    about 0.1.
+    """
+    first = Image.frombytes("L", THUMBNAIL_SIZE, a)
+    second = Image.frombytes("L", THUMBNAIL_SIZE, b)
+    differing = sum(ImageChops.difference(first, second).histogram()[STRONG_DIFFERENCE:])
+    ink = max(sum(image.histogram()[:THUMBNAIL_INK]) for image in (first, second))
+    return differing / ink if ink else 0.0
+
+
+class PageFilter:
+    """Skip blank pages and near-duplicates of pages already kept.
+
+    One filter is used per document. A page is blank when its ink coverage
+    is below `blank_ink_ratio`. A page is a near-duplicate of an earlier
+    kept page when their hashes differ in at most `max_distance` bits and
+    their thumbnails differ by at most `max_difference` (see
+    ``thumbnail_difference``); the earlier page's OCR result stands for
+    both, so its text appears once.
+
+    Configured through OCR_SKIP_BLANK_PAGES, OCR_BLANK_INK_RATIO,
+    OCR_DEDUPLICATE_PAGES and OCR_DUPLICATE_DISTANCE.
+    """
+
+    def __init__(
+        self,
+        skip_blank: bool = True,
+        deduplicate: bool = True,
+        blank_ink_ratio: float = 0.0005,
+        max_distance: int = 12,
+        max_difference: float = 0.05
+    ):
+        self.skip_blank = skip_blank
+        self.deduplicate = deduplicate
+        self.blank_ink_ratio = blank_ink_ratio
+        self.max_distance = max_distance
+        self.max_difference = max_difference
+        self.pages = 0
+        self.blank_pages: List[int] = []
+        self.duplicate_pages: Dict[int, int] = {}
+        self._kept: List[Tuple[int, PageSignature]] = []
+
+    @classmethod
+    def from_env(cls) -> "PageFilter":
+        return cls(
+            skip_blank=os.getenv("OCR_SKIP_BLANK_PAGES", "true").lower() == "true",
+            deduplicate=os.getenv("OCR_DEDUPLICATE_PAGES", "true").lower() == "true",
+            blank_ink_ratio=float(os.getenv("OCR_BLANK_INK_RATIO", "0.0005")),
+            max_distance=int(os.getenv("OCR_DUPLICATE_DISTANCE", "12"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether pages need signatures at all."""
+        return self.skip_blank or self.deduplicate
+
+    def _find_duplicate(self, signature: PageSignature) -> Optional[int]:
+        for page_num, kept in self._kept:
+            if hamming(kept.dhash, signature.dhash) > self.max_distance:
+                continue
+            if thumbnail_difference(kept.thumbnail, signature.thumbnail) <= self.max_difference:
+                return page_num
+        return None
+
+    def check(self, signature: Optional[PageSignature]) -> bool:
+        """Decide whether the next page of the document should be OCR'd.
+
+        Args:
+            signature: The page's signature (None keeps the page)
+
+        Returns:
+            bool: True to keep the page, False to skip it
+        """
+        self.pages += 1
+        page_num = self.pages
+        if signature is None:
+            return True
+
+        if self.skip_blank and signature.ink_ratio < self.blank_ink_ratio:
+            self.blank_pages.append(page_num)
+            PAGES_SKIPPED.inc(reason="blank")
+            logger.info(f"Skipping blank page {page_num} (ink {signature.ink_ratio:.3%})")
+            return False
+
+        if self.deduplicate:
+            original = self._find_duplicate(signature)
+            if original is not None:
+                self.duplicate_pages[page_num] = original
+                PAGES_SKIPPED.inc(reason="duplicate")
+                logger.info(f"Skipping page {page_num}: duplicate of page {original}")
+                return False
+
+        self._kept.append((page_num, signature))
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get what was skipped, with one-based page numbers.
+
+        Returns:
+            Dict[str, Any]: Skipped page counts and numbers
+        """
+        return {
+            "blank_pages_skipped": len(self.blank_pages),
+            "duplicate_pages_skipped": len(self.duplicate_pages),
+            "blank_pages": list(self.blank_pages),
+            "duplicate_pages": {str(page): original for page, original in self.duplicate_pages.items()}
+        }
@@ -0,0 +1,242 @@
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from core.utils.logger import setup_logger
+
+logger = setup_logger("page_planner")
+
+
+@dataclass
+class PageBatch:
+    """A run of consecutive pages sent in one OCR request.
+
+    `indices` are positions in the list of images being recognized. When
+    pages are split into question blocks several images come from one page,
+    so the source page of each image is kept in `page_numbers`.
+    """
+
+    indices: List[int]
+    max_tokens: int
+    estimated_tokens: int = 0
+    page_numbers: List[int] = field(default_factory=list)
+
+    @property
+    def pages(self) -> List[int]:
+        """One-based numbers of the source pages in this batch, each listed once."""
+        if self.page_numbers:
+            return sorted(set(self.page_numbers))
+        return [index + 1 for index in self.indices]
+
+
+def page_number(image: Any, index: int) -> int:
+    """Source page number of an image (``PageImage.page``), or `index` + 1 if it does not carry one."""
+    return getattr(image, "page", 0) or index + 1
+
+
+class PageProgress:
+    """Count the source pages whose items have all finished.
+
+    Items (page images, question blocks, text) are read in page order but
+    may finish in any order, and one page can have several. A page is done
+    once every item read from it has finished and reading has moved past
+    it, so no more items can come from it. Pages skipped before a done page
+    (blank or duplicate pages) are done with it.
+
+    Args:
+        callback: Called with the number of pages newly done
+    """
+
+    def __init__(self, callback: Optional[Callable[[int], None]] = None):
+        self.callback = callback
+        self.done = 0
+        self.last = 0
+        self._read_through = 0
+        self._pending: Dict[int, int] = {}
+
+    def read(self, page: int) -> None:
+        """Record an item read from `page`."""
+        self._pending[page] = self._pending.get(page, 0) + 1
+        self.last = max(self.last, page)
+        self._advance(page - 1)
+
+    def finish(self, pages: List[int]) -> None:
+        """Record finished items, given the page each one came from."""
+        for page in pages:
+            self._pending[page] -= 1
+            if not self._pending[page]:
+                del self._pending[page]
+        self._advance(self._read_through)
+
+    def close(self, total: Optional[int] = None) -> None:
+        """Record that every item has been read (`total`: page count of the document)."""
+        self._advance(max(self.last, total or 0))
+
+    def _advance(self, read_through: int) -> None:
+        self._read_through = max(self._read_through, read_through)
+        done = self._read_through
+        if self._pending:
+            done = min(done, min(self._pending) - 1)
+        if done > self.done:
+            newly_done, self.done = done - self.done, done
+            if self.callback is not None:
+                self.callback(newly_done)
+
+
+def image_size_kb(image_b64: str) -> float:
+    """Size of the decoded image in KB, computed from the base64 length."""
+    padding = image_b64[-2:].count("=") if image_b64 else 0
+    return max(0, len(image_b64) * 3 // 4 - padding) / 1024
+
+
+class TokenEstimator:
+    """Estimate OCR output tokens for a page from its encoded image size.
+
+    Compressed page images grow with the amount of ink on the page, so the
+    encoded size is a cheap proxy for how much text the model will write.
+    The tokens-per-KB ratio starts from a prior and is refined with an
+    exponential moving average of the usage reported by completed requests.
+    """
+
+    def __init__(
+        self,
+        tokens_per_kb: float = 8.0,
+        min_tokens: int = 64,
+        smoothing: float = 0.2
+    ):
+        self.tokens_per_kb = tokens_per_kb
+        self.min_tokens = min_tokens
+        self.smoothing = smoothing
+        self.observations = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, image_b64: str) -> int:
+        """Estimate output tokens for one base64 page image."""
+        return max(self.min_tokens, int(image_size_kb(image_b64) * self.tokens_per_kb))
+
+    def observe(self, images: List[str], completion_tokens: int) -> None:
+        """Update the ratio from a completed request's output token count."""
+        total_kb = sum(image_size_kb(image_b64) for image_b64 in images)
+        if total_kb <= 0 or completion_tokens <= 0:
+            return
+
+        ratio = completion_tokens / total_kb
+        with self._lock:
+            if self.observations == 0:
+                self.tokens_per_kb = ratio
+            else:
+                self.tokens_per_kb += self.smoothing * (ratio - self.tokens_per_kb)
+            self.observations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current estimation ratio.
+
+        Returns:
+            Dict[str, Any]: Estimator statistics
+        """
+        return {
+            "tokens_per_kb": round(self.tokens_per_kb, 3),
+            "observations": self.observations
+        }
+
+
+class BatchPacker:
+    """Pack pages into batches one page at a time, as they become available.
+
+    Pages are added in order to the current batch until the padded estimate
+    would exceed `max_tokens` or the batch holds `max_pages` pages. Each batch
+    gets its own `max_tokens`, sized to its padded estimate. A page estimated
+    above the limit is sent on its own with the full limit. With `fixed`,
+    estimates are ignored: every batch holds `max_pages` pages and gets the
+    full limit.
+
+    Args:
+        max_tokens: Largest `max_tokens` allowed for a single request
+        max_pages: Largest number of pages in a single request
+        safety_margin: Multiplier applied to estimates before packing
+        min_request_tokens: Smallest `max_tokens` given to a request
+        fixed: Group exactly `max_pages` pages per batch
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        max_pages: int = 4,
+        safety_margin: float = 1.25,
+        min_request_tokens: int = 256,
+        fixed: bool = False
+    ):
+        self.max_tokens = max_tokens
+        self.max_pages = max(1, max_pages)
+        self.safety_margin = safety_margin
+        self.min_request_tokens = min_request_tokens
+        self.fixed = fixed
+        self._current: List[int] = []
+        self._current_pages: List[int] = []
+        self._current_tokens = 0.0
+
+    def add(self, index: int, estimate: int = 0, page: Optional[int] = None) -> Optional[PageBatch]:
+        """Add the next page (`page`: its source page number, default `index` + 1).
+
+        Returns:
+            Optional[PageBatch]: The batch closed by this page, if any: either
+            the previous batch (the page did not fit and starts the next one)
+            or the batch this page filled
+        """
+        padded = 0.0 if self.fixed else estimate * self.safety_margin
+        closed = None
+        if self._current and (
+            self._current_tokens + padded > self.max_tokens or len(self._current) >= self.max_pages
+        ):
+            closed = self.flush()
+        self._current.append(index)
+        self._current_pages.append(page or index + 1)
+        self._current_tokens += padded
+        if closed is None and len(self._current) >= self.max_pages:
+            # Full: close now rather than when the next page shows up
+            closed = self.flush()
+        return closed
+
+    def flush(self) -> Optional[PageBatch]:
+        """Close the current batch.
+
+        Returns:
+            Optional[PageBatch]: The batch, or None if no pages are pending
+        """
+        if not self._current:
+            return None
+        if self.fixed:
+            budget = self.max_tokens
+        else:
+            budget = min(self.max_tokens, max(self.min_request_tokens, math.ceil(self._current_tokens)))
+        batch = PageBatch(
+            indices=self._current,
+            max_tokens=budget,
+            estimated_tokens=int(self._current_tokens),
+            page_numbers=self._current_pages
+        )
+        self._current, self._current_pages, self._current_tokens = [], [], 0.0
+        return batch
+
+
+def split_batch(batch: PageBatch, max_tokens: int) -> List[PageBatch]:
+    """Split a truncated batch in two, giving each half the full limit.
+
+    Returns:
+        List[PageBatch]: Two halves, or the single page with `max_tokens`
+        if the batch cannot be split further
+    """
+    if len(batch.indices) == 1:
+        return [PageBatch(
+            indices=list(batch.indices),
+            max_tokens=max_tokens,
+            estimated_tokens=batch.estimated_tokens,
+            page_numbers=list(batch.page_numbers)
+        )]
+
+    middle = len(batch.indices) // 2
+    return [
+        PageBatch(indices=batch.indices[:middle], max_tokens=max_tokens, page_numbers=batch.page_numbers[:middle]),
+        PageBatch(indices=batch.indices[middle:], max_tokens=max_tokens, page_numbers=batch.page_numbers[middle:])
+    ]
@@ -0,0 +1,141 @@
+import mmap
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import IO, Iterator, List, Optional, Sequence, Tuple, Union
+
+from core.utils.logger import setup_logger
+from core.utils.metrics import PAGES_SPILLED
+
+logger = setup_logger("page_store")
+
+# A spilled page: (offset, length) in the spill file
+SpilledPage = Tuple[int, int]
+
+
+@dataclass
+class MemoryBudget:
+    """How much memory the encoded pages of one document may hold.
+
+    Pages are rendered `window` pages at a time, so at most one window of
+    rendered and encoded pages is in flight. Encoded pages are kept in
+    memory up to `max_bytes`; later pages are spilled to a temporary file
+    in `spill_dir` (default: the system temp directory) and read back
+    through a memory map when they are sent. ``max_bytes=None`` keeps every
+    page in memory.
+    """
+
+    max_bytes: Optional[int] = 256 * 1024 * 1024
+    window: int = 16
+    spill_dir: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "MemoryBudget":
+        """Build a budget from OCR_MEMORY_BUDGET_MB (0: unbounded), OCR_RENDER_WINDOW and OCR_SPILL_DIR."""
+        budget_mb = float(os.getenv("OCR_MEMORY_BUDGET_MB", "256"))
+        return cls(
+            max_bytes=int(budget_mb * 1024 * 1024) if budget_mb > 0 else None,
+            window=max(1, int(os.getenv("OCR_RENDER_WINDOW", "16"))),
+            spill_dir=os.getenv("OCR_SPILL_DIR") or None
+        )
+
+
+class PageStore(Sequence[str]):
+    """Base64 encoded pages of a document, in page order, within a memory budget.
+
+    Behaves like a read-only list of strings. Pages appended once the
+    resident pages reach ``budget.max_bytes`` are written to a spill file
+    instead, which is deleted by ``close`` (or when the store is garbage
+    collected).
+    """
+
+    def __init__(self, budget: Optional[MemoryBudget] = None):
+        self.budget = budget or MemoryBudget()
+        self.resident_bytes = 0
+        self.spilled = 0
+        self._pages: List[Union[str, SpilledPage]] = []
+        self._file: Optional[IO[bytes]] = None
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, data: str) -> None:
+        """Add the next page, spilling it if the budget is used up."""
+        max_bytes = self.budget.max_bytes
+        if max_bytes is None or self.resident_bytes + len(data) <= max_bytes:
+            self._pages.append(data)
+            self.resident_bytes += len(data)
+            return
+
+        encoded = data.encode("ascii")
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="wrongmath-pages-", dir=self.budget.spill_dir)
+                logger.info(f"Memory budget of {max_bytes} bytes reached; spilling pages to disk")
+            self._file.seek(self._size)
+            self._file.write(encoded)
+            self._pages.append((self._size, len(encoded)))
+            self._size += len(encoded)
+            # The map no longer covers the whole file
+            self._close_map()
+        self.spilled += 1
+        PAGES_SPILLED.inc()
+
+    def _read(self, offset: int, length: int) -> str:
+        with self._lock:
+            if self._file is None:
+                raise ValueError("Page store is closed")
+            if self._map is None:
+                self._file.flush()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length].decode("ascii")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        page = self._pages[index]
+        if isinstance(page, str):
+            return page
+        return self._read(*page)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PageStore, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self) -> None:
+        """Drop all pages and delete the spill file."""
+        with self._lock:
+            self._close_map()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._pages = []
+        self.resident_bytes = 0
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            "pages": len(self),
+            "resident_bytes": self.resident_bytes,
+            "spilled_pages": self.spilled,
+            "spilled_bytes": self._size
+        }
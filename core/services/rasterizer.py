@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+
+from core.services.page_encoder import EncodedPage, EncodePolicy, encode_page
+from core.services.page_filter import page_signature
+from core.services.resolution import ZoomPolicy, page_zoom
+from core.services.segmenter import SegmentPolicy, segment_page
+from core.utils.logger import setup_logger
+
+logger = setup_logger("rasterizer")
+
+# Raw page render: (PIL mode, (width, height), samples)
+RawPage = Tuple[str, Tuple[int, int], bytes]
+
+
+def page_ranges(page_count: int, parts: int, start: int = 0) -> List[range]:
+    """Split pages `start` to `page_count - 1` into at most `parts` contiguous, nearly equal ranges."""
+    parts = max(1, min(parts, page_count - start))
+    size, extra = divmod(page_count - start, parts)
+    ranges = []
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def _render_encoded(
+    file_path: str,
+    pages: Sequence[int],
+    zoom: Optional[float],
+    encoding: EncodePolicy,
+    policy: Optional[ZoomPolicy] = None,
+    signatures: bool = False,
+    segments: Optional[SegmentPolicy] = None
+) -> List[EncodedPage]:
+    """Worker: render and encode pages (zoom None: adaptive per page)."""
+    colorspace = fitz.csGRAY if encoding.grayscale else fitz.csRGB
+    results = []
+    with fitz.open(file_path) as doc:
+        for page_num in pages:
+            page = doc[page_num]
+            scale = page_zoom(page, zoom, policy)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=colorspace, alpha=False)
+            signature = page_signature(pix) if signatures else None
+            crops = segment_page(pix, segments) if segments is not None else [pix]
+            for block, crop in enumerate(crops):
+                encoded = encode_page(crop, encoding)
+                encoded.block, encoded.blocks = block, len(crops)
+                encoded.page = page_num + 1
+                if block == 0:
+                    encoded.signature = signature
+                results.append(encoded)
+    return results
+
+
+def _render_raw(
+    file_path: str,
+    pages: range,
+    zoom: Optional[float],
+    policy: Optional[ZoomPolicy] = None
+) -> List[RawPage]:
+    """Worker: render a page range to raw RGB samples (zoom None: adaptive per page)."""
+    results = []
+    with fitz.open(file_path) as doc:
+        for page_num in pages:
+            page = doc[page_num]
+            scale = page_zoom(page, zoom, policy)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+            results.append(("RGB", (pix.width, pix.height), pix.samples))
+    return results
+
+
+def _render_files(file_path: str, pages: range, zoom: float, output_paths: List[str]) -> List[str]:
+    """Worker: render a page range and save each page to its output path."""
+    mat = fitz.Matrix(zoom, zoom)
+    with fitz.open(file_path) as doc:
+        for page_num, output_path in zip(pages, output_paths):
+            doc[page_num].get_pixmap(matrix=mat).save(output_path)
+    return output_paths
+
+
+class RenderPool:
+    """Process pool rendering PDF page ranges in parallel.
+
+    PyMuPDF holds the GIL while rendering, so threads cannot use more than
+    one core. Each worker process opens its own copy of the document and
+    renders a contiguous range of pages; results are returned in page order.
+    The pool is created once and reused across requests.
+    """
+
+    def __init__(self, workers: int, min_pages: int = 4):
+        self.workers = workers
+        self.min_pages = min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs an event loop and HTTP
+                # connection pools is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Started render pool with {self.workers} workers")
+            return self._executor
+
+    def should_parallelize(self, page_count: int) -> bool:
+        """Whether a document is large enough to be worth splitting."""
+        return self.workers > 1 and page_count >= self.min_pages
+
+    def _map(
+        self,
+        fn: Callable,
+        file_path: str,
+        page_count: int,
+        make_args: Callable[[Sequence[int]], tuple],
+        start: int = 0,
+        pages: Optional[Sequence[int]] = None
+    ) -> list:
+        """Run `fn(file_path, part, *make_args(part))` per part of the pages and concatenate in order.
+
+        The pages are `start` to `page_count - 1`, or the page numbers in
+        `pages`, split into one contiguous part per worker.
+        """
+        if pages is None:
+            parts: List[Sequence[int]] = page_ranges(page_count, self.workers, start)
+        else:
+            parts = [pages[part.start:part.stop] for part in page_ranges(len(pages), self.workers)]
+        executor = self._get_executor()
+        try:
+            futures = [executor.submit(fn, file_path, part, *make_args(part)) for part in parts]
+            return [item for future in futures for item in future.result()]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            self.shutdown(wait=False)
+            raise
+
+    def render_encoded(
+        self,
+        file_path: str,
+        page_count: int,
+        zoom: Optional[float] = 1.0,
+        encoding: Optional[EncodePolicy] = None,
+        policy: Optional[ZoomPolicy] = None,
+        signatures: bool = False,
+        segments: Optional[SegmentPolicy] = None,
+        start: int = 0,
+        pages: Optional[Sequence[int]] = None
+    ) -> List[EncodedPage]:
+        """Render and encode pages `start` to `page_count - 1`, in page order.
+
+        `pages` (zero-based, ascending) renders just those pages instead.
+        With ``zoom=None`` each page's zoom is chosen by ``choose_zoom`` under
+        `policy`; pages are encoded by ``encode_page`` under `encoding`
+        (default: full-color PNG). With `signatures`, each page also carries
+        its ``page_signature`` for blank and duplicate detection. With
+        `segments`, pages are split by ``segment_page`` and each block is
+        returned as its own item, the first one carrying the signature.
+        """
+        encoding = encoding or EncodePolicy.fixed("PNG")
+        return self._map(
+            _render_encoded, file_path, page_count,
+            lambda part: (zoom, encoding, policy, signatures, segments),
+            start,
+            pages
+        )
+
+    def render_raw(
+        self,
+        file_path: str,
+        page_count: int,
+        zoom: Optional[float] = 1.0,
+        policy: Optional[ZoomPolicy] = None
+    ) -> List[RawPage]:
+        """Render all pages to raw RGB samples, in page order (zoom None: adaptive under `policy`)."""
+        return self._map(_render_raw, file_path, page_count, lambda pages: (zoom, policy))
+
+    def render_files(self, file_path: str, page_count: int, zoom: float, output_paths: List[str]) -> List[str]:
+        """Render all pages to the given output paths (one per page)."""
+        return self._map(
+            _render_files, file_path, page_count,
+            lambda pages: (zoom, [output_paths[i] for i in pages])
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("Render pool shut down")
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "min_pages": self.min_pages, "started": self._executor is not None}
+
+
+# Process-wide render pool, created on first use
+_render_pool: Optional[RenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> Optional[RenderPool]:
+    """Get the shared render pool, or None when parallel rendering is off.
+
+    Configured by OCR_RENDER_WORKERS (default: CPU count, at most 4; 0 or 1
+    disables the pool) and OCR_RENDER_MIN_PAGES (default 4), the smallest
+    document rendered in parallel.
+
+    Returns:
+        Optional[RenderPool]: Shared pool, or None if disabled
+    """
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is None:
+            workers = int(os.getenv("OCR_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+            if workers <= 1:
+                return None
+            _render_pool = RenderPool(
+                workers=workers,
+                min_pages=int(os.getenv("OCR_RENDER_MIN_PAGES", "4"))
+            )
+        return _render_pool
+
+
+def close_render_pool() -> None:
+    """Shut down the shared render pool, if one was started."""
+    global _render_pool
+    with _pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown()
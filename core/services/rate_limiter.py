@@ -0,0 +1,305 @@
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+from core.utils.logger import setup_logger
+
+logger = setup_logger("rate_limiter")
+
+# HTTP status codes worth retrying; everything else in 4xx is a caller error
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Status codes whose Retry-After header tells us when the provider has capacity again
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`.
+
+    The bucket starts full, so up to `capacity` units can be spent in a
+    burst before callers have to wait for the refill.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0.0 if they are now).
+
+        Requests larger than the bucket are clamped to its capacity so they
+        can still eventually proceed.
+        """
+        amount = min(amount, self.capacity)
+        self._refill()
+
+        if self._tokens >= amount:
+            return 0.0
+        if self.rate_per_minute <= 0:
+            return float("inf")
+        return (amount - self._tokens) * 60.0 / self.rate_per_minute
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens if available.
+
+        Returns:
+            float: 0.0 if the tokens were taken, otherwise seconds to wait
+        """
+        delay = self.wait_time(amount)
+        if delay <= 0:
+            self._tokens -= min(amount, self.capacity)
+        return delay
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens now, going into debt if there are not enough.
+
+        Later callers see the debt, so reservations are repaid in the order
+        they were made.
+
+        Returns:
+            float: Seconds until the debt is repaid (0.0 if there is none)
+        """
+        amount = min(amount, self.capacity)
+        self._refill()
+        self._tokens -= amount
+
+        if self._tokens >= 0:
+            return 0.0
+        if self.rate_per_minute <= 0:
+            return float("inf")
+        return -self._tokens * 60.0 / self.rate_per_minute
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """Change the refill rate, keeping the tokens accrued so far."""
+        self._refill()
+        self.rate_per_minute = float(rate_per_minute)
+
+
+class KeyedTokenBuckets:
+    """One token bucket per key (e.g. per client session), created on first use.
+
+    At most `max_keys` buckets are kept; the least recently used one is
+    forgotten first, so a key seen again after eviction starts with a full
+    bucket.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        max_keys: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = capacity
+        self.max_keys = max(1, max_keys)
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def bucket(self, key: str) -> TokenBucket:
+        """Get the bucket for `key`, creating a full one if there is none."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_minute, self.capacity, clock=self._clock)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key: str, amount: float = 1.0) -> float:
+        """Take `amount` tokens from the bucket for `key` if available.
+
+        Returns:
+            float: 0.0 if the tokens were taken, otherwise seconds to wait
+        """
+        return self.bucket(key).try_acquire(amount)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def try_acquire_all(*buckets: TokenBucket, amount: float = 1.0) -> float:
+    """Take `amount` tokens from every bucket, or from none of them.
+
+    Used when a caller is limited on several keys at once (e.g. per session
+    and per client address), so a refusal by one bucket does not spend the
+    tokens of the others.
+
+    Returns:
+        float: 0.0 if the tokens were taken, otherwise seconds until every
+            bucket has them
+    """
+    delay = max((bucket.wait_time(amount) for bucket in buckets), default=0.0)
+    if delay <= 0:
+        for bucket in buckets:
+            bucket.try_acquire(amount)
+    return delay
+
+
+class RateLimiter:
+    """Adaptive client-side limiter for requests and tokens per minute.
+
+    Every call first waits for a request token and for its estimated token
+    budget. When the provider throttles (429/503) the request rate is halved
+    and all callers are paused for the provider's Retry-After; each success
+    then restores a slice of the configured rate (AIMD), so throughput
+    settles just below the provider's ceiling instead of oscillating around it.
+
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        min_requests_per_minute: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_requests_per_minute = float(requests_per_minute)
+        self.min_requests_per_minute = min(float(min_requests_per_minute), self.max_requests_per_minute or 1.0)
+        self.tokens_per_minute = float(tokens_per_minute)
+        self._clock = clock
+        self._request_bucket = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self.throttled = 0
+
+    @property
+    def requests_per_minute(self) -> float:
+        """Current (adapted) request rate."""
+        return self._request_bucket.rate_per_minute if self._request_bucket else 0.0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until a request estimated at `tokens` tokens may be sent.
+
+        The request and token budgets are reserved on arrival and the caller
+        then sleeps until its reservation is covered, so waiters are served
+        in arrival order and no caller holds up the others while it sleeps.
+        A pause that starts while waiting (Retry-After) is waited out too.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = 0.0
+        if self._request_bucket is not None:
+            delay = self._request_bucket.reserve(1)
+        if self._token_bucket is not None and tokens > 0:
+            delay = max(delay, self._token_bucket.reserve(tokens))
+
+        waited = 0.0
+        while True:
+            delay = max(delay, self._paused_until - self._clock())
+            if delay <= 0:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds` (e.g. from Retry-After); non-finite values are ignored."""
+        if not math.isfinite(seconds):
+            return
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Record a 429/503 from the provider: back off multiplicatively."""
+        self.throttled += 1
+        if retry_after:
+            self.pause(retry_after)
+        if self._request_bucket is not None:
+            new_rate = max(self.min_requests_per_minute, self._request_bucket.rate_per_minute / 2)
+            self._request_bucket.set_rate(new_rate)
+            logger.warning(f"Provider throttled; request rate lowered to {new_rate:.1f}/min")
+
+    def on_success(self) -> None:
+        """Record a successful call: recover the request rate additively."""
+        if self._request_bucket is not None and self._request_bucket.rate_per_minute < self.max_requests_per_minute:
+            step = max(1.0, self.max_requests_per_minute * 0.05)
+            self._request_bucket.set_rate(min(self.max_requests_per_minute, self._request_bucket.rate_per_minute + step))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get current limits and throttle count.
+
+        Returns:
+            Dict[str, Any]: Rate limiter statistics
+        """
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "max_requests_per_minute": self.max_requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "throttled": self.throttled
+        }
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 30.0,
+    rng: Callable[[], float] = random.random
+) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based).
+
+    Returns a delay drawn uniformly from [0, min(cap, base * 2**attempt)],
+    so concurrent callers that failed together do not retry together.
+    """
+    return rng() * min(cap, base * (2 ** attempt))
+
+
+def parse_retry_after(value: Optional[str], max_delay: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        value: Header value
+        max_delay: Longest wait to accept; larger values are clamped to it
+            (None: no limit)
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent/invalid
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at is None:
+            return None
+        delay = retry_at.timestamp() - time.time()
+
+    # "inf" and "nan" parse as floats but are no usable wait
+    if not math.isfinite(delay):
+        return None
+    delay = max(0.0, delay)
+    if max_delay is not None:
+        delay = min(delay, max_delay)
+    return delay
+
+
+def is_retryable_status(status_code: Optional[int]) -> bool:
+    """Return True if a request failing with `status_code` may be retried."""
+    return status_code in RETRYABLE_STATUS_CODES
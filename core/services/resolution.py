@@ -0,0 +1,210 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from core.utils.logger import setup_logger
+from core.utils.validators import ValidationError
+
+logger = setup_logger("resolution")
+
+# Grey level below which a probe pixel counts as ink
+INK_THRESHOLD = 160
+
+# Height of a row of inked text relative to its font size, used to turn
+# measured text rows on scanned pages into a font size
+INK_HEIGHT = 0.9
+
+
+@dataclass
+class PageMeasure:
+    """Content measurements for one PDF page, in PDF points (1/72 inch)."""
+
+    text_size: Optional[float] = None
+    ink_ratio: float = 0.0
+    native_zoom: Optional[float] = None
+    source: str = "empty"
+
+
+@dataclass
+class ZoomPolicy:
+    """How adaptive rendering picks a zoom factor per page.
+
+    The smallest text that matters on the page (the size below which only
+    `small_text_quantile` of the characters fall) is rendered at about
+    `target_text_px` pixels. Subscripts, superscripts and fraction parts are
+    smaller than body text, so pages dense with formulas get more pixels,
+    while pages with a few large lines get fewer. Pages with almost no ink
+    get `min_zoom`. Scanned pages are never upsampled past the resolution of
+    the embedded scan, and no page side exceeds `max_side` pixels.
+    """
+
+    target_text_px: float = 16.0
+    small_text_quantile: float = 0.1
+    min_zoom: float = 0.75
+    max_zoom: float = 2.5
+    max_side: int = 2048
+    sparse_ink_ratio: float = 0.002
+    probe_zoom: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "ZoomPolicy":
+        """Build a policy from OCR_TARGET_TEXT_PX, OCR_MIN_ZOOM, OCR_MAX_ZOOM and OCR_MAX_IMAGE_SIDE."""
+        return cls(
+            target_text_px=float(os.getenv("OCR_TARGET_TEXT_PX", "16")),
+            min_zoom=float(os.getenv("OCR_MIN_ZOOM", "0.75")),
+            max_zoom=float(os.getenv("OCR_MAX_ZOOM", "2.5")),
+            max_side=int(os.getenv("OCR_MAX_IMAGE_SIDE", "2048"))
+        )
+
+
+def parse_zoom(value: Optional[object]) -> Optional[float]:
+    """Parse a zoom setting: a positive number, or None/"auto" for adaptive.
+
+    Raises:
+        ValidationError: If the value is neither "auto" nor a positive number
+    """
+    if value is None or (isinstance(value, str) and value.strip().lower() in {"", "auto"}):
+        return None
+    try:
+        zoom = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid zoom: {value!r} (expected a number or 'auto')")
+    if zoom <= 0:
+        raise ValidationError(f"Invalid zoom: {value!r} (must be positive)")
+    return zoom
+
+
+def default_zoom() -> Optional[float]:
+    """Zoom used when a caller does not give one, from OCR_PDF_ZOOM.
+
+    Returns:
+        Optional[float]: Fixed zoom factor, or None for adaptive ("auto", the default)
+    """
+    return parse_zoom(os.getenv("OCR_PDF_ZOOM", "auto"))
+
+
+def _quantile(values: List[Tuple[float, int]], q: float) -> float:
+    """Weighted quantile of (value, weight) pairs."""
+    values = sorted(values)
+    total = sum(weight for _, weight in values)
+    running = 0
+    for value, weight in values:
+        running += weight
+        if running >= q * total:
+            return value
+    return values[-1][0]
+
+
+def _text_sizes(page: fitz.Page) -> List[Tuple[float, int]]:
+    """(font size, character count) for each text span on the page."""
+    sizes = []
+    for block in page.get_text("dict", flags=0)["blocks"]:
+        for line in block.get("lines", []):
+            for text_span in line["spans"]:
+                chars = len(text_span["text"].strip())
+                if chars and text_span["size"] > 0:
+                    sizes.append((text_span["size"], chars))
+    return sizes
+
+
+def _native_zoom(page: fitz.Page) -> Optional[float]:
+    """Zoom at which the largest embedded image is shown at its own resolution."""
+    best_area, native = 0.0, None
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"])
+        if rect.is_empty or not info.get("width"):
+            continue
+        if rect.get_area() > best_area:
+            best_area = rect.get_area()
+            native = max(info["width"] / rect.width, info["height"] / rect.height)
+    return native
+
+
+def _line_heights(ink: Image.Image) -> List[int]:
+    """Heights in pixels of the runs of rows that contain ink."""
+    # Averaging each row down to one pixel gives the horizontal projection profile
+    profile = ink.resize((1, ink.height), Image.BOX).tobytes()
+    heights, run = [], 0
+    for value in profile:
+        if value < 254:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+    return heights
+
+
+def measure_page(page: fitz.Page, probe_zoom: float = 1.0, quantile: float = 0.1) -> PageMeasure:
+    """Measure how small the text on a page is.
+
+    Pages with a text layer are measured from their font sizes, without
+    rendering. Other pages (scans, blank pages) are measured from a
+    grayscale probe render: the median height of the runs of inked rows
+    gives the height of a text line, hence the font size.
+
+    Args:
+        page: PDF page
+        probe_zoom: Zoom of the probe render
+        quantile: Fraction of characters allowed to be smaller than the measured size
+
+    Returns:
+        PageMeasure: Page measurements
+    """
+    sizes = _text_sizes(page)
+    if sizes:
+        return PageMeasure(text_size=_quantile(sizes, quantile), ink_ratio=1.0, source="text")
+
+    probe = page.get_pixmap(matrix=fitz.Matrix(probe_zoom, probe_zoom), colorspace=fitz.csGRAY, alpha=False)
+    gray = Image.frombytes("L", (probe.width, probe.height), probe.samples)
+    measure = PageMeasure(
+        ink_ratio=sum(gray.histogram()[:INK_THRESHOLD]) / max(1, probe.width * probe.height),
+        native_zoom=_native_zoom(page)
+    )
+
+    ink = gray.point(lambda value: 0 if value < INK_THRESHOLD else 255)
+    # Rows shorter than 3 pixels are rules and specks, not text
+    heights = sorted(h for h in _line_heights(ink) if h >= 3)
+    if heights:
+        measure.text_size = heights[len(heights) // 2] / probe_zoom / INK_HEIGHT
+        measure.source = "scan"
+    return measure
+
+
+def choose_zoom(page: fitz.Page, policy: Optional[ZoomPolicy] = None) -> float:
+    """Pick the zoom factor to render a page at for OCR.
+
+    Args:
+        page: PDF page
+        policy: Zoom policy (defaults to ``ZoomPolicy.from_env()``)
+
+    Returns:
+        float: Zoom factor (1.0 = 72 DPI), rounded to two decimals
+    """
+    policy = policy or ZoomPolicy.from_env()
+    measure = measure_page(page, policy.probe_zoom, policy.small_text_quantile)
+
+    if measure.text_size is None or measure.ink_ratio < policy.sparse_ink_ratio:
+        zoom = policy.min_zoom
+    else:
+        zoom = policy.target_text_px / measure.text_size
+        if measure.source == "scan" and measure.native_zoom:
+            # Upsampling a scan adds bytes, not detail
+            zoom = min(zoom, measure.native_zoom)
+        zoom = min(policy.max_zoom, max(policy.min_zoom, zoom))
+
+    longest = max(page.rect.width, page.rect.height)
+    if longest > 0:
+        zoom = min(zoom, policy.max_side / longest)
+    return round(zoom, 2)
+
+
+def page_zoom(page: fitz.Page, zoom: Optional[float], policy: Optional[ZoomPolicy] = None) -> float:
+    """The zoom to render `page` at: `zoom` if given, else an adaptive choice."""
+    if zoom is not None:
+        return zoom
+    return choose_zoom(page, policy)
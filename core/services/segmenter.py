@@ -0,0 +1,261 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from core.services.resolution import INK_THRESHOLD
+from core.utils.logger import setup_logger
+
+logger = setup_logger("segmenter")
+
+# Block on a rendered page: (x0, y0, x1, y1) in pixels, end exclusive
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class SegmentPolicy:
+    """How rendered pages are split into question blocks for OCR.
+
+    Pages are cut recursively along whitespace (XY-cut): at each level a
+    region is first split into columns at a vertical gap of at least
+    `column_gap` of the page width, as long as both sides are at least
+    `min_column_width` of the page wide and the region is at least
+    `min_column_height` of the page tall (figures side by side within a
+    question are not columns); otherwise it is split into blocks at
+    horizontal gaps of at least `block_gap_lines` text lines. Blocks
+    shorter than `min_block_lines` lines, such as a question label above
+    its question or a page footer, are joined to their neighbour. Ordinary
+    line spacing never splits a block, so a page without wider gaps stays
+    whole. Pages with more than `max_blocks` blocks are sent whole.
+    """
+
+    enabled: bool = True
+    column_gap: float = 0.03
+    min_column_width: float = 0.15
+    min_column_height: float = 0.25
+    block_gap_lines: float = 1.5
+    min_block_lines: float = 2.0
+    max_blocks: int = 8
+    max_depth: int = 4
+    padding: int = 8
+
+    @classmethod
+    def from_env(cls) -> "SegmentPolicy":
+        """Build a policy from OCR_SEGMENT_PAGES, OCR_SEGMENT_GAP_LINES and OCR_SEGMENT_MAX_BLOCKS."""
+        return cls(
+            enabled=os.getenv("OCR_SEGMENT_PAGES", "true").lower() == "true",
+            block_gap_lines=float(os.getenv("OCR_SEGMENT_GAP_LINES", "1.5")),
+            max_blocks=int(os.getenv("OCR_SEGMENT_MAX_BLOCKS", "8"))
+        )
+
+
+def ink_mask(pix: fitz.Pixmap) -> np.ndarray:
+    """Boolean (height, width) array of the pixels darker than INK_THRESHOLD."""
+    samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    if pix.alpha:
+        samples = samples[:, :, :-1]
+    if samples.shape[2] == 1:
+        gray = samples[:, :, 0]
+    else:
+        gray = samples[:, :, :3].mean(axis=2)
+    return gray < INK_THRESHOLD
+
+
+def _runs(profile: np.ndarray) -> np.ndarray:
+    """[start, stop) of each run of True values, as an (n, 2) array."""
+    padded = np.concatenate(([False], profile, [False])).astype(np.int8)
+    return np.flatnonzero(np.diff(padded)).reshape(-1, 2)
+
+
+def _pieces(runs: np.ndarray, gaps: np.ndarray) -> List[Tuple[int, int]]:
+    """Split consecutive runs at the given gap indices into [start, stop) pieces."""
+    starts = [runs[0, 0]] + [runs[i + 1, 0] for i in gaps]
+    stops = [runs[i, 1] for i in gaps] + [runs[-1, 1]]
+    return [(int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+def _column_pieces(
+    cols: np.ndarray,
+    height: int,
+    page_shape: Tuple[int, int],
+    policy: SegmentPolicy
+) -> Optional[List[Tuple[int, int]]]:
+    """Split a region at its widest vertical gap, if it separates two columns."""
+    page_height, page_width = page_shape
+    if len(cols) < 2 or height < policy.min_column_height * page_height:
+        return None
+    gaps = cols[1:, 0] - cols[:-1, 1]
+    widest = int(np.argmax(gaps))
+    if gaps[widest] < policy.column_gap * page_width:
+        return None
+    pieces = _pieces(cols, [widest])
+    if min(stop - start for start, stop in pieces) < policy.min_column_width * page_width:
+        return None
+    return pieces
+
+
+def _gap_pieces(rows: np.ndarray, line_height: float, policy: SegmentPolicy, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split a region's rows at gaps of at least `block_gap_lines` lines (the `limit` widest)."""
+    if len(rows) < 2:
+        return []
+    gaps = rows[1:, 0] - rows[:-1, 1]
+    candidates = np.flatnonzero(gaps >= policy.block_gap_lines * line_height)
+    if not len(candidates):
+        return []
+    if limit is not None:
+        # Keep the widest gaps, in page order
+        candidates = candidates[np.argsort(gaps[candidates], kind="stable")[::-1][:limit]]
+    return _pieces(rows, sorted(candidates))
+
+
+def _row_pieces(rows: np.ndarray, line_height: float, policy: SegmentPolicy) -> Optional[List[Tuple[int, int]]]:
+    """Split a region at horizontal gaps wider than ordinary line spacing."""
+    min_height = policy.min_block_lines * line_height
+    pieces: List[Tuple[int, int]] = []
+    last_short = False
+    for start, stop in _gap_pieces(rows, line_height, policy, limit=policy.max_blocks - 1):
+        if last_short:
+            # A short block (a label) goes with what follows it
+            pieces[-1] = (pieces[-1][0], stop)
+        else:
+            pieces.append((start, stop))
+        last_short = stop - start < min_height
+    if last_short and len(pieces) > 1:
+        # A short last block (a footer) goes with what precedes it
+        pieces[-2:] = [(pieces[-2][0], pieces[-1][1])]
+    return pieces if len(pieces) > 1 else None
+
+
+def _column_band(
+    ink: np.ndarray,
+    box: Box,
+    bands: List[Tuple[int, int]],
+    policy: SegmentPolicy
+) -> Optional[Tuple[int, int]]:
+    """Tallest run of row bands ``bands[i:j]`` of a region that splits into columns.
+
+    Finds multi-column bodies under a full-width header or above a
+    full-width footer, which keep the region as a whole from splitting.
+    """
+    x0, y0, x1, _ = box
+    best, best_height = None, 0
+    for i in range(len(bands)):
+        for j in range(len(bands), i, -1):
+            top, bottom = bands[i][0], bands[j - 1][1]
+            height = bottom - top
+            if height <= best_height or height < policy.min_column_height * ink.shape[0]:
+                break
+            if (i, j) == (0, len(bands)):
+                # The whole region, already tried
+                continue
+            cols = _runs(ink[y0 + top:y0 + bottom, x0:x1].any(axis=0))
+            if _column_pieces(cols - cols[0, 0], height, ink.shape, policy):
+                best, best_height = (i, j), height
+    return best
+
+
+def _cut(ink: np.ndarray, box: Box, line_height: float, policy: SegmentPolicy, depth: int) -> List[Box]:
+    """Recursive XY-cut of one region into blocks, in reading order."""
+    x0, y0, x1, y1 = box
+    region = ink[y0:y1, x0:x1]
+    rows = _runs(region.any(axis=1))
+    if not len(rows):
+        return []
+    cols = _runs(region.any(axis=0))
+    # Trim the region to its ink
+    x0, x1 = x0 + int(cols[0, 0]), x0 + int(cols[-1, 1])
+    y0, y1 = y0 + int(rows[0, 0]), y0 + int(rows[-1, 1])
+    rows, cols = rows - rows[0, 0], cols - cols[0, 0]
+    if depth >= policy.max_depth:
+        return [(x0, y0, x1, y1)]
+
+    def cut_rows(pieces: List[Tuple[int, int]]) -> List[Box]:
+        return [
+            block
+            for start, stop in pieces
+            for block in _cut(ink, (x0, y0 + start, x1, y0 + stop), line_height, policy, depth + 1)
+        ]
+
+    # Columns first, so that blocks are read down one column before the next
+    pieces = _column_pieces(cols, y1 - y0, ink.shape, policy)
+    if pieces:
+        return [
+            block
+            for start, stop in pieces
+            for block in _cut(ink, (x0 + start, y0, x0 + stop, y1), line_height, policy, depth + 1)
+        ]
+
+    bands = _gap_pieces(rows, line_height, policy)
+    band = _column_band(ink, (x0, y0, x1, y1), bands, policy)
+    if band:
+        # Full-width header and footer around a multi-column body
+        i, j = band
+        pieces = [(bands[i][0], bands[j - 1][1])]
+        if i > 0:
+            pieces.insert(0, (bands[0][0], bands[i - 1][1]))
+        if j < len(bands):
+            pieces.append((bands[j][0], bands[-1][1]))
+        return cut_rows(pieces)
+
+    pieces = _row_pieces(rows, line_height, policy)
+    if pieces:
+        return cut_rows(pieces)
+    return [(x0, y0, x1, y1)]
+
+
+def find_blocks(ink: np.ndarray, policy: Optional[SegmentPolicy] = None) -> List[Box]:
+    """Find the question blocks on a page, in reading order.
+
+    Args:
+        ink: Ink mask of the page (see ``ink_mask``)
+        policy: Segmentation policy (defaults to ``SegmentPolicy()``)
+
+    Returns:
+        List[Box]: Blocks trimmed to their ink, columns left to right and
+        top to bottom within each column; empty for a blank page
+    """
+    policy = policy or SegmentPolicy()
+    heights = np.diff(_runs(ink.any(axis=1)), axis=1)
+    if not len(heights):
+        return []
+    # Typical height of a line of text
+    line_height = max(1.0, float(np.median(heights)))
+    return _cut(ink, (0, 0, ink.shape[1], ink.shape[0]), line_height, policy, 0)
+
+
+def crop_pixmap(pix: fitz.Pixmap, box: Box) -> fitz.Pixmap:
+    """Copy a rectangle of a pixmap into a new pixmap."""
+    x0, y0, x1, y1 = box
+    samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    crop = np.ascontiguousarray(samples[y0:y1, x0:x1])
+    return fitz.Pixmap(pix.colorspace, x1 - x0, y1 - y0, crop.tobytes(), pix.alpha)
+
+
+def segment_page(pix: fitz.Pixmap, policy: Optional[SegmentPolicy] = None) -> List[fitz.Pixmap]:
+    """Split a rendered page into question blocks, to be OCR'd separately.
+
+    Pages that do not split into at least two blocks (or split into more
+    than ``policy.max_blocks``) are returned whole and unchanged.
+
+    Args:
+        pix: Rendered page
+        policy: Segmentation policy (defaults to ``SegmentPolicy.from_env()``)
+
+    Returns:
+        List[fitz.Pixmap]: Block images in reading order
+    """
+    policy = policy or SegmentPolicy.from_env()
+    if not policy.enabled:
+        return [pix]
+
+    blocks = find_blocks(ink_mask(pix), policy)
+    if not 2 <= len(blocks) <= policy.max_blocks:
+        return [pix]
+
+    pad = policy.padding
+    return [
+        crop_pixmap(pix, (max(0, x0 - pad), max(0, y0 - pad), min(pix.width, x1 + pad), min(pix.height, y1 + pad)))
+        for x0, y0, x1, y1 in blocks
+    ]
@@ -0,0 +1,257 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+import fitz  # PyMuPDF
+
+from core.utils.logger import setup_logger
+
+logger = setup_logger("text_layer")
+
+# How a page's content is obtained
+MODE_TEXT = "text"
+MODE_MIXED = "mixed"
+MODE_OCR = "ocr"
+
+# Font name fragments of math fonts (TeX, Word and STIX math fonts, Symbol)
+MATH_FONT_MARKERS = (
+    "math", "cmmi", "cmsy", "cmex", "msam", "msbm", "symbol", "stix", "euler", "mtextra", "mt extra", "esint", "rsfs"
+)
+
+# Points added around regions sent to OCR
+REGION_MARGIN = 4.0
+
+# Points added around drawings, so that a fraction bar or a line touching
+# the text above or below it overlaps that text
+GRAPHIC_MARGIN = 3.0
+
+
+@dataclass
+class PageText:
+    """Content taken from a PDF's text layer, which needs no OCR."""
+
+    text: str
+    # One-based page number in the document (0: not known)
+    page: int = 0
+
+
+@dataclass
+class Region:
+    """Part of a page: text from the text layer, or an area to OCR (text None)."""
+
+    rect: fitz.Rect
+    text: Optional[str] = None
+
+
+@dataclass
+class PageLayout:
+    """How a page's content is obtained, with its regions in reading order."""
+
+    mode: str
+    regions: List[Region] = field(default_factory=list)
+
+
+@dataclass
+class TextLayerPolicy:
+    """When the text layer of a PDF page is used instead of OCR.
+
+    A text block is reliable when at most `max_bad_chars` of its characters
+    are unmapped glyphs, it uses no math font, none of its spans is smaller
+    than `script_ratio` of the page's main font size (sub- and
+    superscripts), and no vector drawing (fraction bar, radical, figure) or
+    image overlaps it. An unreliable block makes the blocks on the same
+    line unreliable too, so a formula is OCR'd as a whole.
+    Pages whose images cover more than `max_image_cover` of the page are
+    scans, whose text layer (if any) is not trusted. Pages where the areas
+    needing OCR exceed `max_ocr_area` of the content are OCR'd whole.
+    """
+
+    enabled: bool = True
+    max_bad_chars: float = 0.01
+    script_ratio: float = 0.85
+    max_image_cover: float = 0.5
+    max_ocr_area: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> "TextLayerPolicy":
+        """Build a policy from OCR_TEXT_LAYER and OCR_TEXT_LAYER_MAX_OCR_AREA."""
+        return cls(
+            enabled=os.getenv("OCR_TEXT_LAYER", "true").lower() == "true",
+            max_ocr_area=float(os.getenv("OCR_TEXT_LAYER_MAX_OCR_AREA", "0.5"))
+        )
+
+
+def is_bad_char(char: str) -> bool:
+    """Whether a character is an unmapped glyph or control code."""
+    code = ord(char)
+    return char == "�" or 0xE000 <= code <= 0xF8FF or (code < 0x20 and char not in "\t\n")
+
+
+def _main_size(spans: List[Dict]) -> float:
+    """Font size covering the most characters."""
+    sizes: Dict[float, int] = {}
+    for text_span in spans:
+        size = round(text_span["size"], 1)
+        sizes[size] = sizes.get(size, 0) + len(text_span["text"].strip())
+    return max(sizes, key=sizes.get)
+
+
+def _block_text(block: Dict) -> str:
+    lines = ["".join(text_span["text"] for text_span in line["spans"]).strip() for line in block["lines"]]
+    return "\n".join(line for line in lines if line)
+
+
+def _spans(block: Dict) -> List[Dict]:
+    return [text_span for line in block["lines"] for text_span in line["spans"] if text_span["text"].strip()]
+
+
+def _is_reliable(block: Dict, graphics: List[fitz.Rect], main_size: float, policy: TextLayerPolicy) -> bool:
+    """Whether a text block's text can be used as-is."""
+    spans = _spans(block)
+    chars = "".join(text_span["text"] for text_span in spans)
+    if not chars.strip():
+        return False
+    if sum(is_bad_char(char) for char in chars) > policy.max_bad_chars * len(chars):
+        return False
+    if any(marker in text_span["font"].lower() for text_span in spans for marker in MATH_FONT_MARKERS):
+        return False
+    if any(text_span["size"] < policy.script_ratio * main_size for text_span in spans):
+        return False
+    rect = fitz.Rect(block["bbox"])
+    return not any(rect.intersects(graphic) for graphic in graphics)
+
+
+def _same_line(a: fitz.Rect, b: fitz.Rect, size: float) -> bool:
+    """Whether two blocks sit side by side on one line, at most two characters apart."""
+    overlap = min(a.y1, b.y1) - max(a.y0, b.y0)
+    gap = max(a.x0, b.x0) - min(a.x1, b.x1)
+    return overlap >= 0.5 * min(a.height, b.height) and gap <= 2 * size
+
+
+def _grow(rect: fitz.Rect, margin: float) -> fitz.Rect:
+    return fitz.Rect(rect.x0 - margin, rect.y0 - margin, rect.x1 + margin, rect.y1 + margin)
+
+
+def _merge_rects(rects: List[fitz.Rect], margin: float) -> List[fitz.Rect]:
+    """Union rectangles that overlap or lie within `margin` of each other."""
+    merged: List[fitz.Rect] = []
+    for rect in sorted(rects, key=lambda r: (r.y0, r.x0)):
+        grown = _grow(rect, margin)
+        for i, other in enumerate(merged):
+            if grown.intersects(other):
+                merged[i] = other | rect
+                break
+        else:
+            merged.append(fitz.Rect(rect))
+    return merged
+
+
+def analyze_page(page: fitz.Page, policy: Optional[TextLayerPolicy] = None) -> PageLayout:
+    """Decide which parts of a page can be read from its text layer.
+
+    Text blocks are kept in content-stream order, which is the reading
+    order of generated PDFs. Figures made of drawings and images are
+    placed after the last block above them. Consecutive regions needing
+    OCR are joined into one when that does not cover any text region.
+
+    Args:
+        page: PDF page
+        policy: Text layer policy (defaults to ``TextLayerPolicy.from_env()``)
+
+    Returns:
+        PageLayout: ``MODE_TEXT`` if all content comes from the text layer,
+        ``MODE_MIXED`` if some regions need OCR, ``MODE_OCR`` if the page
+        should be rendered and OCR'd whole
+    """
+    policy = policy or TextLayerPolicy.from_env()
+    page_rect = page.rect
+    blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_IMAGES)["blocks"]
+    text_blocks = [block for block in blocks if block["type"] == 0 and _block_text(block)]
+    if not text_blocks:
+        return PageLayout(MODE_OCR)
+
+    images = [fitz.Rect(block["bbox"]) & page_rect for block in blocks if block["type"] == 1]
+    if sum(image.get_area() for image in images) > policy.max_image_cover * page_rect.get_area():
+        # A scan, possibly with a hidden OCR text layer
+        return PageLayout(MODE_OCR)
+
+    drawings = [
+        _grow(fitz.Rect(drawing["rect"]), GRAPHIC_MARGIN) for drawing in page.get_drawings()
+        # Page backgrounds and frames are not content
+        if fitz.Rect(drawing["rect"]).get_area() < 0.5 * page_rect.get_area()
+    ]
+    graphics = images + drawings
+
+    main_size = _main_size([text_span for block in text_blocks for text_span in _spans(block)])
+    rects = [fitz.Rect(block["bbox"]) for block in text_blocks]
+    reliable = [_is_reliable(block, graphics, main_size, policy) for block in text_blocks]
+    changed = True
+    while changed:
+        # Formula pieces pull in the rest of their line
+        changed = False
+        for i, rect in enumerate(rects):
+            if reliable[i] and any(
+                not reliable[j] and _same_line(rect, other, main_size) for j, other in enumerate(rects)
+            ):
+                reliable[i] = False
+                changed = True
+
+    regions = []
+    for block, rect, ok in zip(text_blocks, rects, reliable):
+        if ok:
+            regions.append(Region(rect, _block_text(block)))
+            continue
+        # A fraction bar or radical may reach past the characters it spans
+        for graphic in graphics:
+            if rect.intersects(graphic):
+                rect = rect | graphic
+        regions.append(Region(rect))
+
+    # Figures that do not overlap any text block
+    covered = [region.rect for region in regions]
+    figures = [rect for rect in _merge_rects(graphics, REGION_MARGIN) if not any(rect.intersects(c) for c in covered)]
+    for figure in figures:
+        position = 0
+        for i, region in enumerate(regions):
+            if region.rect.y1 <= figure.y0 + REGION_MARGIN:
+                position = i + 1
+        regions.insert(position, Region(figure))
+
+    # Join consecutive OCR regions
+    joined: List[Region] = []
+    text_rects = [region.rect for region in regions if region.text is not None]
+    for region in regions:
+        if region.text is None and joined and joined[-1].text is None:
+            union = joined[-1].rect | region.rect
+            if not any(union.intersects(rect) for rect in text_rects):
+                joined[-1] = Region(union)
+                continue
+        joined.append(region)
+
+    ocr_regions = [region for region in joined if region.text is None]
+    if not ocr_regions:
+        return PageLayout(MODE_TEXT, joined)
+
+    content = fitz.Rect()
+    for region in joined:
+        content |= region.rect
+    if sum(region.rect.get_area() for region in ocr_regions) > policy.max_ocr_area * content.get_area():
+        return PageLayout(MODE_OCR)
+
+    for region in ocr_regions:
+        region.rect = _grow(region.rect, REGION_MARGIN) & page_rect
+    return PageLayout(MODE_MIXED, joined)
+
+
+def layout_items(layout: PageLayout) -> List[Union[PageText, fitz.Rect]]:
+    """A layout's content in reading order: runs of text regions joined into
+    one PageText each, and the rectangles to render for OCR."""
+    items: List[Union[PageText, fitz.Rect]] = []
+    for region in layout.regions:
+        if region.text is None:
+            items.append(region.rect)
+        elif items and isinstance(items[-1], PageText):
+            items[-1] = PageText(items[-1].text + "\n\n" + region.text)
+        else:
+            items.append(PageText(region.text))
+    return items
@@ -4,6 +4,6 @@ Utils Module
 Shared utilities for logging, validation, etc.
 """
 
-from . import logger, validators
+from . import log_writer, logger, metrics, uploads, validators
 
-__all__ = ["logger", "validators"]
+__all__ = ["log_writer", "logger", "metrics", "uploads", "validators"]
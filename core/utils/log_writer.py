@@ -0,0 +1,136 @@
+import logging
+import os
+import queue
+import threading
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional, TextIO, Union
+
+from core.utils.metrics import LOG_LINES_DROPPED
+
+# Queue items: a line, a flush marker, or None to stop
+_Item = Union[str, threading.Event, None]
+
+
+class BatchedLogWriter:
+    """Append log lines to a size-rotated file from a background thread.
+
+    ``write`` only puts the line on a bounded queue, so callers on the
+    event loop never touch the file system. The writer thread takes every
+    line waiting in the queue (up to `batch_size`) and appends them with
+    one write, rotating the file through ``RotatingFileHandler`` when it
+    would exceed `max_bytes`. Under load batches grow; when idle each line
+    is written as soon as it arrives. If the queue is full, lines are
+    dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        batch_size: int = 512,
+        max_queue: int = 10000,
+        echo: Optional[TextIO] = None
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.dropped = 0
+        self._echo = echo
+        self._queue: "queue.Queue[_Item]" = queue.Queue(maxsize=max_queue)
+        self._handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        self._handler.terminator = ""
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, path: str, echo: Optional[TextIO] = None) -> "BatchedLogWriter":
+        """Build a writer for `path` from LOG_FILE_MAX_MB, LOG_FILE_BACKUPS and LOG_QUEUE_SIZE."""
+        return cls(
+            path,
+            max_bytes=int(float(os.getenv("LOG_FILE_MAX_MB", "10")) * 1024 * 1024),
+            backup_count=int(os.getenv("LOG_FILE_BACKUPS", "5")),
+            max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            echo=echo
+        )
+
+    def write(self, line: str) -> bool:
+        """Queue one line (without its newline) for writing; never blocks.
+
+        Returns:
+            bool: False if the line was dropped because the queue is full
+                or the writer is closed
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            LOG_LINES_DROPPED.inc()
+            return False
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: List[str] = []
+            for item in items:
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                # Write what came before a flush marker or the stop signal
+                if lines:
+                    self._write(lines)
+                    lines = []
+                if item is None:
+                    return
+                item.set()
+            if lines:
+                self._write(lines)
+
+    def _write(self, lines: List[str]) -> None:
+        text = "\n".join(lines) + "\n"
+        # One record per batch: the handler checks rotation once per write
+        self._handler.handle(logging.makeLogRecord({"msg": text, "levelno": logging.INFO}))
+        if self._echo is not None:
+            try:
+                self._echo.write(text)
+                self._echo.flush()
+            except Exception:
+                pass
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until every line queued so far has been written.
+
+        Returns:
+            bool: False if the lines were not written within `timeout` seconds
+        """
+        if self._closed:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write the queued lines, stop the writer thread and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._handler.close()
@@ -0,0 +1,352 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from sub-millisecond image work up to
+# multi-minute OCR documents
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Base class for a named metric with optional labels."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, key: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add `amount` (must not be negative)."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{self._label_str(key)} {_format_value(v)}" for key, v in items]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in sorted(self._values.items())}
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, such as in-flight operations."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the enclosed block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{self._label_str(key)} {_format_value(v)}" for key, v in items]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in sorted(self._values.items())}
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the enclosed block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[-1]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-2] if series else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = self.header()
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{self._label_str(key, {'le': _format_value(bound)})} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {_format_value(series[-1])}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = sorted(self._series.items())
+        return {
+            ",".join(key): {
+                "count": int(series[-1]),
+                "sum": round(series[-2], 6),
+                "avg": round(series[-2] / series[-1], 6) if series[-1] else 0.0
+            }
+            for key, series in items
+        }
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Get all metric values as a JSON-serializable dict.
+
+        Returns:
+            Dict[str, Dict]: Values keyed by metric name, then by label values
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+# Process-wide registry shared by the services, the web API and the MCP server
+REGISTRY = MetricsRegistry()
+
+# Prometheus text format content type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "wrongmath_stage_duration_seconds",
+    "Wall time spent in each pipeline stage",
+    ["stage"]
+)
+PAGES = REGISTRY.counter(
+    "wrongmath_pages_total",
+    "Pages prepared for OCR",
+    ["source"]
+)
+PAGES_SKIPPED = REGISTRY.counter(
+    "wrongmath_pages_skipped_total",
+    "PDF pages not sent to OCR, by reason (blank or duplicate)",
+    ["reason"]
+)
+TEXT_LAYER_PAGES = REGISTRY.counter(
+    "wrongmath_text_layer_pages_total",
+    "PDF pages by how their content was obtained (text layer, mixed, or OCR)",
+    ["mode"]
+)
+PAGE_BLOCKS = REGISTRY.counter(
+    "wrongmath_page_blocks_total",
+    "Question blocks cropped from segmented PDF pages"
+)
+PAGES_SPILLED = REGISTRY.counter(
+    "wrongmath_pages_spilled_total",
+    "Encoded pages written to disk because the memory budget was reached"
+)
+IMAGE_INPUTS = REGISTRY.counter(
+    "wrongmath_image_inputs_total",
+    "Image files prepared for OCR, sent as-is or transcoded",
+    ["mode"]
+)
+PAGE_ENCODED_BYTES = REGISTRY.counter(
+    "wrongmath_page_encoded_bytes_total",
+    "Encoded PDF page bytes, by chosen image format",
+    ["format"]
+)
+PAGE_BYTES_SAVED = REGISTRY.counter(
+    "wrongmath_page_bytes_saved_total",
+    "Bytes saved by the page encoder against PNG of the same render"
+)
+OCR_REQUESTS = REGISTRY.counter(
+    "wrongmath_ocr_requests_total",
+    "OCR API calls by outcome",
+    ["outcome"]
+)
+OCR_BYTES_SENT = REGISTRY.counter(
+    "wrongmath_ocr_bytes_sent_total",
+    "Encoded image bytes sent to the OCR API"
+)
+OCR_RETRIES = REGISTRY.counter(
+    "wrongmath_ocr_retries_total",
+    "OCR API calls retried, by error",
+    ["reason"]
+)
+OCR_CACHE_LOOKUPS = REGISTRY.counter(
+    "wrongmath_ocr_cache_lookups_total",
+    "OCR result cache lookups",
+    ["result"]
+)
+OCR_COMPLETION_TOKENS = REGISTRY.counter(
+    "wrongmath_ocr_completion_tokens_total",
+    "Output tokens reported by the OCR API"
+)
+JOBS = REGISTRY.counter(
+    "wrongmath_jobs_total",
+    "OCR jobs finished, by final status",
+    ["status"]
+)
+JOBS_QUEUED = REGISTRY.gauge(
+    "wrongmath_jobs_queued",
+    "OCR jobs waiting for a worker"
+)
+LOG_LINES_DROPPED = REGISTRY.counter(
+    "wrongmath_log_lines_dropped_total",
+    "Log lines dropped because the log writer queue was full"
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "wrongmath_in_flight",
+    "Operations currently in progress",
+    ["operation"]
+)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one occurrence of a pipeline stage.
+
+    Args:
+        stage: Stage name, used as the ``stage`` label
+    """
+    with STAGE_SECONDS.time(stage=stage):
+        yield
@@ -0,0 +1,231 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, List, Optional
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import parse_options_header
+
+from core.utils.logger import setup_logger
+from core.utils.validators import FileSizeExceededError, InvalidUploadError
+
+logger = setup_logger("uploads")
+
+# Received chunks are gathered into writes of at least this many bytes,
+# each done on the shared blocking executor
+WRITE_SIZE = 1024 * 1024
+
+# Room for the multipart boundaries and part headers around an uploaded file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def max_upload_bytes() -> int:
+    """Upload size limit from OCR_MAX_UPLOAD_MB (default: 10 MB)."""
+    return int(float(os.getenv("OCR_MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+
+
+async def limit_stream(chunks: AsyncIterable[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass a request body through, failing as soon as it exceeds `max_bytes`.
+
+    Bodies sent with chunked transfer encoding have no Content-Length to
+    check up front, so the limit has to be enforced while they are read.
+
+    Raises:
+        FileSizeExceededError: Once more than `max_bytes` have been received
+    """
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise FileSizeExceededError(f"Request body exceeds limit ({max_bytes / 1024 / 1024:.1f} MB)")
+        yield chunk
+
+
+class MultipartFile:
+    """The file field of a multipart/form-data body, parsed as the body arrives.
+
+    ``open`` reads the body up to the end of the field's part headers and
+    returns its file name; ``chunks`` then yields the file's bytes as they
+    are parsed, so they can go straight to ``save_stream`` instead of being
+    spooled to a temporary file first. Other fields are skipped, and the
+    body after the file is not read.
+    """
+
+    def __init__(self, body: AsyncIterable[bytes], content_type: str, field: str = "file"):
+        _, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise InvalidUploadError("Missing boundary in multipart body")
+        self.field = field.encode("utf-8")
+        self.filename: Optional[str] = None
+        self._body = body.__aiter__()
+        self._state = "searching"
+        self._pending: List[bytes] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name, self._header_value = b"", b""
+
+    def _on_headers_finished(self) -> None:
+        if self._state != "searching":
+            return
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name") == self.field and b"filename" in options:
+            filename = options[b"filename"]
+            try:
+                self.filename = filename.decode("utf-8")
+            except UnicodeDecodeError:
+                self.filename = filename.decode("latin-1")
+            self._state = "file"
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._state == "file" and end > start:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._state == "file":
+            self._state = "done"
+
+    async def _read(self) -> bool:
+        """Feed the next chunk of the body to the parser; False at the end of the body."""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except FormParserError as e:
+            raise InvalidUploadError(f"Invalid multipart body: {e}")
+        return True
+
+    async def open(self) -> str:
+        """Read the body up to the file's data.
+
+        Returns:
+            str: File name sent by the client (may be empty)
+
+        Raises:
+            InvalidUploadError: If the body is malformed or has no file field
+        """
+        while self._state == "searching":
+            if not await self._read():
+                raise InvalidUploadError(f"Missing {self.field.decode()} field")
+        return self.filename
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Yield the file's bytes as they are parsed.
+
+        Raises:
+            InvalidUploadError: If the body is malformed or ends inside the file
+        """
+        await self.open()
+        while True:
+            pending, self._pending = self._pending, []
+            for data in pending:
+                yield data
+            if self._state == "done":
+                return
+            if not await self._read():
+                raise InvalidUploadError("Multipart body ended before the end of the file")
+
+
+@dataclass
+class SavedUpload:
+    """A file written by ``save_stream``."""
+
+    path: str
+    size: int
+    sha256: str
+
+
+async def save_stream(
+    chunks: AsyncIterable[bytes],
+    path: str,
+    max_bytes: Optional[int] = None
+) -> SavedUpload:
+    """Write a stream of chunks to `path` without holding the file in memory.
+
+    Chunks go to a temporary file next to `path`, which is renamed to
+    `path` once the stream is complete, so a partial upload never appears
+    under its final name. Writes and hashing run on the shared blocking
+    executor (``run_blocking``), so the event loop is not blocked by disk I/O.
+
+    Args:
+        chunks: File content
+        path: Final file path
+        max_bytes: Size limit (None: unlimited)
+
+    Returns:
+        SavedUpload: Path, size and SHA-256 hex digest of the file
+
+    Raises:
+        FileSizeExceededError: As soon as the stream exceeds `max_bytes`;
+            nothing is left on disk
+    """
+    # core.services imports core.utils, so the executor is imported here
+    from core.services.blocking import run_blocking
+
+    digest = hashlib.sha256()
+    size = 0
+    pending: List[bytes] = []
+    pending_size = 0
+    fd, temp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=os.path.dirname(path) or ".")
+
+    def write(file, data: bytes) -> None:
+        file.write(data)
+        digest.update(data)
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise FileSizeExceededError(
+                        f"File size exceeds limit ({max_bytes / 1024 / 1024:.1f} MB)"
+                    )
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= WRITE_SIZE:
+                    await run_blocking(write, file, b"".join(pending))
+                    pending, pending_size = [], 0
+            if pending:
+                await run_blocking(write, file, b"".join(pending))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    logger.info(f"Saved {size} bytes to {path}")
+    return SavedUpload(path=path, size=size, sha256=digest.hexdigest())
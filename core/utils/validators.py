@@ -28,6 +28,11 @@ class FileSizeExceededError(ValidationError):
     pass
 
 
+class InvalidUploadError(ValidationError):
+    """Raised when an upload body is malformed or has no file."""
+    pass
+
+
 def validate_file_path(file_path: str) -> bool:
     """Validate if file path is absolute and exists.
     
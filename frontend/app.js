@@ -225,6 +225,7 @@ async function uploadFile(file) {
 
 async function recognizeFile(filePath) {
     const cleanNumbers = document.getElementById('clean-numbers').checked;
+    const zoom = document.getElementById('zoom').value;
     
     const response = await fetch(`${API_BASE}/api/recognize`, {
         method: 'POST',
@@ -233,7 +234,9 @@ async function recognizeFile(filePath) {
         },
         body: JSON.stringify({
             file_path: filePath,
-            clean_numbers: cleanNumbers
+            clean_numbers: cleanNumbers,
+            // 'auto' 不传 zoom，由后端按页面内容自适应
+            zoom: zoom === 'auto' ? null : parseFloat(zoom)
         })
     });
     
@@ -2,7 +2,9 @@
  * Frontend Logging Utility
  * 
  * Logs are displayed in console with styled output.
- * Logs are also sent to the backend API for persistent storage.
+ * Logs are also sent to the backend API for persistent storage, batched
+ * (see FLUSH_INTERVAL_MS / MAX_BATCH_SIZE / MAX_BATCH_BYTES) and flushed
+ * with sendBeacon when the page is hidden or closed.
  * 
  * Usage:
  *   import logger from '@/utils/logger';
@@ -18,11 +20,24 @@ const LOG_LEVELS = {
   error: 3,
 };
 
+// Records are buffered and sent to /api/logs/batch together
+const FLUSH_INTERVAL_MS = 5000;
+const MAX_BATCH_SIZE = 50;
+const MAX_BUFFERED = 200;
+// Browsers cap sendBeacon and keepalive fetch bodies at about 64 KB in total,
+// so a batch stays well below that and a single record below a batch
+const MAX_BATCH_BYTES = 32 * 1024;
+const MAX_RECORD_BYTES = 8 * 1024;
+
+const byteLength = (text) => new TextEncoder().encode(text).length;
+
 class FrontendLogger {
   constructor() {
     this.level = process.env.NODE_ENV === 'production' ? 'info' : 'debug';
     this.apiEndpoint = null;
     this.sessionId = this.generateSessionId();
+    this.buffer = [];
+    this.flushTimer = null;
   }
 
   generateSessionId() {
@@ -84,32 +99,106 @@ class FrontendLogger {
     }
   }
 
-  async sendToBackend(level, message, data = null) {
+  getApiEndpoint() {
     if (!this.apiEndpoint) {
       // Try to get from window location
       this.apiEndpoint = typeof window !== 'undefined' 
         ? window.location.origin.replace(':3000', ':8000') 
         : null;
     }
-    
-    if (!this.apiEndpoint) return;
-    
+    return this.apiEndpoint;
+  }
+
+  sendToBackend(level, message, data = null) {
+    if (this.buffer.length >= MAX_BUFFERED) {
+      // Backend unreachable or throttling; drop the oldest record
+      this.buffer.shift();
+    }
+    this.buffer.push(this.fitRecord({ level, message, data, timestamp: this.getTimestamp() }));
+
+    if (this.buffer.length >= MAX_BATCH_SIZE) {
+      this.flush();
+    } else if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), FLUSH_INTERVAL_MS);
+    }
+  }
+
+  // A record too large for any batch is cut down, so it cannot hold up the ones after it
+  fitRecord(record) {
+    let size;
+    try {
+      size = byteLength(JSON.stringify(record));
+    } catch {
+      return { ...record, data: { unserializable: String(record.data) } };
+    }
+    if (size <= MAX_RECORD_BYTES) return record;
+    return {
+      ...record,
+      message: String(record.message).slice(0, 1000),
+      data: { truncated: true, bytes: size },
+    };
+  }
+
+  // Body for the oldest buffered records: at most MAX_BATCH_SIZE records and
+  // MAX_BATCH_BYTES bytes. The records stay in the buffer.
+  buildBatch() {
+    const batch = {
+      sessionId: this.sessionId,
+      userAgent: typeof navigator !== 'undefined' ? navigator.userAgent : 'unknown',
+      records: [],
+    };
+    let size = byteLength(JSON.stringify(batch));
+    for (const record of this.buffer.slice(0, MAX_BATCH_SIZE)) {
+      const recordSize = byteLength(JSON.stringify(record)) + 1;
+      if (batch.records.length > 0 && size + recordSize > MAX_BATCH_BYTES) break;
+      batch.records.push(record);
+      size += recordSize;
+    }
+    return { count: batch.records.length, body: JSON.stringify(batch) };
+  }
+
+  takeBatch() {
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    const { count, body } = this.buildBatch();
+    this.buffer.splice(0, count);
+    return body;
+  }
+
+  async flush() {
+    const endpoint = this.getApiEndpoint();
+    if (!endpoint || this.buffer.length === 0) return;
+
+    const body = this.takeBatch();
     try {
-      await fetch(`${this.apiEndpoint}/api/logs`, {
+      await fetch(`${endpoint}/api/logs/batch`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          level,
-          message,
-          data,
-          sessionId: this.sessionId,
-          timestamp: this.getTimestamp(),
-          userAgent: typeof navigator !== 'undefined' ? navigator.userAgent : 'unknown',
-        }),
+        body,
+        keepalive: true,
       });
     } catch (e) {
       // Silently fail - we don't want logging to break the app
     }
+    if (this.buffer.length > 0 && !this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), FLUSH_INTERVAL_MS);
+    }
+  }
+
+  // Send what is left when the page goes away; sendBeacon survives unload
+  flushOnExit() {
+    const endpoint = this.getApiEndpoint();
+    if (!endpoint || typeof navigator === 'undefined' || !navigator.sendBeacon) return;
+
+    while (this.buffer.length > 0) {
+      const { count, body } = this.buildBatch();
+      // Records leave the buffer only once the browser has queued them; on
+      // refusal (quota used up) they stay for the next flush
+      if (!navigator.sendBeacon(`${endpoint}/api/logs/batch`, body)) break;
+      this.buffer.splice(0, count);
+    }
   }
 
   configure(options = {}) {
@@ -188,6 +277,13 @@ if (typeof window !== 'undefined') {
       stack: event.reason?.stack
     });
   });
+
+  window.addEventListener('pagehide', () => logger.flushOnExit());
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+      logger.flushOnExit();
+    }
+  });
 }
 
 export default logger;
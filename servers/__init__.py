@@ -1,9 +1,8 @@
 """
 Servers Module
 
-Server implementations for Web UI (FastAPI) and MCP (stdio).
+Server implementations for the MCP server (stdio) and the mock OCR provider.
+The Web UI backend (FastAPI) lives in web.py at the project root.
 """
 
-from . import web, mcp
-
-__all__ = ["web", "mcp"]
+__all__ = ["mcp", "mock_ocr"]
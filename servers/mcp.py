@@ -3,7 +3,7 @@ import json
 import os
 import re
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Union
 
 from dotenv import load_dotenv
 
@@ -12,9 +12,17 @@ from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 import mcp.types as types
 
-from core.services.file_processor import process_file, get_file_info
-from core.services.ocr_service import create_ocr_service
+from core.services.blocking import close_blocking_executor, run_blocking
+from core.services.file_processor import aiter_file_pages, count_pages, process_file, get_file_info
+from core.services.ocr_service import create_ocr_service, close_ocr_service
+from core.services.ocr_cache import get_ocr_cache
+from core.services.page_encoder import PageImage
+from core.services.page_filter import PageFilter
+from core.services.rasterizer import close_render_pool
+from core.services.resolution import parse_zoom
+from core.services.text_layer import PageText, TextLayerPolicy
 from core.utils.logger import setup_logger
+from core.utils.metrics import IN_FLIGHT, REGISTRY, span
 from core.utils.validators import ValidationError, FileNotFoundError
 
 # Load .env file from project root
@@ -74,6 +82,15 @@ def clean_question_numbers(text: str) -> str:
     return result.strip()
 
 
+def write_text_file(path: str, text: str) -> None:
+    """Write text to a file, creating its directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
 # Custom exceptions for the server
 class ServerError(Exception):
     """Base exception for server errors."""
@@ -94,11 +111,80 @@ class ProcessingError(ServerError):
 server = Server("wrongmath")
 
 
-async def read_math_file_handler(file_path: str) -> Dict[str, Any]:
+# Callback receiving OCR stream events (see OCRService.stream_pages)
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def make_progress_reporter() -> Optional[ProgressCallback]:
+    """Build a callback that forwards OCR progress to the MCP client.
+    
+    Only active when the client sent a progress token with the tool call.
+    Completed page groups are reported as progress notifications; partial
+    text is sent as log messages, line by line for the streamed first page
+    and page by page afterwards.
+    
+    Returns:
+        Optional[ProgressCallback]: Reporter, or None if the client did not ask for progress
+    """
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+    
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+    
+    pending: List[str] = []
+    streamed: Set[int] = set()
+    
+    async def report(event: Dict[str, Any]) -> None:
+        if event["type"] == "delta":
+            streamed.add(event["index"])
+            pending.append(event["text"])
+            if "\n" not in event["text"]:
+                return
+            text = "".join(pending)
+        elif event["index"] in streamed:
+            # Only the rest of a streamed batch is left to send
+            text = "".join(pending)
+        else:
+            text = event["text"]
+        pending.clear()
+        
+        if text.strip():
+            await ctx.session.send_log_message(level="info", data=text, logger="wrongmath")
+        if event["type"] == "page":
+            await ctx.session.send_progress_notification(token, event["completed"], event["total"])
+    
+    return report
+
+
+async def count_images(
+    pages: AsyncIterator[Union[PageImage, PageText]],
+    images: List[int]
+) -> AsyncIterator[Union[PageImage, PageText]]:
+    """Pass pages through, appending the page number of each image (page or question block) to `images`."""
+    try:
+        async for page in pages:
+            if not isinstance(page, PageText):
+                images.append(page.page)
+            yield page
+    finally:
+        await pages.aclose()
+
+
+async def read_math_file_handler(
+    file_path: str,
+    progress: Optional[ProgressCallback] = None,
+    zoom: Optional[float] = None
+) -> Dict[str, Any]:
     """Handle the read_math_file tool execution.
     
     Args:
         file_path: Path to the file to process
+        progress: Optional callback receiving streamed OCR events
+        zoom: PDF render zoom factor (None for per-page adaptive zoom)
         
     Returns:
         Dict[str, Any]: Result containing the processed content
@@ -125,23 +211,37 @@ async def read_math_file_handler(file_path: str) -> Dict[str, Any]:
         logger.info("File validation passed")
         
         # Get file information
-        file_info = get_file_info(file_path)
+        file_info = await run_blocking(get_file_info, file_path)
         logger.info(f"File info: {file_info['file_size_mb']:.2f} MB, {file_info.get('extension', 'unknown')}")
         
-        # Process the file (PDF or image)
-        base64_images, num_pages = process_file(file_path)
-        
-        if not base64_images:
+        zoom = parse_zoom(zoom)
+        num_pages = await run_blocking(count_pages, file_path)
+        if not num_pages:
             raise ProcessingError("No images could be extracted from the file")
         
-        logger.info(f"Successfully processed {len(base64_images)} images from {num_pages} pages")
-        
         # Get OCR service
         ocr_service = await create_ocr_service()
         
-        # Perform OCR recognition
+        # Blank pages and repeats of earlier pages are not sent to OCR
+        page_filter = PageFilter.from_env()
+        
+        # Perform OCR recognition, one request per page batch. Pages are sent
+        # as soon as they are rendered; text from a PDF's text layer skips OCR
         logger.info("Starting OCR recognition")
-        recognized_text = await ocr_service.recognize_text(base64_images)
+        images: List[int] = []
+        pages = count_images(
+            aiter_file_pages(file_path, zoom=zoom, page_filter=page_filter, text_layer=TextLayerPolicy.from_env()),
+            images
+        )
+        if progress is None:
+            recognized_text = await ocr_service.recognize_page_stream(pages)
+        else:
+            page_texts = []
+            async for event in ocr_service.stream_pages(pages, total_pages=num_pages):
+                if event["type"] == "page":
+                    page_texts.append(event["text"])
+                await progress(event)
+            recognized_text = "\n\n".join(page_texts)
         
         if not recognized_text or not recognized_text.strip():
             raise ProcessingError("OCR returned empty result")
@@ -155,9 +255,15 @@ async def read_math_file_handler(file_path: str) -> Dict[str, Any]:
             "file_info": file_info,
             "content": recognized_text,
             "pages_processed": num_pages,
-            "images_processed": len(base64_images)
+            # Page images and question blocks sent to OCR (text-layer pages need none)
+            "images_processed": len(images),
+            **page_filter.stats()
         }
         
+        cache = get_ocr_cache()
+        if cache is not None:
+            result["cache"] = cache.stats()
+        
         return result
         
     except (ValidationError, FileNotFoundError) as e:
@@ -204,7 +310,7 @@ async def recognize_image_handler(image_path: str, output_path: Optional[str] =
         logger.info("Image validation passed")
         
         # Process the image
-        base64_images, num_pages = process_file(image_path)
+        base64_images, num_pages = await run_blocking(process_file, image_path)
         
         if not base64_images:
             raise ProcessingError("Failed to process image")
@@ -221,7 +327,8 @@ async def recognize_image_handler(image_path: str, output_path: Optional[str] =
         
         # Clean up question number prefixes
         logger.info("Cleaning question number prefixes")
-        recognized_text = clean_question_numbers(recognized_text)
+        with span("clean_question_numbers"):
+            recognized_text = clean_question_numbers(recognized_text)
         
         logger.info("OCR recognition completed successfully")
         
@@ -233,14 +340,8 @@ async def recognize_image_handler(image_path: str, output_path: Optional[str] =
         if not os.path.isabs(output_path):
             raise InvalidArgumentError("output_path must be an absolute path")
         
-        # Create output directory if needed
-        output_dir = os.path.dirname(output_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir, exist_ok=True)
-        
-        # Save to markdown file
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(recognized_text)
+        # Save to markdown file, off the event loop
+        await run_blocking(write_text_file, output_path, recognized_text)
         
         logger.info(f"Saved OCR result to: {output_path}")
         
@@ -263,19 +364,59 @@ async def recognize_image_handler(image_path: str, output_path: Optional[str] =
         raise ProcessingError(f"Failed to recognize image: {e}")
 
 
+def metrics_handler(format: str = "prometheus") -> str:
+    """Dump the process metrics (stage timings, counters, in-flight gauges).
+    
+    Args:
+        format: "prometheus" for the text exposition format, "json" for a summary
+        
+    Returns:
+        str: Rendered metrics
+        
+    Raises:
+        InvalidArgumentError: If the format is unknown
+    """
+    if format == "prometheus":
+        return REGISTRY.render()
+    if format == "json":
+        return json.dumps(REGISTRY.snapshot(), ensure_ascii=False, indent=2)
+    raise InvalidArgumentError(f"Unknown metrics format: {format}. Use prometheus or json.")
+
+
+def result_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the page counts and skipped pages of a read_math_file result for the tool reply.
+
+    Args:
+        result: Result of ``read_math_file_handler``
+
+    Returns:
+        Dict[str, Any]: Processed and skipped page counts, the blank pages and
+            the duplicate → original page mapping
+    """
+    keys = (
+        "pages_processed", "images_processed",
+        "blank_pages_skipped", "duplicate_pages_skipped", "blank_pages", "duplicate_pages"
+    )
+    return {key: result[key] for key in keys if key in result}
+
+
 @server.list_tools()
 async def handle_list_tools() -> List[types.Tool]:
     """List available tools for this server."""
     return [
         types.Tool(
             name="read_math_file",
-            description="读取本地数学题目文件（PDF/图片），利用 DeepSeek-OCR 转换为 Markdown + LaTeX 格式。支持识别复杂公式、几何图形和函数表达式。",
+            description="读取本地数学题目文件（PDF/图片），利用 DeepSeek-OCR 转换为 Markdown + LaTeX 格式。支持识别复杂公式、几何图形和函数表达式。第二个文本块为 JSON 元数据：处理的页数、跳过的空白页和重复页（重复页 → 原页）。",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "file_path": {
                         "type": "string",
                         "description": "本地文件的绝对路径 (例如: /Users/gubin/Desktop/test.pdf)"
+                    },
+                    "zoom": {
+                        "type": "number",
+                        "description": "可选，PDF 渲染缩放倍数 (1.0 = 72 DPI)。不提供则按每页内容自适应：小字号和密集公式的页面放大，稀疏页面缩小"
                     }
                 },
                 "required": ["file_path"]
@@ -298,6 +439,20 @@ async def handle_list_tools() -> List[types.Tool]:
                 },
                 "required": ["image_path"]
             }
+        ),
+        types.Tool(
+            name="get_metrics",
+            description="导出服务运行指标：各阶段耗时（PDF 渲染、编码、OCR 请求、题号清洗等）、页数、发送字节数、重试次数、缓存命中和进行中的请求数。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["prometheus", "json"],
+                        "description": "输出格式，默认 prometheus 文本格式"
+                    }
+                }
+            }
         )
     ]
 
@@ -313,7 +468,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
                 raise InvalidArgumentError("file_path argument is required")
             
             file_path = arguments["file_path"]
-            result = await read_math_file_handler(file_path)
+            with IN_FLIGHT.track(operation="read_math_file"), span("read_math_file"):
+                result = await read_math_file_handler(file_path, make_progress_reporter(), arguments.get("zoom"))
             
             # Format the result for the user
             content = result["content"]
@@ -322,7 +478,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
                 types.TextContent(
                     type="text",
                     text=f"Successfully processed: {result['file_path']}\n\n{content}"
-                )
+                ),
+                types.TextContent(type="text", text=json.dumps(result_metadata(result), ensure_ascii=False))
             ]
         
         elif name == "recognize_image":
@@ -332,7 +489,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
             image_path = arguments["image_path"]
             output_path = arguments.get("output_path")
             
-            result = await recognize_image_handler(image_path, output_path)
+            with IN_FLIGHT.track(operation="recognize_image"), span("recognize_image"):
+                result = await recognize_image_handler(image_path, output_path)
             
             return [
                 types.TextContent(
@@ -341,6 +499,10 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
                 )
             ]
         
+        elif name == "get_metrics":
+            format = (arguments or {}).get("format", "prometheus")
+            return [types.TextContent(type="text", text=metrics_handler(format))]
+        
         else:
             raise InvalidArgumentError(f"Unknown tool: {name}")
     
@@ -372,13 +534,24 @@ async def main():
         if not api_key:
             logger.warning("SILICONFLOW_API_KEY not found in environment variables")
         
+        # Create the shared OCR client once so tool calls reuse its connections
+        try:
+            await create_ocr_service()
+        except ValidationError as e:
+            logger.warning(f"OCR service not initialized at startup: {e}")
+        
         # Run the server using stdio transport
-        async with stdio_server() as (read_stream, write_stream):
-            await server.run(
-                read_stream,
-                write_stream,
-                server.create_initialization_options()
-            )
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    server.create_initialization_options()
+                )
+        finally:
+            await close_ocr_service()
+            close_render_pool()
+            close_blocking_executor()
             
     except KeyboardInterrupt:
         logger.info("Server interrupted by user")
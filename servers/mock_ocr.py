@@ -0,0 +1,115 @@
+"""
+Mock OCR provider - OpenAI-compatible HTTP server
+
+Serves POST /v1/chat/completions with canned Markdown from FakeBackend,
+including simulated latency, 500s and 429s with Retry-After, so the full
+HTTP path (connection pool, retries, rate limiting, streaming) can be
+benchmarked and load-tested without network access or API spend.
+
+Usage:
+    python -m servers.mock_ocr --port 9000 --latency-ms 800 --throttle-rate 0.05
+    SILICONFLOW_BASE_URL=http://127.0.0.1:9000/v1 SILICONFLOW_API_KEY=mock python web.py
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from core.services.ocr_backends import (
+    FakeBackend,
+    SimulatedProviderError,
+    build_completion,
+    chunk_text
+)
+from core.utils.logger import setup_logger
+
+logger = setup_logger("mock_ocr")
+
+
+class ChatCompletionRequest(BaseModel):
+    """Subset of the OpenAI chat completion request used by OCRService."""
+    model: str
+    messages: List[Dict[str, Any]]
+    max_tokens: int = 2048
+    temperature: Optional[float] = None
+    stream: bool = False
+
+
+def create_app(backend: Optional[FakeBackend] = None) -> FastAPI:
+    """Create the mock provider app around a FakeBackend."""
+    backend = backend or FakeBackend()
+    app = FastAPI(title="WrongMath Mock OCR Provider")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: ChatCompletionRequest):
+        try:
+            text, finish_reason, completion_tokens = await backend.respond(request.messages, request.max_tokens)
+        except SimulatedProviderError as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                headers=e.headers(),
+                content={"error": {"message": str(e), "code": e.status_code}}
+            )
+
+        completion = build_completion(request.model, text, finish_reason, completion_tokens)
+        if not request.stream:
+            return completion.model_dump()
+
+        def event_stream():
+            deltas = chunk_text(text)
+            for i, delta in enumerate(deltas):
+                chunk = {
+                    "id": completion.id,
+                    "object": "chat.completion.chunk",
+                    "created": completion.created,
+                    "model": request.model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": delta},
+                        "finish_reason": finish_reason if i == len(deltas) - 1 else None
+                    }]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return backend.info()
+
+    return app
+
+
+def main():
+    """Run the mock provider with uvicorn."""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock OCR provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=None, help="median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=None, help="log-normal latency spread")
+    parser.add_argument("--error-rate", type=float, default=None, help="fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=None, help="fraction of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds on 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    backend = FakeBackend(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    logger.info(f"Mock OCR provider on http://{args.host}:{args.port}/v1 ({backend.info()})")
+
+    import uvicorn
+    uvicorn.run(create_app(backend), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import pytest
+
+from benchmarks.file_processor import (
+    BenchCase,
+    BenchResult,
+    compare_results,
+    load_baseline,
+    measure,
+    save_baseline
+)
+
+
+class TestMeasure:
+    """Test cases for measuring a single benchmark case."""
+
+    def test_measure_reports_time_memory_and_bytes(self):
+        """Test a case is timed, traced and sized."""
+        calls = []
+
+        def run():
+            calls.append(bytearray(1024 * 1024))
+            return 42
+
+        result = measure(BenchCase("alloc:x", "alloc", "x", run), repeat=3, warmup=1)
+
+        # warmup + timed runs + one traced run
+        assert len(calls) == 5
+        assert result.repeat == 3
+        assert result.output_bytes == 42
+        assert result.peak_mb >= 1.0
+        assert result.wall_min_ms <= result.wall_ms
+
+
+class TestBaselines:
+    """Test cases for saving and comparing baselines."""
+
+    def test_save_and_load_round_trip(self, tmp_path, result):
+        """Test saved baselines load back keyed by case name."""
+        save_baseline("main", [result], directory=tmp_path)
+
+        baseline = load_baseline("main", directory=tmp_path)
+
+        assert baseline["name"] == "main"
+        assert baseline["results"]["process_file:a.pdf"]["wall_ms"] == 100.0
+        assert "python" in baseline["environment"]
+
+    def test_missing_baseline_raises(self, tmp_path):
+        """Test loading an unknown baseline fails clearly."""
+        with pytest.raises(FileNotFoundError):
+            load_baseline("nope", directory=tmp_path)
+
+    def test_compare_flags_growth_above_threshold(self, result):
+        """Test only metrics growing beyond the threshold are regressions."""
+        baseline = {"process_file:a.pdf": {"wall_ms": 80.0, "peak_mb": 2.0, "output_bytes": 1000}}
+
+        rows = {row["metric"]: row for row in compare_results(baseline, [result], threshold=0.10)}
+
+        assert rows["wall_ms"]["change"] == pytest.approx(0.25)
+        assert rows["wall_ms"]["regression"]
+        assert not rows["peak_mb"]["regression"]
+        assert not rows["output_bytes"]["regression"]
+
+    def test_compare_skips_new_cases(self, result):
+        """Test cases missing from the baseline are not compared."""
+        assert compare_results({}, [result]) == []
+
+
+# Pytest fixtures
+@pytest.fixture
+def result():
+    """Create a benchmark result for one case."""
+    return BenchResult(
+        name="process_file:a.pdf",
+        function="process_file",
+        input="a.pdf",
+        wall_ms=100.0,
+        wall_min_ms=90.0,
+        peak_mb=2.1,
+        output_bytes=1000,
+        repeat=5
+    )
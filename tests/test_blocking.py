@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from core.services import blocking
+from core.services.blocking import blocking_workers, close_blocking_executor, get_blocking_executor, run_blocking
+from core.utils.metrics import STAGE_SECONDS
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestRunBlocking:
+    """Test cases for running blocking work off the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, executor):
+        """Test the loop keeps running while a blocking call is in progress."""
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        result = await run_blocking(time.sleep, 0.2)
+        ticker.cancel()
+
+        assert result is None
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_runs_in_named_worker_thread(self, executor):
+        """Test calls run on the shared executor's threads, with their arguments."""
+        def work(a, b=0):
+            return threading.current_thread().name, a + b
+
+        name, total = await run_blocking(work, 2, b=3)
+
+        assert name.startswith("blocking")
+        assert total == 5
+
+    @pytest.mark.asyncio
+    async def test_context_is_carried_over(self, executor):
+        """Test context variables set by the caller are visible to the call."""
+        request_id.set("abc")
+
+        assert await run_blocking(request_id.get) == "abc"
+
+    @pytest.mark.asyncio
+    async def test_exceptions_propagate(self, executor):
+        """Test an exception raised by the call is raised to the caller."""
+        def fail():
+            raise ValueError("broken page")
+
+        with pytest.raises(ValueError, match="broken page"):
+            await run_blocking(fail)
+
+    @pytest.mark.asyncio
+    async def test_size_bounds_concurrency(self, executor, monkeypatch):
+        """Test at most OCR_BLOCKING_WORKERS calls run at once, the rest wait."""
+        close_blocking_executor()
+        monkeypatch.setenv("OCR_BLOCKING_WORKERS", "2")
+        before = STAGE_SECONDS.snapshot()
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        await asyncio.gather(*(run_blocking(work) for _ in range(6)))
+
+        assert peak == 2
+        assert STAGE_SECONDS.snapshot() != before
+
+    def test_blocking_workers(self, monkeypatch):
+        """Test the executor size is read from the environment."""
+        monkeypatch.delenv("OCR_BLOCKING_WORKERS", raising=False)
+        assert blocking_workers() == 4
+
+        monkeypatch.setenv("OCR_BLOCKING_WORKERS", "0")
+        assert blocking_workers() == 1
+
+    def test_executor_is_shared_until_closed(self, executor):
+        """Test the executor is created once and replaced after closing."""
+        first = get_blocking_executor()
+        assert get_blocking_executor() is first
+
+        close_blocking_executor()
+
+        assert blocking._executor is None
+        assert get_blocking_executor() is not first
+
+
+# Pytest fixtures
+@pytest.fixture
+def executor():
+    """Start each test with a fresh shared executor and shut it down afterwards."""
+    close_blocking_executor()
+    yield
+    close_blocking_executor()
@@ -1,19 +1,30 @@
+import asyncio
 import base64
 import os
+import threading
+from io import BytesIO
 import tempfile
 import pytest
 from unittest.mock import Mock, patch, mock_open
 
-from src.services.file_processor import (
+from PIL import Image
+
+from core.services.file_processor import (
     pdf_to_images,
+    pdf_to_base64_images,
     image_to_base64,
+    image_file_to_base64,
+    iter_file_pages,
+    aiter_file_pages,
+    count_pages,
     process_file,
     get_file_info,
     FileProcessingError,
     PDFProcessingError,
     ImageProcessingError
 )
-from src.utils.validators import FileNotFoundError, ValidationError
+from core.services.page_encoder import encode_page
+from core.utils.validators import FileNotFoundError, ValidationError
 
 
 class TestPDFToImages:
@@ -38,18 +49,153 @@ class TestPDFToImages:
             pdf_to_images(corrupted_pdf_file)
 
 
+class TestPDFToBase64Images:
+    """Test cases for rendering PDF pages straight to base64."""
+    
+    def test_renders_each_page_once_as_png(self, sample_pdf):
+        """Test each page is encoded to PNG by MuPDF, without PIL."""
+        with patch('core.services.file_processor.Image') as mock_pil:
+            result = pdf_to_base64_images(sample_pdf)
+        
+        assert len(result) == 2
+        assert base64.b64decode(result[0]).startswith(b"\x89PNG")
+        mock_pil.open.assert_not_called()
+    
+    def test_renders_jpeg_at_zoom(self, sample_pdf):
+        """Test JPEG output and zoom are applied."""
+        result = pdf_to_base64_images(sample_pdf, format="JPEG", zoom=2.0)
+        
+        data = base64.b64decode(result[0])
+        assert data.startswith(b"\xff\xd8")
+        with Image.open(BytesIO(data)) as img:
+            assert img.size == (400, 600)
+    
+    def test_process_file_pdf_uses_direct_render(self, sample_pdf):
+        """Test process_file returns one encoded image per page."""
+        images, num_pages = process_file(sample_pdf)
+        
+        assert num_pages == 2
+        assert images == pdf_to_base64_images(sample_pdf, format=None)
+    
+    def test_pdf_to_images_matches_pixmap(self, sample_pdf):
+        """Test PIL images are built from raw pixmap samples."""
+        images = pdf_to_images(sample_pdf, zoom=1.0)
+        
+        assert [img.size for img in images] == [(200, 300), (200, 300)]
+        assert images[0].mode == "RGB"
+    
+    def test_pdf_to_images_uses_configured_zoom(self, sample_pdf):
+        """Test pdf_to_images applies OCR_PDF_ZOOM when no zoom is given."""
+        with patch.dict(os.environ, {"OCR_PDF_ZOOM": "1.5"}):
+            images = pdf_to_images(sample_pdf, parallel=False)
+        
+        assert [img.size for img in images] == [(300, 450), (300, 450)]
+    
+    def test_pdf_to_images_renders_adaptively_by_default(self, sample_pdf):
+        """Test pdf_to_images picks each page's zoom when OCR_PDF_ZOOM is auto."""
+        with patch.dict(os.environ, {"OCR_PDF_ZOOM": "auto"}), \
+                patch("core.services.file_processor.page_zoom", return_value=2.0) as page_zoom:
+            images = pdf_to_images(sample_pdf, parallel=False)
+        
+        assert page_zoom.call_count == 2
+        assert images[0].size == (400, 600)
+    
+    def test_missing_pdf_raises_file_not_found(self):
+        """Test a missing PDF is reported as such."""
+        with pytest.raises(FileNotFoundError):
+            pdf_to_base64_images("/nonexistent/file.pdf")
+
+
+class TestPageIterators:
+    """Test cases for lazily producing pages."""
+    
+    def test_iter_file_pages_matches_process_file(self, sample_pdf):
+        """Test the lazy iterator yields the same pages as process_file."""
+        assert list(iter_file_pages(sample_pdf)) == process_file(sample_pdf)[0]
+        assert count_pages(sample_pdf) == 2
+    
+    def test_iter_file_pages_renders_on_demand(self, sample_pdf):
+        """Test a page is only rendered when it is requested."""
+        with patch("core.services.file_processor.encode_page", wraps=encode_page) as mock_encode:
+            pages = iter_file_pages(sample_pdf)
+            assert mock_encode.call_count == 0
+            
+            next(pages)
+            assert mock_encode.call_count == 1
+    
+    def test_iter_file_pages_carries_page_numbers(self, sample_pdf):
+        """Test every yielded image knows the page it was rendered from."""
+        pages = list(iter_file_pages(sample_pdf))
+        
+        assert [page.page for page in pages] == [1, 2]
+    
+    def test_iter_file_pages_unsupported_type(self, tmp_path):
+        """Test unsupported files are rejected on first use."""
+        with pytest.raises(ValidationError):
+            next(iter_file_pages(str(tmp_path / "notes.txt")))
+    
+    @pytest.mark.asyncio
+    async def test_aiter_file_pages_yields_in_order(self, sample_pdf):
+        """Test the background renderer yields every page in order."""
+        pages = [page async for page in aiter_file_pages(sample_pdf)]
+        
+        assert pages == process_file(sample_pdf)[0]
+    
+    @pytest.mark.asyncio
+    async def test_aiter_file_pages_propagates_errors(self, tmp_path):
+        """Test errors raised while rendering reach the consumer."""
+        with pytest.raises(FileNotFoundError):
+            async for _ in aiter_file_pages(str(tmp_path / "missing.pdf")):
+                pass
+    
+    @pytest.mark.asyncio
+    async def test_aiter_file_pages_renders_on_blocking_executor(self, sample_pdf):
+        """Test pages are rendered on the shared blocking executor threads."""
+        threads = []
+        
+        def fake_pages(file_path, **kwargs):
+            for page in ("a", "b", "c"):
+                threads.append(threading.current_thread().name)
+                yield page
+        
+        with patch("core.services.file_processor.iter_file_pages", fake_pages):
+            pages = [page async for page in aiter_file_pages(sample_pdf, buffer_size=1)]
+        
+        assert pages == ["a", "b", "c"]
+        assert threads and all(name.startswith("blocking") for name in threads)
+    
+    @pytest.mark.asyncio
+    async def test_aiter_file_pages_closes_file_when_consumer_stops(self, sample_pdf):
+        """Test breaking out early stops rendering and closes the page iterator."""
+        closed = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        
+        def fake_pages(file_path, **kwargs):
+            try:
+                for page in range(100):
+                    yield str(page)
+            finally:
+                loop.call_soon_threadsafe(closed.set)
+        
+        with patch("core.services.file_processor.iter_file_pages", fake_pages):
+            async for page in aiter_file_pages(sample_pdf, buffer_size=1):
+                break
+        
+        await asyncio.wait_for(closed.wait(), timeout=5)
+
+
 class TestImageToBase64:
     """Test cases for image to base64 conversion."""
     
     def test_image_to_base64_png_success(self, mock_image):
         """Test successful PNG image to base64 conversion."""
-        with patch('src.services.file_processor.Image') as mock_pil:
+        with patch('core.services.file_processor.Image') as mock_pil:
             mock_pil.Image.fromarray.return_value = mock_image
             mock_image.convert.return_value = mock_image
             mock_image.save = Mock()
             
             # Mock BytesIO
-            with patch('src.services.file_processor.BytesIO') as mock_buffer:
+            with patch('core.services.file_processor.BytesIO') as mock_buffer:
                 mock_buffer_instance = Mock()
                 mock_buffer_instance.getvalue.return_value = b'fake_image_data'
                 mock_buffer.return_value = mock_buffer_instance
@@ -64,13 +210,13 @@ class TestImageToBase64:
     
     def test_image_to_base64_jpeg_conversion(self, mock_image):
         """Test JPEG image to base64 conversion with RGB conversion."""
-        with patch('src.services.file_processor.Image') as mock_pil:
+        with patch('core.services.file_processor.Image') as mock_pil:
             mock_pil.Image.fromarray.return_value = mock_image
             mock_image.convert = Mock()
             mock_image.save = Mock()
             
             # Mock BytesIO
-            with patch('src.services.file_processor.BytesIO') as mock_buffer:
+            with patch('core.services.file_processor.BytesIO') as mock_buffer:
                 mock_buffer_instance = Mock()
                 mock_buffer_instance.getvalue.return_value = b'fake_image_data'
                 mock_buffer.return_value = mock_buffer_instance
@@ -88,11 +234,69 @@ class TestImageToBase64:
         """Test image processing error handling."""
         mock_image.save.side_effect = Exception("Processing failed")
         
-        with patch('src.services.file_processor.BytesIO'):
+        with patch('core.services.file_processor.BytesIO'):
             with pytest.raises(ImageProcessingError, match="Image processing failed"):
                 image_to_base64(mock_image)
 
 
+class TestImageFileToBase64:
+    """Test cases for encoding image files with pass-through."""
+    
+    def test_jpeg_within_limits_is_sent_as_is(self, tmp_path):
+        """Test an acceptable JPEG is base64 encoded without re-encoding."""
+        path = save_image(tmp_path / "photo.jpg", (300, 200), "JPEG")
+        
+        with patch('core.services.file_processor.image_to_base64') as mock_encode:
+            result = image_file_to_base64(path)
+        
+        assert base64.b64decode(result) == open(path, "rb").read()
+        mock_encode.assert_not_called()
+    
+    def test_format_is_detected_from_content(self, tmp_path):
+        """Test a PNG saved with a .jpg name is passed through as PNG."""
+        path = save_image(tmp_path / "screenshot.jpg", (300, 200), "PNG", mode="RGBA")
+        
+        result = image_file_to_base64(path)
+        
+        assert base64.b64decode(result) == open(path, "rb").read()
+    
+    def test_large_image_is_downscaled(self, tmp_path):
+        """Test images over max_side are resized and keep their format."""
+        path = save_image(tmp_path / "photo.jpg", (4000, 3000), "JPEG")
+        
+        result = image_file_to_base64(path, max_side=2000)
+        
+        with Image.open(BytesIO(base64.b64decode(result))) as img:
+            assert img.format == "JPEG"
+            assert img.size == (2000, 1500)
+    
+    def test_oversized_png_is_converted_to_jpeg(self, tmp_path):
+        """Test a PNG over max_bytes is re-encoded as JPEG."""
+        path = save_image(tmp_path / "scan.png", (300, 200), "PNG")
+        
+        result = image_file_to_base64(path, max_bytes=10)
+        
+        assert base64.b64decode(result).startswith(b"\xff\xd8")
+    
+    def test_exif_rotation_is_applied(self, tmp_path):
+        """Test photos with an EXIF orientation are rotated upright."""
+        image = Image.new("RGB", (300, 200), "white")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        path = str(tmp_path / "rotated.jpg")
+        image.save(path, "JPEG", exif=exif)
+        
+        result = image_file_to_base64(path)
+        
+        with Image.open(BytesIO(base64.b64decode(result))) as img:
+            assert img.size == (200, 300)
+    
+    def test_unreadable_image_raises_error(self, corrupted_image_file):
+        """Test corrupt image data raises ImageProcessingError."""
+        with pytest.raises(ImageProcessingError):
+            image_file_to_base64(corrupted_image_file)
+
+
 class TestProcessFile:
     """Test cases for file processing."""
     
@@ -166,7 +370,28 @@ class TestGetFileInfo:
             get_file_info("/nonexistent/file.pdf")
 
 
+def save_image(path, size, format, mode="RGB"):
+    """Save a blank image and return its path as a string."""
+    Image.new(mode, size, "white").save(str(path), format)
+    return str(path)
+
+
 # Pytest fixtures
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """Create a real two-page PDF with some text."""
+    import fitz
+    
+    doc = fitz.open()
+    for page_num in range(2):
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 50), f"Page {page_num + 1}: x^2 + 1 = 0")
+    path = tmp_path / "sample.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
 @pytest.fixture
 def mock_image():
     """Create a mock PIL Image object."""
@@ -285,7 +510,7 @@ def mock_pdf_document():
 @pytest.fixture
 def mock_pdf(mocker, mock_pdf_document):
     """Mock PDF processing with mock_pdf_document."""
-    with mocker.patch('src.services.file_processor.fitz') as mock_fit:
+    with mocker.patch('core.services.file_processor.fitz') as mock_fit:
         mock_fit.open.return_value = mock_pdf_document
         mock_fit.Matrix.return_value = Mock()
         
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+
+from core.services.hedging import HedgeBudget, LatencyTracker, run_hedged
+
+
+class TestLatencyTracker:
+    """Test cases for the latency window."""
+
+    def test_percentile_needs_min_samples(self):
+        """Test no percentile is reported before enough samples."""
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(1.0)
+        tracker.record(2.0)
+
+        assert tracker.percentile(95) is None
+
+    def test_percentile(self):
+        """Test percentile over the window."""
+        tracker = LatencyTracker(min_samples=1)
+        for value in range(1, 101):
+            tracker.record(float(value))
+
+        assert tracker.percentile(50) == 50.0
+        assert tracker.percentile(95) == 95.0
+        assert tracker.percentile(100) == 100.0
+
+    def test_window_drops_old_samples(self):
+        """Test only the most recent samples are kept."""
+        tracker = LatencyTracker(window=3, min_samples=1)
+        for value in [100.0, 1.0, 2.0, 3.0]:
+            tracker.record(value)
+
+        assert len(tracker) == 3
+        assert tracker.percentile(100) == 3.0
+
+
+class TestHedgeBudget:
+    """Test cases for the hedge budget."""
+
+    def test_budget_caps_hedged_fraction(self):
+        """Test at most `max_fraction` of calls are hedged."""
+        budget = HedgeBudget(max_fraction=0.2)
+        spent = 0
+        for _ in range(20):
+            budget.record_call()
+            spent += budget.try_spend()
+
+        assert spent == 4
+        assert budget.stats()["hedged_fraction"] == 0.2
+
+
+class TestRunHedged:
+    """Test cases for hedged execution."""
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        """Test a call finishing before the threshold sends no duplicate."""
+        calls = []
+
+        async def call():
+            calls.append("primary")
+            return "primary"
+
+        async def hedge():
+            calls.append("hedge")
+            return "hedge"
+
+        result = await run_hedged(call, hedge, 0.5, HedgeBudget(1.0))
+
+        assert result == "primary"
+        assert calls == ["primary"]
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        """Test a slow call is duplicated and the slower one is cancelled."""
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "primary"
+
+        async def fast():
+            return "hedge"
+
+        budget = HedgeBudget(1.0)
+        result = await run_hedged(slow, fast, 0.01, budget)
+        await asyncio.sleep(0)
+
+        assert result == "hedge"
+        assert cancelled.is_set()
+        assert budget.stats()["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_budget_waits_for_primary(self):
+        """Test no hedge is sent when the budget is used up."""
+        async def slow():
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        async def hedge():
+            raise AssertionError("hedge should not run")
+
+        result = await run_hedged(slow, hedge, 0.01, HedgeBudget(0.0))
+
+        assert result == "primary"
+
+    @pytest.mark.asyncio
+    async def test_failed_hedge_falls_back_to_primary(self):
+        """Test the original call still wins if the hedge fails."""
+        async def slow():
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        async def failing():
+            raise RuntimeError("hedge failed")
+
+        result = await run_hedged(slow, failing, 0.01, HedgeBudget(1.0))
+
+        assert result == "primary"
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+
+from core.services.jobs import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobNotFoundError,
+    JobQueue,
+    JobQueueFullError
+)
+
+
+async def wait_for(job, *statuses):
+    for _ in range(200):
+        if job.status in statuses:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job.status}")
+
+
+class TestJobQueue:
+    """Test cases for running jobs on a bounded worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_job_result_and_progress(self):
+        """Test a job's return value becomes its result, with its progress."""
+        async def run(job):
+            for _ in range(3):
+                job.advance(rendered=1)
+            job.advance(recognized=3)
+            return {"content": "done"}
+
+        queue = JobQueue(workers=2)
+        job = queue.submit(run, pages=3)
+        assert job.status == JOB_QUEUED
+        await wait_for(job, JOB_SUCCEEDED)
+
+        assert queue.get(job.id).result == {"content": "done"}
+        assert job.to_dict()["progress"] == {"pages": 3, "rendered": 3, "recognized": 3}
+        assert job.finished_at >= job.started_at >= job.created_at
+        await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_failure_is_recorded(self):
+        """Test an exception fails the job without stopping its worker."""
+        async def fail(job):
+            raise ValueError("bad page")
+
+        async def succeed(job):
+            return "ok"
+
+        queue = JobQueue(workers=1)
+        failed = queue.submit(fail)
+        await wait_for(failed, JOB_FAILED)
+        later = queue.submit(succeed)
+        await wait_for(later, JOB_SUCCEEDED)
+
+        await queue.close()
+
+        assert failed.error == "bad page"
+        assert failed.result is None
+
+    @pytest.mark.asyncio
+    async def test_workers_bound_concurrency(self):
+        """Test no more than `workers` jobs run at once."""
+        queue = JobQueue(workers=2, max_queued=10)
+        running, peak = 0, 0
+
+        async def run(job):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        jobs = [queue.submit(run) for _ in range(6)]
+        for job in jobs:
+            await wait_for(job, JOB_SUCCEEDED)
+        await queue.close()
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """Test submitting beyond max_queued fails instead of waiting."""
+        queue = JobQueue(workers=1, max_queued=1)
+        release = asyncio.Event()
+
+        async def run(job):
+            await release.wait()
+
+        running = queue.submit(run)
+        await wait_for(running, JOB_RUNNING)
+        queue.submit(run)
+        with pytest.raises(JobQueueFullError):
+            queue.submit(run)
+
+        release.set()
+        await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self):
+        """Test a running job is cancelled and its worker moves on."""
+        started = asyncio.Event()
+
+        async def run(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        async def succeed(job):
+            return "next"
+
+        queue = JobQueue(workers=1)
+        job = queue.submit(run)
+        await started.wait()
+        queue.cancel(job.id)
+        await wait_for(job, JOB_CANCELLED)
+        later = queue.submit(succeed)
+        await wait_for(later, JOB_SUCCEEDED)
+        await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_job(self):
+        """Test a waiting job is never run once cancelled."""
+        queue = JobQueue(workers=1, max_queued=5)
+        release = asyncio.Event()
+        ran = []
+
+        async def block(job):
+            await release.wait()
+
+        async def run(job):
+            ran.append(job.id)
+
+        queue.submit(block)
+        waiting = queue.submit(run)
+        queue.cancel(waiting.id)
+        release.set()
+        await asyncio.sleep(0.05)
+        await queue.close()
+
+        assert waiting.status == JOB_CANCELLED
+        assert ran == []
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self):
+        """Test finished jobs are forgotten after the retention period."""
+        queue = JobQueue(workers=1, retention=0)
+
+        async def run(job):
+            return "ok"
+
+        job = queue.submit(run)
+        await wait_for(job, JOB_SUCCEEDED)
+        queue.submit(run)
+        await queue.close()
+
+        with pytest.raises(JobNotFoundError):
+            queue.get(job.id)
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_jobs(self):
+        """Test closing the queue cancels running and waiting jobs."""
+        queue = JobQueue(workers=1)
+
+        async def run(job):
+            await asyncio.sleep(10)
+
+        running = queue.submit(run)
+        waiting = queue.submit(run)
+        await wait_for(running, JOB_RUNNING)
+        await queue.close()
+
+        assert (running.status, waiting.status) == (JOB_CANCELLED, JOB_CANCELLED)
+
+    def test_from_env(self, monkeypatch):
+        """Test the queue is sized from the environment."""
+        monkeypatch.setenv("OCR_JOB_WORKERS", "3")
+        monkeypatch.setenv("OCR_JOB_QUEUE_SIZE", "7")
+
+        queue = JobQueue.from_env()
+
+        assert (queue.workers, queue.max_queued) == (3, 7)
+
+    def test_unknown_job(self):
+        """Test unknown job ids are reported."""
+        with pytest.raises(JobNotFoundError):
+            JobQueue().get("missing")
+
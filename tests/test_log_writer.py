@@ -0,0 +1,128 @@
+import io
+import threading
+import time
+
+from core.utils.log_writer import BatchedLogWriter
+from core.utils.metrics import LOG_LINES_DROPPED
+
+
+class TestBatchedLogWriter:
+    """Test cases for writing log lines from a background thread."""
+
+    def test_lines_are_written_in_order(self, tmp_path):
+        """Test queued lines reach the file in order after a flush."""
+        path = tmp_path / "app.log"
+        writer = BatchedLogWriter(str(path))
+
+        for i in range(100):
+            assert writer.write(f"line {i}")
+        assert writer.flush()
+
+        assert path.read_text(encoding="utf-8").splitlines() == [f"line {i}" for i in range(100)]
+        writer.close()
+
+    def test_write_does_not_touch_the_file(self, tmp_path):
+        """Test writing only queues the line; the writer thread opens the file."""
+        path = tmp_path / "app.log"
+        writer = BatchedLogWriter(str(path))
+        opened_by = []
+        original = writer._handler._open
+
+        def track_open():
+            opened_by.append(threading.current_thread().name)
+            return original()
+
+        writer._handler._open = track_open
+        writer.write("hello")
+        writer.close()
+
+        assert opened_by == ["log-writer"]
+        assert path.read_text(encoding="utf-8") == "hello\n"
+
+    def test_lines_are_batched(self, tmp_path):
+        """Test lines queued together are appended with one write."""
+        path = tmp_path / "app.log"
+        writer = BatchedLogWriter(str(path), batch_size=50)
+        writes = []
+        release = threading.Event()
+        original = writer._write
+
+        def slow_write(lines):
+            release.wait(5)
+            writes.append(len(lines))
+            original(lines)
+
+        writer._write = slow_write
+        writer.write("first")
+        for i in range(20):
+            writer.write(f"line {i}")
+        release.set()
+        writer.close()
+
+        assert sum(writes) == 21
+        assert len(writes) <= 3
+
+    def test_file_is_rotated_by_size(self, tmp_path):
+        """Test the file is rotated once it would exceed max_bytes."""
+        path = tmp_path / "app.log"
+        writer = BatchedLogWriter(str(path), max_bytes=200, backup_count=2, batch_size=1)
+
+        for i in range(30):
+            writer.write(f"{i:02d} " + "x" * 40)
+        writer.close()
+
+        assert path.stat().st_size <= 200
+        assert (tmp_path / "app.log.1").exists()
+        assert (tmp_path / "app.log.2").exists()
+        assert not (tmp_path / "app.log.3").exists()
+        assert path.read_text(encoding="utf-8").splitlines()[-1].startswith("29 ")
+
+    def test_full_queue_drops_lines(self, tmp_path):
+        """Test lines are dropped and counted instead of blocking when the queue is full."""
+        path = tmp_path / "app.log"
+        writer = BatchedLogWriter(str(path), max_queue=2)
+        release = threading.Event()
+        original = writer._write
+
+        def blocked_write(lines):
+            release.wait(5)
+            original(lines)
+
+        writer._write = blocked_write
+        before = LOG_LINES_DROPPED.value()
+        writer.write("first")
+        while not writer._queue.empty():
+            time.sleep(0.001)
+        results = [writer.write(f"line {i}") for i in range(5)]
+        release.set()
+        writer.close()
+
+        assert results == [True, True, False, False, False]
+        assert writer.dropped == 3
+        assert LOG_LINES_DROPPED.value() == before + 3
+        assert path.read_text(encoding="utf-8").splitlines() == ["first", "line 0", "line 1"]
+
+    def test_echo_and_close(self, tmp_path):
+        """Test lines are echoed to a stream and writes after closing are refused."""
+        echo = io.StringIO()
+        writer = BatchedLogWriter(str(tmp_path / "app.log"), echo=echo)
+
+        writer.write("hello")
+        writer.close()
+
+        assert echo.getvalue() == "hello\n"
+        assert not writer.write("late")
+        assert writer.flush()
+
+    def test_from_env(self, tmp_path, monkeypatch):
+        """Test rotation and queue size are read from the environment."""
+        monkeypatch.setenv("LOG_FILE_MAX_MB", "0.5")
+        monkeypatch.setenv("LOG_FILE_BACKUPS", "2")
+        monkeypatch.setenv("LOG_QUEUE_SIZE", "50")
+
+        writer = BatchedLogWriter.from_env(str(tmp_path / "app.log"))
+
+        assert writer._handler.maxBytes == 512 * 1024
+        assert writer._handler.backupCount == 2
+        assert writer._queue.maxsize == 50
+        writer.close()
@@ -0,0 +1,118 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+
+from core.services.ocr_backends import FakeBackend
+from core.services.ocr_service import OCRService
+from core.utils.metrics import (
+    MetricsRegistry,
+    OCR_BYTES_SENT,
+    OCR_REQUESTS,
+    OCR_RETRIES,
+    STAGE_SECONDS
+)
+
+
+class TestMetricsRegistry:
+    """Test cases for counters, gauges and histograms."""
+
+    def test_counter_renders_with_labels(self, registry):
+        """Test counters accumulate per label set in the text format."""
+        counter = registry.counter("jobs_total", "Jobs run", ["kind"])
+        counter.inc(kind="pdf")
+        counter.inc(2, kind="pdf")
+        counter.inc(kind="image")
+
+        text = registry.render()
+
+        assert "# TYPE jobs_total counter" in text
+        assert 'jobs_total{kind="pdf"} 3' in text
+        assert 'jobs_total{kind="image"} 1' in text
+
+    def test_counter_rejects_negative_and_wrong_labels(self, registry):
+        """Test counters only increase and need their declared labels."""
+        counter = registry.counter("jobs_total", "Jobs run", ["kind"])
+
+        with pytest.raises(ValueError):
+            counter.inc(-1, kind="pdf")
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+
+    def test_gauge_tracks_in_progress(self, registry):
+        """Test the gauge is raised inside the block and restored after."""
+        gauge = registry.gauge("in_flight", "In flight", ["operation"])
+
+        with gauge.track(operation="ocr"):
+            assert gauge.value(operation="ocr") == 1
+        assert gauge.value(operation="ocr") == 0
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test bucket counts, sum and count in the text format."""
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        text = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert "latency_seconds_sum 5.55" in text
+        assert "latency_seconds_count 3" in text
+
+    def test_snapshot_is_json_serializable(self, registry):
+        """Test the snapshot can be dumped as JSON."""
+        registry.histogram("stage_seconds", "Stages", ["stage"]).observe(0.2, stage="render")
+
+        snapshot = json.loads(json.dumps(registry.snapshot()))
+
+        assert snapshot["stage_seconds"]["render"]["count"] == 1
+
+    def test_reregistering_with_other_type_fails(self, registry):
+        """Test a name cannot be reused for a different metric type."""
+        registry.counter("thing", "A counter")
+
+        assert registry.counter("thing", "A counter") is registry.counter("thing", "A counter")
+        with pytest.raises(ValueError):
+            registry.gauge("thing", "A gauge")
+
+
+class TestPipelineMetrics:
+    """Test cases for metrics recorded by the OCR pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_ocr_requests_bytes_and_stages_are_recorded(self):
+        """Test OCR calls update request, byte and stage metrics."""
+        with patch.dict(os.environ, {"OCR_CACHE_ENABLED": "false"}):
+            service = OCRService(backend=FakeBackend(latency_ms=0, seed=1))
+        requests_before = OCR_REQUESTS.value(outcome="success")
+        bytes_before = OCR_BYTES_SENT.value()
+        stages_before = STAGE_SECONDS.count(stage="ocr_request")
+
+        await service.recognize_pages(["page1", "page2"], pages_per_request=1)
+
+        assert OCR_REQUESTS.value(outcome="success") == requests_before + 2
+        assert OCR_BYTES_SENT.value() > bytes_before
+        assert STAGE_SECONDS.count(stage="ocr_request") == stages_before + 2
+
+    @pytest.mark.asyncio
+    async def test_retries_are_counted_by_status(self):
+        """Test retried throttled calls are counted with their status code."""
+        with patch.dict(os.environ, {"OCR_CACHE_ENABLED": "false"}):
+            service = OCRService(backend=FakeBackend(latency_ms=0, throttle_rate=1.0, retry_after=0, seed=1))
+        service.max_retries = 2
+        retries_before = OCR_RETRIES.value(reason="429")
+
+        with pytest.raises(Exception):
+            await service.recognize_text(["page1"])
+
+        assert OCR_RETRIES.value(reason="429") == retries_before + 1
+
+
+# Pytest fixtures
+@pytest.fixture
+def registry():
+    """Create an empty metrics registry."""
+    return MetricsRegistry()
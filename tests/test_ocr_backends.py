@@ -0,0 +1,127 @@
+import os
+import pytest
+from unittest.mock import patch
+
+import openai
+
+from core.services.ocr_backends import (
+    FakeBackend,
+    SiliconFlowBackend,
+    create_backend
+)
+from core.services.ocr_service import OCRService
+from core.utils.validators import ValidationError
+
+
+class TestFakeBackend:
+    """Test cases for the in-process fake OCR backend."""
+
+    @pytest.mark.asyncio
+    async def test_returns_canned_markdown_per_page(self, fake_backend):
+        """Test one canned page of Markdown is returned per image."""
+        response = await fake_backend.client.chat.completions.create(
+            model="fake",
+            messages=[{"role": "user", "content": image_content(["a", "b"])}],
+            max_tokens=2048
+        )
+
+        text = response.choices[0].message.content
+        assert text.count("## 题目 1") == 2
+        assert response.choices[0].finish_reason == "stop"
+        assert response.usage.completion_tokens > 0
+
+    @pytest.mark.asyncio
+    async def test_truncates_at_max_tokens(self, fake_backend):
+        """Test output longer than max_tokens finishes with "length"."""
+        response = await fake_backend.client.chat.completions.create(
+            model="fake",
+            messages=[{"role": "user", "content": image_content(["a"])}],
+            max_tokens=5
+        )
+
+        assert response.choices[0].finish_reason == "length"
+        assert len(response.choices[0].message.content) == 10
+
+    @pytest.mark.asyncio
+    async def test_streams_chunks(self, fake_backend):
+        """Test streamed output reassembles to the full answer."""
+        stream = await fake_backend.client.chat.completions.create(
+            model="fake",
+            messages=[{"role": "user", "content": image_content(["a"])}],
+            stream=True
+        )
+        chunks = [chunk.choices[0].delta.content async for chunk in stream]
+
+        assert len(chunks) > 1
+        assert "".join(chunks).startswith("## 题目 1")
+
+    @pytest.mark.asyncio
+    async def test_injects_throttling_with_retry_after(self):
+        """Test simulated 429s surface as OpenAI RateLimitError with Retry-After."""
+        backend = FakeBackend(latency_ms=0, throttle_rate=1.0, retry_after=2.0, seed=1)
+
+        with pytest.raises(openai.RateLimitError) as exc_info:
+            await backend.client.chat.completions.create(model="fake", messages=[])
+
+        assert exc_info.value.response.headers["retry-after"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_injects_server_errors(self):
+        """Test simulated 500s surface as OpenAI InternalServerError."""
+        backend = FakeBackend(latency_ms=0, error_rate=1.0, seed=1)
+
+        with pytest.raises(openai.InternalServerError):
+            await backend.client.chat.completions.create(model="fake", messages=[])
+
+    def test_latency_distribution(self):
+        """Test sampled latencies center on the configured median."""
+        backend = FakeBackend(latency_ms=500, latency_sigma=0.3, seed=7)
+        samples = sorted(backend.sample_latency() for _ in range(1001))
+
+        assert 0.4 < samples[500] < 0.6
+
+    @pytest.mark.asyncio
+    async def test_ocr_service_runs_on_fake_backend(self):
+        """Test the full OCR pipeline runs offline against the fake backend."""
+        with patch.dict(os.environ, {"OCR_CACHE_ENABLED": "false"}):
+            service = OCRService(backend=FakeBackend(latency_ms=0, seed=1))
+
+        result = await service.recognize_pages(["page1", "page2", "page3"], pages_per_request=1)
+
+        assert result.count("## 题目 1") == 3
+        assert service.get_service_info()["api_provider"] == "Fake"
+
+
+class TestCreateBackend:
+    """Test cases for backend selection."""
+
+    def test_create_fake_backend_from_environment(self):
+        """Test OCR_BACKEND selects the fake backend without an API key."""
+        with patch.dict(os.environ, {"OCR_BACKEND": "fake"}):
+            assert isinstance(create_backend(), FakeBackend)
+
+    def test_siliconflow_requires_api_key(self):
+        """Test the SiliconFlow backend needs an API key."""
+        with patch.dict(os.environ, {"SILICONFLOW_API_KEY": ""}):
+            with pytest.raises(ValidationError, match="SILICONFLOW_API_KEY"):
+                SiliconFlowBackend()
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with pytest.raises(ValidationError, match="Unknown OCR backend"):
+            create_backend("nope")
+
+
+def image_content(images):
+    """Build chat content with one image part per base64 string."""
+    return [
+        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image}"}}
+        for image in images
+    ] + [{"type": "text", "text": "识别"}]
+
+
+# Pytest fixtures
+@pytest.fixture
+def fake_backend():
+    """Create a fake backend without latency or injected errors."""
+    return FakeBackend(latency_ms=0, error_rate=0, throttle_rate=0, seed=1)
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import pytest
+from unittest.mock import patch
+
+from core.services.ocr_cache import OCRCache, get_ocr_cache
+
+
+class TestOCRCache:
+    """Test cases for the on-disk OCR result cache."""
+
+    def test_make_key_depends_on_images_model_and_prompt(self):
+        """Test cache keys change with any of their inputs."""
+        key = OCRCache.make_key(["aaa"], "model", "prompt")
+
+        assert key == OCRCache.make_key(["aaa"], "model", "prompt")
+        assert key != OCRCache.make_key(["aab"], "model", "prompt")
+        assert key != OCRCache.make_key(["aaa"], "other-model", "prompt")
+        assert key != OCRCache.make_key(["aaa"], "model", "other prompt")
+        assert key != OCRCache.make_key(["aa", "a"], "model", "prompt")
+
+    def test_get_miss_then_hit(self, cache):
+        """Test a stored entry is returned and counted as a hit."""
+        key = OCRCache.make_key(["page"], "model", "prompt")
+
+        assert cache.get(key) is None
+        cache.put(key, "## 题目 $x^2$")
+        assert cache.get(key) == "## 题目 $x^2$"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_unrecorded_probes(self, cache):
+        """Test probes with record=False are counted once through record_lookup."""
+        cache.put("f" * 64, "content")
+
+        assert cache.get("f" * 64, record=False) == "content"
+        assert cache.get("0" * 64, record=False) is None
+        cache.record_lookup(False)
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (0, 1)
+
+    def test_evicts_least_recently_used(self, cache_dir):
+        """Test the oldest unused entry is evicted when the budget is exceeded."""
+        cache = OCRCache(cache_dir, max_size_mb=250 / (1024 * 1024))
+
+        cache.put("a" * 64, "x" * 100)
+        cache.put("b" * 64, "x" * 100)
+        cache.get("a" * 64)
+        cache.put("c" * 64, "x" * 100)
+
+        assert cache.get("b" * 64) is None
+        assert cache.get("a" * 64) is not None
+        assert cache.get("c" * 64) is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size_bytes"] == 200
+
+    def test_index_is_rebuilt_from_disk(self, cache_dir):
+        """Test a new cache instance sees entries written by a previous one."""
+        OCRCache(cache_dir).put("d" * 64, "persisted")
+
+        cache = OCRCache(cache_dir)
+        assert cache.stats()["entries"] == 1
+        assert cache.get("d" * 64) == "persisted"
+
+    def test_clear_removes_entries(self, cache):
+        """Test clearing the cache removes all entries."""
+        cache.put("e" * 64, "content")
+        cache.clear()
+
+        assert cache.stats()["entries"] == 0
+        assert cache.get("e" * 64) is None
+
+    def test_get_ocr_cache_disabled(self):
+        """Test the shared cache can be disabled from the environment."""
+        with patch.dict(os.environ, {"OCR_CACHE_ENABLED": "false"}):
+            assert get_ocr_cache() is None
+
+
+# Pytest fixtures
+@pytest.fixture
+def cache_dir():
+    """Create a temporary cache directory."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def cache(cache_dir):
+    """Create an OCR cache in a temporary directory."""
+    return OCRCache(cache_dir)
@@ -1,17 +1,22 @@
 import asyncio
+import base64
 import os
 import pytest
 from unittest.mock import AsyncMock, Mock, patch
 
-from src.services.ocr_service import (
+from core.services.ocr_service import (
     OCRService,
     create_ocr_service,
+    close_ocr_service,
     OCRError,
     OCRTimeoutError,
     AuthenticationError,
-    EmptyResponseError
+    EmptyResponseError,
+    TruncatedOutputError
 )
-from src.utils.validators import ValidationError
+from core.services.page_encoder import PageImage
+from core.services.text_layer import PageText
+from core.utils.validators import ValidationError
 
 
 class TestOCRService:
@@ -61,7 +66,7 @@ class TestOCRService:
         mock_client = AsyncMock()
         mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             result = await mock_ocr_service.recognize_text(sample_base64_images)
             
             assert "第 1 页" in result
@@ -81,7 +86,7 @@ class TestOCRService:
         mock_client = AsyncMock()
         mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             with pytest.raises(EmptyResponseError, match="OCR API returned empty response"):
                 await mock_ocr_service.recognize_text(sample_base64_images)
     
@@ -96,7 +101,7 @@ class TestOCRService:
         mock_client = AsyncMock()
         mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             with pytest.raises(EmptyResponseError, match="OCR API returned empty content"):
                 await mock_ocr_service.recognize_text(sample_base64_images)
     
@@ -108,7 +113,7 @@ class TestOCRService:
         mock_client = AsyncMock()
         mock_client.chat.completions.create = AsyncMock(side_effect=OpenAIAPIError("401 Unauthorized"))
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             with pytest.raises(AuthenticationError, match="API authentication failed"):
                 await mock_ocr_service.recognize_text(sample_base64_images)
     
@@ -131,7 +136,7 @@ class TestOCRService:
             ]
         )
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             result = await mock_ocr_service.recognize_text(sample_base64_images)
             
             assert result == "Test result"
@@ -146,7 +151,7 @@ class TestOCRService:
         mock_client = AsyncMock()
         mock_client.chat.completions.create = AsyncMock(side_effect=OpenAIAPIError("Persistent error"))
         
-        with patch('src.services.ocr_service.OCRService.client', mock_client):
+        with patch('core.services.ocr_service.OCRService.client', mock_client):
             with pytest.raises(OCRError, match="OCR operation failed"):
                 await mock_ocr_service.recognize_text(sample_base64_images)
             
@@ -165,6 +170,573 @@ class TestOCRService:
         assert info["output_format"] == "markdown_with_latex"
 
 
+class TestBuildContent:
+    """Test cases for the chat message content sent to the API."""
+    
+    def test_data_url_mime_matches_image_format(self, mock_ocr_service):
+        """Test JPEG and PNG images get their own MIME type."""
+        jpeg_b64 = base64.b64encode(b"\xff\xd8\xff\xe0fake").decode()
+        png_b64 = base64.b64encode(b"\x89PNG\r\n\x1a\nfake").decode()
+        
+        content = mock_ocr_service._build_content([jpeg_b64, png_b64])
+        
+        assert content[0]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+        assert content[1]["image_url"]["url"].startswith("data:image/png;base64,")
+        assert content[-1]["type"] == "text"
+
+
+class TestRetryPolicy:
+    """Test cases for status-aware retries."""
+    
+    @pytest.mark.asyncio
+    async def test_bad_request_is_not_retried(self, mock_ocr_service, sample_base64_images):
+        """Test a 400 fails immediately without retrying."""
+        import openai
+        
+        error = openai.BadRequestError("bad image", response=make_http_response(400), body=None)
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=error)
+        
+        with patch.object(mock_ocr_service, "client", mock_client):
+            with pytest.raises(OCRError, match="OCR operation failed"):
+                await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        assert mock_client.chat.completions.create.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_rate_limit_honors_retry_after(self, mock_ocr_service, sample_base64_images, mock_openai_response):
+        """Test a 429 with Retry-After pauses the limiter and then succeeds."""
+        import openai
+        
+        error = openai.RateLimitError("slow down", response=make_http_response(429, {"retry-after": "2"}), body=None)
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[error, mock_openai_response])
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch.object(mock_ocr_service.rate_limiter, "on_throttle") as mock_throttle, \
+                patch("core.services.ocr_service.asyncio.sleep", AsyncMock()) as mock_sleep:
+            result = await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        assert "第 1 页" in result
+        mock_throttle.assert_called_once_with(2.0)
+        mock_sleep.assert_awaited_once_with(0.0)
+    
+    @pytest.mark.asyncio
+    async def test_retry_after_is_clamped(self, mock_ocr_service, sample_base64_images, mock_openai_response):
+        """Test a huge Retry-After pauses the limiter only for the longest retry delay."""
+        import openai
+        
+        error = openai.RateLimitError("slow down", response=make_http_response(429, {"retry-after": "86400"}), body=None)
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[error, mock_openai_response])
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch.object(mock_ocr_service.rate_limiter, "on_throttle") as mock_throttle, \
+                patch("core.services.ocr_service.asyncio.sleep", AsyncMock()):
+            await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        mock_throttle.assert_called_once_with(mock_ocr_service.max_retry_delay)
+    
+    @pytest.mark.asyncio
+    async def test_backoff_does_not_mutate_service(self, mock_ocr_service, sample_base64_images):
+        """Test retry delays are computed per call, not stored on the service."""
+        import openai
+        
+        error = openai.InternalServerError("boom", response=make_http_response(500), body=None)
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=error)
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch("core.services.ocr_service.asyncio.sleep", AsyncMock()):
+            with pytest.raises(OCRError):
+                await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        assert mock_client.chat.completions.create.call_count == mock_ocr_service.max_retries
+        assert mock_ocr_service.retry_delay == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_empty_response_is_retried(self, mock_ocr_service, sample_base64_images, mock_openai_response):
+        """Test an empty completion is retried like a transient error."""
+        empty = Mock()
+        empty.choices = [Mock()]
+        empty.choices[0].message.content = "  "
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[empty, mock_openai_response])
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch("core.services.ocr_service.asyncio.sleep", AsyncMock()):
+            result = await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        assert "第 1 页" in result
+        assert mock_client.chat.completions.create.call_count == 2
+
+
+class TestRecognizePages:
+    """Test cases for page-parallel OCR recognition."""
+    
+    @pytest.mark.asyncio
+    async def test_recognize_pages_merges_in_page_order(self, mock_ocr_service):
+        """Test results are merged in page order regardless of completion order."""
+        delays = {"page1": 0.03, "page2": 0.01, "page3": 0.02}
+        
+        async def fake_recognize(images, **kwargs):
+            await asyncio.sleep(delays[images[0]])
+            return f"result-{images[0]}"
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize) as mock_recognize:
+            result = await mock_ocr_service.recognize_pages(["page1", "page2", "page3"], concurrency=3, pages_per_request=1)
+            
+            assert result == "result-page1\n\nresult-page2\n\nresult-page3"
+            assert mock_recognize.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_recognize_pages_respects_concurrency_limit(self, mock_ocr_service):
+        """Test no more than `concurrency` requests are in flight."""
+        in_flight = 0
+        peak = 0
+        
+        async def fake_recognize(images, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            await mock_ocr_service.recognize_pages([f"p{i}" for i in range(6)], concurrency=2, pages_per_request=1)
+        
+        assert peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_recognize_pages_groups_pages(self, mock_ocr_service):
+        """Test pages are packed `pages_per_request` at a time."""
+        async def fake_recognize(images, **kwargs):
+            return "+".join(images)
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize) as mock_recognize:
+            result = await mock_ocr_service.recognize_pages(["a", "b", "c"], pages_per_request=2)
+            
+            assert result == "a+b\n\nc"
+            assert mock_recognize.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_recognize_pages_retries_only_failed_pages(self, mock_ocr_service):
+        """Test only failed page groups are sent again."""
+        calls = []
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(images[0])
+            if images[0] == "page2" and calls.count("page2") == 1:
+                raise OCRError("transient failure")
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            result = await mock_ocr_service.recognize_pages(["page1", "page2", "page3"], pages_per_request=1)
+        
+        assert result == "page1\n\npage2\n\npage3"
+        assert sorted(calls) == ["page1", "page2", "page2", "page3"]
+    
+    @pytest.mark.asyncio
+    async def test_recognize_pages_reports_failed_pages(self, mock_ocr_service):
+        """Test persistent failures raise OCRError naming the failed pages."""
+        async def fake_recognize(images, **kwargs):
+            if images[0] == "page2":
+                raise OCRError("persistent failure")
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            with pytest.raises(OCRError, match=r"pages \[2\]"):
+                await mock_ocr_service.recognize_pages(["page1", "page2", "page3"], pages_per_request=1)
+
+
+class TestRecognizePageStream:
+    """Test cases for recognizing pages while they are produced."""
+    
+    @pytest.mark.asyncio
+    async def test_first_request_starts_before_last_page(self, mock_ocr_service):
+        """Test OCR overlaps with page production."""
+        events = []
+        
+        async def produce():
+            for i in range(4):
+                events.append(f"render-{i}")
+                yield f"p{i}"
+                await asyncio.sleep(0.01)
+        
+        async def fake_recognize(images, **kwargs):
+            events.append(f"ocr-{images[0]}")
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            result = await mock_ocr_service.recognize_page_stream(produce(), concurrency=2, pages_per_request=1)
+        
+        assert result == "p0\n\np1\n\np2\n\np3"
+        assert events.index("ocr-p0") < events.index("render-3")
+    
+    @pytest.mark.asyncio
+    async def test_producer_is_throttled_by_in_flight_batches(self, mock_ocr_service):
+        """Test no more than 2 * concurrency batches are pending at once."""
+        produced = 0
+        release = asyncio.Event()
+        
+        async def produce():
+            nonlocal produced
+            for i in range(10):
+                produced += 1
+                yield f"p{i}"
+        
+        async def fake_recognize(images, **kwargs):
+            await release.wait()
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            task = asyncio.create_task(
+                mock_ocr_service.recognize_page_stream(produce(), concurrency=1, pages_per_request=1)
+            )
+            await asyncio.sleep(0.05)
+            assert produced == 3
+            
+            release.set()
+            result = await task
+        
+        assert result.split("\n\n") == [f"p{i}" for i in range(10)]
+    
+    @pytest.mark.asyncio
+    async def test_retries_only_failed_batches(self, mock_ocr_service):
+        """Test a failed batch is sent again once all pages are read."""
+        calls = []
+        
+        async def produce():
+            for page in ["page1", "page2", "page3"]:
+                yield page
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(images[0])
+            if images[0] == "page2" and calls.count("page2") == 1:
+                raise OCRError("transient failure")
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            result = await mock_ocr_service.recognize_page_stream(produce(), pages_per_request=1)
+        
+        assert result == "page1\n\npage2\n\npage3"
+        assert sorted(calls) == ["page1", "page2", "page2", "page3"]
+    
+    @pytest.mark.asyncio
+    async def test_empty_stream_raises(self, mock_ocr_service):
+        """Test an empty page stream is rejected."""
+        async def produce():
+            return
+            yield
+        
+        with pytest.raises(OCRError, match="No images"):
+            await mock_ocr_service.recognize_page_stream(produce())
+    
+    @pytest.mark.asyncio
+    async def test_text_layer_items_pass_through_in_order(self, mock_ocr_service):
+        """Test PageText items are placed between OCR'd pages without a request."""
+        calls = []
+        
+        async def produce():
+            yield PageText("text1")
+            yield "p1"
+            yield "p2"
+            yield PageText("text2")
+            yield "p3"
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(list(images))
+            return "+".join(images)
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            result = await mock_ocr_service.recognize_page_stream(produce(), pages_per_request=4)
+        
+        assert result == "text1\n\np1+p2\n\ntext2\n\np3"
+        assert calls == [["p1", "p2"], ["p3"]]
+    
+    @pytest.mark.asyncio
+    async def test_progress_reports_finished_items(self, mock_ocr_service):
+        """Test progress is reported per recognized batch and per text item."""
+        finished = []
+        
+        async def produce():
+            for page in ["p1", "p2", PageText("text"), "p3"]:
+                yield page
+        
+        with patch.object(mock_ocr_service, "recognize_text", AsyncMock(return_value="ok")):
+            await mock_ocr_service.recognize_page_stream(produce(), pages_per_request=2, progress=finished.append)
+        
+        assert sum(finished) == 4
+    
+    @pytest.mark.asyncio
+    async def test_progress_counts_source_pages(self, mock_ocr_service):
+        """Test a page split into blocks counts once, and skipped pages count with the document."""
+        finished = []
+        release = asyncio.Event()
+        
+        async def produce():
+            yield PageImage("q1", 1)
+            yield PageImage("q2", 1)
+            yield PageText("text", page=2)
+            # Page 3 was blank; page 5 (the last) was a duplicate
+            yield PageImage("q3", 4)
+        
+        async def fake_recognize(images, **kwargs):
+            if images[0] == "q2":
+                await release.wait()
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            task = asyncio.create_task(mock_ocr_service.recognize_page_stream(
+                produce(), pages_per_request=1, progress=finished.append, total_pages=5
+            ))
+            await asyncio.sleep(0.05)
+            # Page 1 still has a block in flight, so nothing after it is done
+            assert finished == []
+            
+            release.set()
+            await task
+        
+        assert sum(finished) == 5
+    
+    @pytest.mark.asyncio
+    async def test_text_only_stream_makes_no_requests(self, mock_ocr_service):
+        """Test a document read entirely from its text layer is not OCR'd."""
+        async def produce():
+            yield PageText("page one")
+            yield PageText("page two")
+        
+        with patch.object(mock_ocr_service, "recognize_text", AsyncMock()) as mock_recognize:
+            result = await mock_ocr_service.recognize_page_stream(produce())
+        
+        assert result == "page one\n\npage two"
+        mock_recognize.assert_not_called()
+
+
+    @pytest.mark.asyncio
+    async def test_failures_report_source_pages_of_blocks(self, mock_ocr_service):
+        """Test a failed question block is reported by the page it came from."""
+        async def produce():
+            yield PageImage("q1", 1)
+            yield PageImage("q2", 1)
+            yield PageImage("q3", 2)
+        
+        async def fake_recognize(images, **kwargs):
+            if images[0] == "q3":
+                raise OCRError("bad page")
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            with pytest.raises(OCRError, match=r"pages \[2\]"):
+                await mock_ocr_service.recognize_page_stream(produce(), pages_per_request=1)
+
+
+class TestTokenBudgetPlanning:
+    """Test cases for planned batches and overflow handling."""
+    
+    @pytest.mark.asyncio
+    async def test_planner_packs_sparse_pages(self, mock_ocr_service):
+        """Test small pages are packed into one request with a sized max_tokens."""
+        with patch.object(mock_ocr_service, "recognize_text", AsyncMock(return_value="text")) as mock_recognize:
+            await mock_ocr_service.recognize_pages(["a", "b", "c"])
+        
+        mock_recognize.assert_called_once()
+        assert mock_recognize.call_args.args[0] == ["a", "b", "c"]
+        assert mock_recognize.call_args.kwargs["max_tokens"] < mock_ocr_service.max_tokens
+    
+    @pytest.mark.asyncio
+    async def test_truncated_batch_is_split_and_resubmitted(self, mock_ocr_service):
+        """Test a batch hitting max_tokens is split and only its halves resent."""
+        calls = []
+        
+        async def fake_recognize(images, max_tokens=None, allow_truncated=True, **kwargs):
+            calls.append((list(images), max_tokens))
+            if len(images) > 1:
+                raise TruncatedOutputError("truncated", text="partial")
+            return f"text-{images[0]}"
+        
+        with patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            result = await mock_ocr_service.recognize_pages(["a", "b", "c"])
+        
+        assert result == "text-a\n\ntext-b\n\ntext-c"
+        assert calls[0][0] == ["a", "b", "c"]
+        assert all(tokens == mock_ocr_service.max_tokens for _, tokens in calls[1:])
+    
+    @pytest.mark.asyncio
+    async def test_recognize_text_detects_length_finish(self, mock_ocr_service, sample_base64_images):
+        """Test finish_reason == "length" raises when truncation is not allowed."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "cut off"
+        mock_response.choices[0].finish_reason = "length"
+        
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        with patch.object(mock_ocr_service, "client", mock_client):
+            with pytest.raises(TruncatedOutputError) as exc_info:
+                await mock_ocr_service.recognize_text(sample_base64_images, max_tokens=100, allow_truncated=False)
+            
+            assert exc_info.value.text == "cut off"
+            assert await mock_ocr_service.recognize_text(sample_base64_images) == "cut off"
+
+
+class TestStreaming:
+    """Test cases for streaming OCR output."""
+    
+    @pytest.mark.asyncio
+    async def test_stream_text_yields_chunks(self, mock_ocr_service, sample_base64_images):
+        """Test streamed deltas are yielded in order."""
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=make_stream(["## 第 1 页", "\n", "$x^2$"]))
+        
+        with patch.object(mock_ocr_service, "client", mock_client):
+            chunks = [chunk async for chunk in mock_ocr_service.stream_text(sample_base64_images)]
+        
+        assert chunks == ["## 第 1 页", "\n", "$x^2$"]
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+    
+    @pytest.mark.asyncio
+    async def test_stream_text_empty_raises_error(self, mock_ocr_service, sample_base64_images):
+        """Test a stream without content raises EmptyResponseError."""
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(
+            side_effect=[make_stream([]) for _ in range(mock_ocr_service.max_retries)]
+        )
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch("core.services.ocr_service.asyncio.sleep", AsyncMock()):
+            with pytest.raises(EmptyResponseError):
+                async for _ in mock_ocr_service.stream_text(sample_base64_images):
+                    pass
+        
+        assert mock_client.chat.completions.create.call_count == mock_ocr_service.max_retries
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_streams_first_page_then_others_in_order(self, mock_ocr_service):
+        """Test the first page streams while later pages arrive whole, in order."""
+        async def fake_stream(images, **kwargs):
+            for part in ["first ", "page"]:
+                yield part
+        
+        async def fake_recognize(images, **kwargs):
+            await asyncio.sleep(0.02 if images[0] == "p2" else 0.0)
+            return f"text-{images[0]}"
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            events = [event async for event in mock_ocr_service.stream_pages(["p1", "p2", "p3"], pages_per_request=1)]
+        
+        assert [(e["type"], e["text"]) for e in events] == [
+            ("delta", "first "),
+            ("delta", "page"),
+            ("page", "first page"),
+            ("page", "text-p2"),
+            ("page", "text-p3"),
+        ]
+        assert events[-1]["completed"] == 3
+        assert events[-1]["total"] == 3
+        assert events[-1]["pages"] == [3]
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_reads_pages_lazily(self, mock_ocr_service):
+        """Test pages from an async iterator are reported in order, text items included."""
+        async def produce():
+            yield "p1"
+            yield PageText("text")
+            yield "p2"
+        
+        async def fake_stream(images, **kwargs):
+            yield "first"
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", AsyncMock(return_value="second")):
+            events = [event async for event in mock_ocr_service.stream_pages(produce(), pages_per_request=1)]
+        
+        assert [(e["type"], e["text"]) for e in events] == [
+            ("delta", "first"),
+            ("page", "first"),
+            ("page", "text"),
+            ("page", "second"),
+        ]
+        assert events[-1]["total"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_retries_failed_batches(self, mock_ocr_service):
+        """Test a failed background batch is sent again before it is reported."""
+        calls = []
+        
+        async def fake_stream(images, **kwargs):
+            yield "first"
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(images[0])
+            if calls.count(images[0]) == 1:
+                raise OCRError("transient failure")
+            return f"text-{images[0]}"
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            events = [event async for event in mock_ocr_service.stream_pages(["p1", "p2"], pages_per_request=1)]
+        
+        assert [e["text"] for e in events if e["type"] == "page"] == ["first", "text-p2"]
+        assert calls == ["p2", "p2"]
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_falls_back_when_stream_fails(self, mock_ocr_service):
+        """Test a failed stream is recognized again without streaming."""
+        async def fake_stream(images, **kwargs):
+            raise OCRError("stream failed")
+            yield
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", AsyncMock(return_value="recovered")):
+            events = [event async for event in mock_ocr_service.stream_pages(["p1"])]
+        
+        assert [(e["type"], e["text"]) for e in events] == [("page", "recovered")]
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_splits_truncated_stream(self, mock_ocr_service):
+        """Test a streamed batch cut off by max_tokens is split and resubmitted."""
+        calls = []
+        
+        async def fake_stream(images, **kwargs):
+            yield "partial"
+            raise TruncatedOutputError("truncated", text="partial")
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(list(images))
+            return f"text-{images[0]}"
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            events = [event async for event in mock_ocr_service.stream_pages(["a", "b"], pages_per_request=2)]
+        
+        assert events[-1]["text"] == "text-a\n\ntext-b"
+        assert calls == [["a"], ["b"]]
+    
+    @pytest.mark.asyncio
+    async def test_stream_pages_does_not_hold_slots_for_slow_consumer(self, mock_ocr_service):
+        """Test later batches are recognized while the caller has not asked for the next event."""
+        calls = []
+        
+        async def fake_stream(images, **kwargs):
+            yield "first"
+        
+        async def fake_recognize(images, **kwargs):
+            calls.append(images[0])
+            return images[0]
+        
+        with patch.object(mock_ocr_service, "stream_text", side_effect=fake_stream), \
+                patch.object(mock_ocr_service, "recognize_text", side_effect=fake_recognize):
+            events = mock_ocr_service.stream_pages(["p1", "p2", "p3"], concurrency=1, pages_per_request=1)
+            assert (await events.__anext__())["type"] == "delta"
+            await asyncio.sleep(0.05)
+            assert calls == ["p2", "p3"]
+            await events.aclose()
+
+
 class TestCreateOCRService:
     """Test cases for creating OCR service instance."""
     
@@ -187,6 +759,139 @@ class TestCreateOCRService:
                 await create_ocr_service()
 
 
+    @pytest.mark.asyncio
+    async def test_create_ocr_service_returns_shared_instance(self, mock_api_key):
+        """Test the OCR service and its HTTP client are reused across calls."""
+        with patch.dict(os.environ, {"SILICONFLOW_API_KEY": mock_api_key, "OCR_CACHE_ENABLED": "false"}):
+            first = await create_ocr_service()
+            second = await create_ocr_service()
+            
+            assert first is second
+            
+            await close_ocr_service()
+            third = await create_ocr_service()
+            
+            assert third is not first
+            await close_ocr_service()
+    
+    def test_connection_pool_configuration(self, mock_api_key):
+        """Test pool size and timeouts are read from the environment."""
+        test_config = {
+            "SILICONFLOW_API_KEY": mock_api_key,
+            "OCR_CACHE_ENABLED": "false",
+            "OCR_POOL_SIZE": "5",
+            "OCR_TIMEOUT_SECONDS": "30"
+        }
+        
+        with patch.dict(os.environ, test_config):
+            service = OCRService()
+            
+            assert service.backend.pool_size == 5
+            assert service.backend.timeout == 30.0
+            assert service.backend.http_client.timeout.read == 30.0
+
+
+class TestResultCache:
+    """Test cases for the OCR result cache in the service."""
+    
+    @pytest.mark.asyncio
+    async def test_cache_is_read_and_written_off_the_event_loop(
+        self, mock_ocr_service, sample_base64_images, mock_openai_response, tmp_path
+    ):
+        """Test cache lookups and writes run on the blocking executor and hits skip the API."""
+        import threading
+        from core.services.ocr_cache import OCRCache
+        
+        cache = OCRCache(str(tmp_path))
+        threads = []
+        original_get, original_put = cache.get, cache.put
+        
+        def get(key, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original_get(key, **kwargs)
+        
+        def put(key, content):
+            threads.append(threading.current_thread().name)
+            original_put(key, content)
+        
+        cache.get, cache.put = get, put
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_openai_response)
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch.object(mock_ocr_service, "cache", cache):
+            first = await mock_ocr_service.recognize_text(sample_base64_images)
+            second = await mock_ocr_service.recognize_text(sample_base64_images)
+        
+        assert first == second
+        assert mock_client.chat.completions.create.call_count == 1
+        assert threads
+        assert all(name.startswith("blocking") for name in threads)
+    
+    @pytest.mark.asyncio
+    async def test_pages_are_cached_individually(self, mock_ocr_service, tmp_path):
+        """Test a multi-page answer is split per page and reused under different batching."""
+        from core.services.ocr_cache import OCRCache
+        from core.services.ocr_service import MULTI_PAGE_PROMPT, PAGE_SEPARATOR
+        
+        sent = []
+        
+        def answer(**kwargs):
+            content = kwargs["messages"][0]["content"]
+            sent.append(len(content) - 1)
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].finish_reason = "stop"
+            if len(content) > 2:
+                assert content[-1]["text"] == MULTI_PAGE_PROMPT
+                response.choices[0].message.content = f"\n{PAGE_SEPARATOR}\n".join(
+                    f"text {i}" for i in range(len(content) - 1)
+                ) + f"\n{PAGE_SEPARATOR}"
+            else:
+                response.choices[0].message.content = "single"
+            return response
+        
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=answer)
+        mock_ocr_service.max_pages_per_request = 4
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch.object(mock_ocr_service, "cache", OCRCache(str(tmp_path))):
+            first = await mock_ocr_service.recognize_pages(["p1", "p2", "p3"], pages_per_request=3)
+            second = await mock_ocr_service.recognize_pages(["p0", "p1", "p2", "p3"], pages_per_request=2)
+        
+        assert first == "text 0\n\ntext 1\n\ntext 2"
+        # Only the new page is sent; the others come from the first run's batch
+        assert sent == [3, 1]
+        assert second == "single\n\ntext 0\n\ntext 1\n\ntext 2"
+    
+    @pytest.mark.asyncio
+    async def test_partial_hit_counts_one_miss(self, mock_ocr_service, mock_openai_response, tmp_path):
+        """Test probing each page of a request counts a single lookup in the cache stats."""
+        from core.services.ocr_cache import OCRCache
+        from core.services.ocr_service import OCR_PROMPT
+        
+        cache = OCRCache(str(tmp_path))
+        cache.put(cache.make_key(["p1"], mock_ocr_service.model, OCR_PROMPT), "cached")
+        mock_client = AsyncMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_openai_response)
+        
+        with patch.object(mock_ocr_service, "client", mock_client), \
+                patch.object(mock_ocr_service, "cache", cache):
+            await mock_ocr_service.recognize_text(["p1", "p2", "p3"])
+        
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (0, 1)
+    
+    def test_plan_requests_skips_cached_pages(self, mock_ocr_service):
+        """Test cached pages are left out and no batch spans one."""
+        batches = mock_ocr_service.plan_requests(
+            ["a", "b", "c", "d", "e"], pages_per_request=4, cached=[None, None, "hit", None, None]
+        )
+        
+        assert [batch.indices for batch in batches] == [[0, 1], [3, 4]]
+
+
 class TestOCRIntegration:
     """Integration tests for OCR functionality."""
     
@@ -207,6 +912,24 @@ class TestOCRIntegration:
         pass
 
 
+def make_stream(parts):
+    """Create an async iterator of streamed chat completion chunks."""
+    async def stream():
+        for part in parts:
+            chunk = Mock()
+            chunk.choices = [Mock()]
+            chunk.choices[0].delta.content = part
+            yield chunk
+    return stream()
+
+
+def make_http_response(status_code, headers=None):
+    """Create an httpx response for building OpenAI status errors."""
+    import httpx
+    request = httpx.Request("POST", "https://api.test/v1/chat/completions")
+    return httpx.Response(status_code, headers=headers or {}, request=request)
+
+
 # Pytest fixtures
 @pytest.fixture
 def mock_api_key():
@@ -217,9 +940,9 @@ def mock_api_key():
 @pytest.fixture
 def mock_ocr_service(mocker, mock_api_key):
     """Create a mock OCR service for testing."""
-    with patch.dict(os.environ, {"SILICONFLOW_API_KEY": mock_api_key}):
+    with patch.dict(os.environ, {"SILICONFLOW_API_KEY": mock_api_key, "OCR_CACHE_ENABLED": "false"}):
         # Import after patching environment
-        from src.services.ocr_service import OCRService
+        from core.services.ocr_service import OCRService
         service = OCRService()
         return service
 
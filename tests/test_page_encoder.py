@@ -0,0 +1,189 @@
+import base64
+import math
+from io import BytesIO
+
+import fitz
+import pytest
+from PIL import Image
+
+from core.services.file_processor import pdf_to_encoded_pages
+from core.services.page_encoder import (
+    EncodePolicy,
+    binarize,
+    encode_page,
+    otsu_threshold,
+    parse_formats,
+    psnr
+)
+from core.utils.metrics import PAGE_BYTES_SAVED, PAGE_ENCODED_BYTES
+from core.utils.validators import ValidationError
+
+
+def decode(page):
+    """Open an encoded page as a PIL image."""
+    return Image.open(BytesIO(base64.b64decode(page.data)))
+
+
+class TestEncodePolicy:
+    """Test cases for encoding configuration."""
+
+    def test_parse_formats(self):
+        """Test formats are normalized and deduplicated."""
+        assert parse_formats("png, jpg ,JPEG") == ("PNG", "JPEG")
+
+    def test_unknown_format_rejected(self):
+        """Test unsupported formats are reported."""
+        with pytest.raises(ValidationError):
+            parse_formats("PNG,BMP")
+
+    def test_from_env(self, monkeypatch):
+        """Test the policy is read from the environment."""
+        monkeypatch.setenv("OCR_PAGE_FORMATS", "png,jpeg")
+        monkeypatch.setenv("OCR_PAGE_GRAYSCALE", "false")
+        monkeypatch.setenv("OCR_PAGE_BINARIZE", "true")
+        monkeypatch.setenv("OCR_MIN_PSNR", "45")
+
+        policy = EncodePolicy.from_env()
+
+        assert policy.formats == ("PNG", "JPEG")
+        assert not policy.grayscale
+        assert policy.binarize
+        assert policy.min_psnr == 45.0
+
+    def test_fixed_policy(self):
+        """Test an explicit format is a full-color, single-format policy."""
+        policy = EncodePolicy.fixed("jpg", 80)
+
+        assert policy.is_fixed
+        assert policy.formats == ("JPEG",)
+        assert policy.qualities == (80,)
+
+
+class TestImageHelpers:
+    """Test cases for thresholding and fidelity measurement."""
+
+    def test_otsu_threshold_splits_two_levels(self):
+        """Test the threshold falls between ink and paper."""
+        histogram = [0] * 256
+        histogram[30] = 100
+        histogram[220] = 900
+
+        assert 30 <= otsu_threshold(histogram) < 220
+
+    def test_binarize_leaves_two_levels(self, page_pixmap):
+        """Test binarized pages are pure black and white."""
+        image = Image.frombytes("L", (page_pixmap.width, page_pixmap.height), page_pixmap.samples)
+        levels = {level for level, count in enumerate(binarize(image).histogram()) if count}
+
+        assert levels == {0, 255}
+
+    def test_psnr(self):
+        """Test identical images score infinity and lossy ones less."""
+        image = Image.linear_gradient("L").resize((128, 128))
+        png, jpeg = BytesIO(), BytesIO()
+        image.save(png, "PNG")
+        image.save(jpeg, "JPEG", quality=20)
+
+        assert psnr(image, png.getvalue()) == math.inf
+        assert 20 < psnr(image, jpeg.getvalue()) < 60
+
+
+class TestEncodePage:
+    """Test cases for choosing a page encoding."""
+
+    def test_smallest_faithful_encoding_is_chosen(self, page_pixmap):
+        """Test the chosen encoding is no larger than PNG and above the threshold."""
+        page = encode_page(page_pixmap, EncodePolicy(formats=("PNG", "JPEG"), min_psnr=35))
+
+        assert page.size <= page.png_size
+        assert page.psnr >= 35
+        assert page.bytes_saved == page.png_size - page.size
+        with decode(page) as img:
+            assert img.format == page.format
+            assert img.mode == "L"
+
+    def test_webp_candidate(self, scan_pixmap):
+        """Test WebP is used when it is the smallest faithful encoding."""
+        page = encode_page(scan_pixmap, EncodePolicy(formats=("PNG", "WEBP"), min_psnr=30))
+
+        assert page.format == "WEBP"
+        assert page.quality in EncodePolicy().qualities
+
+    def test_falls_back_to_png(self, page_pixmap):
+        """Test PNG is sent when no lossy encoding is faithful enough."""
+        page = encode_page(page_pixmap, EncodePolicy(min_psnr=200))
+
+        assert page.format == "PNG"
+        assert page.bytes_saved == 0
+
+    def test_binarized_page_is_one_bit_png(self, page_pixmap):
+        """Test binarized pages are sent as lossless black and white."""
+        page = encode_page(page_pixmap, EncodePolicy(formats=("PNG",), binarize=True))
+
+        with decode(page) as img:
+            assert page.format == "PNG"
+            assert img.mode == "1"
+
+    def test_fixed_format_is_encoded_once(self, rgb_pixmap):
+        """Test an explicit format is used as-is, in color."""
+        page = encode_page(rgb_pixmap, EncodePolicy.fixed("JPEG"))
+
+        assert page.format == "JPEG"
+        assert page.psnr is None
+        with decode(page) as img:
+            assert img.mode == "RGB"
+
+
+class TestEncodedRendering:
+    """Test cases for rendering PDFs through the encoder."""
+
+    def test_pages_are_grayscale_and_savings_recorded(self, tmp_path):
+        """Test the OCR encoding renders in grayscale and counts bytes saved."""
+        path = str(tmp_path / "exam.pdf")
+        doc = fitz.open()
+        for _ in range(2):
+            page = doc.new_page(width=300, height=400)
+            for i in range(12):
+                page.insert_text((20, 30 + i * 25), f"x^{i} + {i}y = {i * 3}", fontsize=14)
+        doc.save(path)
+        saved_before = PAGE_BYTES_SAVED.value()
+        encoded_before = sum(PAGE_ENCODED_BYTES.snapshot().values())
+
+        pages = pdf_to_encoded_pages(path, EncodePolicy(formats=("PNG", "JPEG"), min_psnr=35), zoom=1.0)
+
+        assert len(pages) == 2
+        with decode(pages[0]) as img:
+            assert img.mode == "L"
+        assert PAGE_BYTES_SAVED.value() - saved_before == sum(page.bytes_saved for page in pages)
+        assert sum(PAGE_ENCODED_BYTES.snapshot().values()) - encoded_before == sum(page.size for page in pages)
+
+
+# Pytest fixtures
+@pytest.fixture
+def exam_page():
+    """Create a page with several lines of text."""
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=400)
+    for i in range(12):
+        page.insert_text((20, 30 + i * 25), f"f(x) = {i}x^2 + {i + 1}", fontsize=14)
+    yield page
+    doc.close()
+
+
+@pytest.fixture
+def page_pixmap(exam_page):
+    """Render the exam page in grayscale."""
+    return exam_page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5), colorspace=fitz.csGRAY, alpha=False)
+
+
+@pytest.fixture
+def rgb_pixmap(exam_page):
+    """Render the exam page in color."""
+    return exam_page.get_pixmap()
+
+
+@pytest.fixture
+def scan_pixmap():
+    """A grayscale pixmap with scanner-like noise, which PNG compresses poorly."""
+    image = Image.effect_noise((300, 400), 8).point(lambda value: min(255, value + 40))
+    return fitz.Pixmap(fitz.csGRAY, image.width, image.height, image.tobytes(), False)
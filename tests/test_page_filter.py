@@ -0,0 +1,151 @@
+import fitz
+import pytest
+
+from core.services.file_processor import iter_file_pages, process_file
+from core.services.page_filter import PageFilter, hamming, page_signature
+from core.utils.metrics import PAGES_SKIPPED
+
+
+def exam_page(doc, title, lines=12):
+    """Add a page with a title and several lines of formulas."""
+    page = doc.new_page(width=300, height=400)
+    page.insert_text((20, 30), title, fontsize=14)
+    for i in range(lines):
+        page.insert_text((20, 60 + i * 25), f"x^{i} + {i}y = {i * 3}", fontsize=12)
+    return page
+
+
+def signature(page, zoom=1.0):
+    return page_signature(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False))
+
+
+class TestPageSignature:
+    """Test cases for page fingerprints."""
+
+    def test_blank_page_has_no_ink(self):
+        """Test an empty page has zero ink coverage."""
+        doc = fitz.open()
+
+        assert signature(doc.new_page()).ink_ratio == 0.0
+
+    def test_same_page_at_other_zoom_hashes_alike(self):
+        """Test the hash survives a change of resolution."""
+        doc = fitz.open()
+        page = exam_page(doc, "Exam 1")
+
+        assert hamming(signature(page).dhash, signature(page, 1.7).dhash) <= 4
+
+    def test_rgb_and_gray_renders_agree(self):
+        """Test color renders are converted to grayscale first."""
+        doc = fitz.open()
+        page = exam_page(doc, "Exam 1")
+
+        assert page_signature(page.get_pixmap()).dhash == signature(page).dhash
+
+
+class TestPageFilter:
+    """Test cases for deciding which pages are OCR'd."""
+
+    def test_blank_page_skipped(self):
+        """Test pages without ink are skipped and counted."""
+        doc = fitz.open()
+        page_filter = PageFilter()
+        before = PAGES_SKIPPED.value(reason="blank")
+
+        assert page_filter.check(signature(exam_page(doc, "Exam 1")))
+        assert not page_filter.check(signature(doc.new_page(width=300, height=400)))
+        assert page_filter.blank_pages == [2]
+        assert PAGES_SKIPPED.value(reason="blank") - before == 1
+
+    def test_duplicate_maps_to_first_occurrence(self):
+        """Test a repeated page is skipped in favour of the first one."""
+        doc = fitz.open()
+        first = signature(exam_page(doc, "Exam 1"))
+        other = signature(exam_page(doc, "Exam 2 - geometry", lines=6))
+        repeat = signature(exam_page(doc, "Exam 1"), zoom=1.5)
+        page_filter = PageFilter()
+
+        assert [page_filter.check(s) for s in (first, other, repeat)] == [True, True, False]
+        assert page_filter.duplicate_pages == {3: 1}
+
+    def test_similar_pages_are_kept(self):
+        """Test pages differing in a few characters are not duplicates."""
+        doc = fitz.open()
+        page_filter = PageFilter()
+        for i in range(3):
+            page = doc.new_page(width=200, height=300)
+            page.insert_text((20, 50), f"Page {i + 1}: x^2 + {i} = 0")
+            assert page_filter.check(signature(page))
+
+    def test_disabled(self):
+        """Test a disabled filter keeps everything."""
+        doc = fitz.open()
+        page_filter = PageFilter(skip_blank=False, deduplicate=False)
+        blank = signature(doc.new_page())
+
+        assert not page_filter.enabled
+        assert page_filter.check(blank) and page_filter.check(blank)
+
+    def test_stats(self):
+        """Test skipped pages are reported with one-based numbers."""
+        doc = fitz.open()
+        exam = signature(exam_page(doc, "Exam 1"))
+        blank = signature(doc.new_page())
+        page_filter = PageFilter()
+        for s in (exam, blank, exam):
+            page_filter.check(s)
+
+        assert page_filter.stats() == {
+            "blank_pages_skipped": 1,
+            "duplicate_pages_skipped": 1,
+            "blank_pages": [2],
+            "duplicate_pages": {"3": 1}
+        }
+
+    def test_from_env(self, monkeypatch):
+        """Test the filter is configured from the environment."""
+        monkeypatch.setenv("OCR_SKIP_BLANK_PAGES", "false")
+        monkeypatch.setenv("OCR_DUPLICATE_DISTANCE", "20")
+
+        page_filter = PageFilter.from_env()
+
+        assert not page_filter.skip_blank
+        assert page_filter.deduplicate
+        assert page_filter.max_distance == 20
+
+
+class TestFilteredRendering:
+    """Test cases for filtering pages while rendering a PDF."""
+
+    def test_iter_file_pages_skips_pages(self, padded_pdf):
+        """Test blank and repeated pages are not yielded."""
+        page_filter = PageFilter()
+
+        pages = list(iter_file_pages(padded_pdf, zoom=1.0, page_filter=page_filter))
+
+        assert len(pages) == 2
+        assert page_filter.pages == 4
+        assert page_filter.blank_pages == [3]
+        assert page_filter.duplicate_pages == {4: 1}
+
+    def test_process_file_matches_iterator(self, padded_pdf):
+        """Test the eager and lazy paths keep the same pages."""
+        images, num_pages = process_file(padded_pdf, zoom=1.0)
+
+        assert num_pages == 4
+        assert images == list(iter_file_pages(padded_pdf, zoom=1.0))
+
+
+# Pytest fixtures
+@pytest.fixture
+def padded_pdf(tmp_path):
+    """A PDF of two exam pages, a blank page and a repeat of the first page."""
+    doc = fitz.open()
+    exam_page(doc, "Exam 1")
+    exam_page(doc, "Exam 2 - geometry", lines=6)
+    doc.new_page(width=300, height=400)
+    exam_page(doc, "Exam 1")
+    path = str(tmp_path / "padded.pdf")
+    doc.save(path)
+    doc.close()
+    return str(path)
@@ -0,0 +1,186 @@
+import pytest
+
+from core.services.page_encoder import PageImage
+from core.services.page_planner import (
+    BatchPacker,
+    PageBatch,
+    PageProgress,
+    TokenEstimator,
+    image_size_kb,
+    page_number,
+    split_batch
+)
+
+
+def pack(estimates, max_tokens, **kwargs):
+    """Pack every page with a BatchPacker and return the batches."""
+    packer = BatchPacker(max_tokens, **kwargs)
+    batches = [packer.add(index, estimate) for index, estimate in enumerate(estimates)]
+    batches.append(packer.flush())
+    return [batch for batch in batches if batch is not None]
+
+
+class TestPacking:
+    """Test cases for packing pages into requests."""
+
+    def test_packs_pages_up_to_token_limit(self):
+        """Test consecutive pages are packed until the limit is reached."""
+        batches = pack([400, 400, 400, 400], max_tokens=1100, max_pages=4, safety_margin=1.0)
+
+        assert [batch.indices for batch in batches] == [[0, 1], [2, 3]]
+        assert all(batch.max_tokens == 800 for batch in batches)
+
+    def test_respects_max_pages(self):
+        """Test no batch holds more than `max_pages` pages."""
+        batches = pack([10] * 5, max_tokens=2048, max_pages=2)
+
+        assert [batch.indices for batch in batches] == [[0, 1], [2, 3], [4]]
+
+    def test_oversized_page_goes_alone_with_full_limit(self):
+        """Test a page estimated above the limit gets its own request."""
+        batches = pack([100, 5000, 100], max_tokens=2048, safety_margin=1.0)
+
+        assert [batch.indices for batch in batches] == [[0], [1], [2]]
+        assert batches[1].max_tokens == 2048
+
+    def test_minimum_request_budget(self):
+        """Test tiny batches still get a usable max_tokens."""
+        batches = pack([10], max_tokens=2048, min_request_tokens=256)
+
+        assert batches[0].max_tokens == 256
+
+
+class TestBatchHelpers:
+    """Test cases for batch splitting."""
+
+    def test_split_batch_in_halves(self):
+        """Test a truncated batch is split into two halves with the full limit."""
+        halves = split_batch(PageBatch(indices=[0, 1, 2], max_tokens=500), max_tokens=2048)
+
+        assert [half.indices for half in halves] == [[0], [1, 2]]
+        assert all(half.max_tokens == 2048 for half in halves)
+
+    def test_split_single_page_raises_limit(self):
+        """Test a single page is resubmitted alone with the full limit."""
+        parts = split_batch(PageBatch(indices=[3], max_tokens=500), max_tokens=2048)
+
+        assert len(parts) == 1
+        assert parts[0].pages == [4]
+        assert parts[0].max_tokens == 2048
+
+    def test_split_batch_keeps_source_pages(self):
+        """Test halves of a batch of question blocks keep the pages the blocks came from."""
+        halves = split_batch(PageBatch(indices=[0, 1, 2], max_tokens=500, page_numbers=[4, 4, 5]), max_tokens=2048)
+
+        assert [half.pages for half in halves] == [[4], [4, 5]]
+
+
+class TestBatchPacker:
+    """Test cases for packing pages as they arrive."""
+
+    def test_batch_is_closed_as_soon_as_it_is_full(self):
+        """Test a full batch is returned without waiting for later pages."""
+        packer = BatchPacker(max_tokens=2048, max_pages=2)
+
+        assert packer.add(0, 10) is None
+        assert packer.add(1, 10).indices == [0, 1]
+        assert packer.add(2, 10) is None
+        assert packer.flush().indices == [2]
+        assert packer.flush() is None
+
+    def test_fixed_mode_ignores_estimates(self):
+        """Test fixed mode groups by page count with the full limit."""
+        packer = BatchPacker(max_tokens=2048, max_pages=2, fixed=True)
+
+        assert packer.add(0, 5000) is None
+        batch = packer.add(1, 5000)
+        assert batch.indices == [0, 1]
+        assert batch.max_tokens == 2048
+
+
+class TestPageProgress:
+    """Test cases for counting finished source pages."""
+
+    def test_page_is_done_when_all_its_blocks_are(self):
+        """Test a page with several blocks is done only after its last block and once reading moved on."""
+        done = []
+        progress = PageProgress(done.append)
+
+        progress.read(1)
+        progress.read(1)
+        progress.finish([1])
+        progress.finish([1])
+        assert done == []
+
+        progress.read(2)
+        assert done == [1]
+
+    def test_pages_finish_in_order(self):
+        """Test a later page finishing first is counted once the earlier ones are done."""
+        done = []
+        progress = PageProgress(done.append)
+        for page in (1, 2, 3):
+            progress.read(page)
+        progress.close()
+
+        progress.finish([3])
+        assert progress.done == 0
+        progress.finish([1])
+        progress.finish([2])
+        assert done == [1, 2]
+
+    def test_skipped_pages_count_as_done(self):
+        """Test pages that yielded no items are counted, including those at the end."""
+        progress = PageProgress()
+        progress.read(2)
+        progress.read(4)
+        progress.finish([2, 4])
+        progress.close(total=6)
+
+        assert progress.done == 6
+
+
+class TestTokenEstimator:
+    """Test cases for output token estimation."""
+
+    def test_estimate_scales_with_image_size(self):
+        """Test larger images get larger estimates."""
+        estimator = TokenEstimator(tokens_per_kb=10.0, min_tokens=1)
+
+        small = estimator.estimate("A" * 4096)
+        large = estimator.estimate("A" * 40960)
+
+        assert small == 30
+        assert large == 300
+
+    def test_observe_updates_ratio(self):
+        """Test observed usage refines the tokens-per-KB ratio."""
+        estimator = TokenEstimator(tokens_per_kb=10.0, smoothing=0.5)
+        image = "A" * 4096  # 3 KB
+
+        estimator.observe([image], 60)
+        assert estimator.tokens_per_kb == pytest.approx(20.0)
+
+        estimator.observe([image], 120)
+        assert estimator.tokens_per_kb == pytest.approx(30.0)
+        assert estimator.stats()["observations"] == 2
+
+    def test_image_size_kb_accounts_for_padding(self):
+        """Test decoded size is derived from base64 length and padding."""
+        assert image_size_kb("QUJD") == pytest.approx(3 / 1024)
+        assert image_size_kb("QUI=") == pytest.approx(2 / 1024)
+
+    def test_blocks_report_their_source_page(self):
+        """Test a batch of question blocks lists each source page once."""
+        packer = BatchPacker(max_tokens=2048, max_pages=3)
+
+        for index, page in enumerate([2, 2, 3]):
+            batch = packer.add(index, 10, page)
+
+        assert batch.indices == [0, 1, 2]
+        assert batch.pages == [2, 3]
+
+    def test_page_number_defaults_to_position(self):
+        """Test images without a page number count as one page each."""
+        assert page_number("image", 4) == 5
+        assert page_number(PageImage("image", 2), 4) == 2
@@ -0,0 +1,116 @@
+import fitz
+import pytest
+
+from core.services.file_processor import iter_file_pages, process_file
+from core.services.page_store import MemoryBudget, PageStore
+from core.utils.metrics import PAGES_SPILLED
+
+
+class TestPageStore:
+    """Test cases for keeping encoded pages within a memory budget."""
+
+    def test_pages_within_budget_stay_in_memory(self):
+        """Test a store under its budget never touches the disk."""
+        store = PageStore(MemoryBudget(max_bytes=100))
+        store.append("a" * 40)
+        store.append("b" * 40)
+
+        assert store.spilled == 0
+        assert store.resident_bytes == 80
+        assert list(store) == ["a" * 40, "b" * 40]
+
+    def test_pages_beyond_budget_are_spilled(self, tmp_path):
+        """Test pages past the budget are written to the spill directory and read back."""
+        before = PAGES_SPILLED.value()
+        pages = [chr(ord("a") + i) * 40 for i in range(5)]
+
+        with PageStore(MemoryBudget(max_bytes=100, spill_dir=str(tmp_path))) as store:
+            for page in pages:
+                store.append(page)
+
+            assert (store.resident_bytes, store.spilled) == (80, 3)
+            assert store == pages
+            assert store[3] == pages[3]
+            assert store[-1] == pages[-1]
+            assert store[1:4] == pages[1:4]
+        assert PAGES_SPILLED.value() - before == 3
+
+    def test_reads_between_appends(self):
+        """Test spilled pages stay readable while more pages are spilled."""
+        store = PageStore(MemoryBudget(max_bytes=0))
+        store.append("first")
+        assert store[0] == "first"
+        store.append("second")
+
+        assert store[0] == "first"
+        assert store[1] == "second"
+        store.close()
+
+    def test_unbounded(self):
+        """Test a budget without a limit keeps every page in memory."""
+        store = PageStore(MemoryBudget(max_bytes=None))
+        for _ in range(10):
+            store.append("x" * 1000)
+
+        assert store.spilled == 0
+        assert len(store) == 10
+
+    def test_close_releases_pages(self):
+        """Test a closed store is empty."""
+        store = PageStore(MemoryBudget(max_bytes=0))
+        store.append("page")
+        store.close()
+
+        assert len(store) == 0
+        assert store.resident_bytes == 0
+
+    def test_from_env(self, monkeypatch):
+        """Test the budget is read from the environment."""
+        monkeypatch.setenv("OCR_MEMORY_BUDGET_MB", "0")
+        monkeypatch.setenv("OCR_RENDER_WINDOW", "4")
+        monkeypatch.setenv("OCR_SPILL_DIR", "/var/tmp")
+
+        budget = MemoryBudget.from_env()
+
+        assert budget.max_bytes is None
+        assert budget.window == 4
+        assert budget.spill_dir == "/var/tmp"
+
+
+class TestBoundedProcessing:
+    """Test cases for processing files within a memory budget."""
+
+    def test_process_file_spills_and_matches_iterator(self, workbook_pdf, tmp_path):
+        """Test a spilled document yields the same pages as unbounded processing."""
+        budget = MemoryBudget(max_bytes=1, window=2, spill_dir=str(tmp_path))
+
+        images, num_pages = process_file(workbook_pdf, zoom=1.0, budget=budget)
+        with images:
+            assert num_pages == 6
+            assert images.spilled == len(images) == 6
+            assert images == list(iter_file_pages(workbook_pdf, zoom=1.0))
+
+    def test_image_file(self, workbook_pdf, tmp_path):
+        """Test an image file is returned as a one-page store."""
+        path = str(tmp_path / "page.png")
+        with fitz.open(workbook_pdf) as doc:
+            doc[0].get_pixmap().save(path)
+
+        images, num_pages = process_file(path)
+
+        assert isinstance(images, PageStore)
+        assert (len(images), num_pages) == (1, 1)
+
+
+# Pytest fixtures
+@pytest.fixture
+def workbook_pdf(tmp_path):
+    """A six-page PDF with a different exercise on each page."""
+    document = fitz.open()
+    for page_num in range(6):
+        page = document.new_page(width=300, height=400)
+        page.insert_text((20, 50), f"Exercise {page_num + 1}: {page_num + 2}x + 3 = {page_num * 5}")
+    path = str(tmp_path / "workbook.pdf")
+    document.save(path)
+    document.close()
+    return path
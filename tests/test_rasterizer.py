@@ -0,0 +1,224 @@
+import os
+import pytest
+from unittest.mock import patch
+
+import fitz
+
+from core.services import rasterizer
+from core.services.file_processor import (
+    pdf_to_base64_images,
+    pdf_to_encoded_pages,
+    pdf_to_image_files,
+    pdf_to_images,
+    iter_file_pages,
+    process_file
+)
+from core.services.page_encoder import EncodePolicy, PageImage
+from core.services.page_filter import PageFilter
+from core.services.page_store import MemoryBudget
+from core.services.segmenter import SegmentPolicy
+from core.services.rasterizer import RenderPool, get_render_pool, page_ranges
+from core.services.text_layer import PageText, TextLayerPolicy
+
+
+class TestPageRanges:
+    """Test cases for splitting pages across workers."""
+
+    def test_ranges_are_contiguous_and_balanced(self):
+        """Test pages are split in order into nearly equal ranges."""
+        ranges = page_ranges(10, 4)
+
+        assert [list(r) for r in ranges] == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]]
+
+    def test_never_more_ranges_than_pages(self):
+        """Test small documents are not split into empty ranges."""
+        assert [list(r) for r in page_ranges(2, 4)] == [[0], [1]]
+
+    def test_ranges_from_start(self):
+        """Test a window of pages is split from its first page."""
+        assert [list(r) for r in page_ranges(10, 2, start=6)] == [[6, 7], [8, 9]]
+
+
+class TestRenderPool:
+    """Test cases for parallel rendering in worker processes."""
+
+    def test_parallel_base64_matches_in_process(self, pool, sample_pdf):
+        """Test the pool returns the same pages, in order, as in-process rendering."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            parallel = pdf_to_base64_images(sample_pdf, parallel=True)
+
+        assert parallel == pdf_to_base64_images(sample_pdf, parallel=False)
+
+    def test_parallel_encoding_matches_in_process(self, pool, sample_pdf):
+        """Test workers apply the same OCR encoding as in-process rendering."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            parallel = pdf_to_base64_images(sample_pdf, format=None, parallel=True)
+
+        assert parallel == pdf_to_base64_images(sample_pdf, format=None, parallel=False)
+
+    def test_parallel_page_filter_matches_in_process(self, pool, sample_pdf):
+        """Test page signatures computed by workers filter the same pages."""
+        doc = fitz.open(sample_pdf)
+        doc.insert_pdf(fitz.open(sample_pdf), from_page=1, to_page=1)
+        doc.new_page(width=200, height=300)
+        doc.saveIncr()
+        doc.close()
+        encoding = EncodePolicy(formats=("PNG",))
+        page_filter = PageFilter()
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            parallel = pdf_to_encoded_pages(sample_pdf, encoding, zoom=1.0, parallel=True, page_filter=page_filter)
+
+        sequential = pdf_to_encoded_pages(sample_pdf, encoding, zoom=1.0, parallel=False, page_filter=PageFilter())
+        assert [page.data for page in parallel] == [page.data for page in sequential]
+        assert len(parallel) == 5
+        assert page_filter.stats()["duplicate_pages"] == {"6": 2}
+        assert page_filter.blank_pages == [7]
+
+    def test_parallel_segmentation_matches_in_process(self, pool, tmp_path):
+        """Test workers split pages into the same blocks, in the same order."""
+        path = str(tmp_path / "questions.pdf")
+        doc = fitz.open()
+        for page_num in range(4):
+            page = doc.new_page(width=300, height=400)
+            for i in range(page_num + 1):
+                page.insert_text((20, 40 + i * 90), f"{page_num * 4 + i + 1}. Solve for x:")
+                page.insert_text((30, 56 + i * 90), f"{i + 2}x + {page_num} = {i * 3}")
+        doc.save(path)
+        doc.close()
+        encoding = EncodePolicy(formats=("PNG",))
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            parallel = pdf_to_encoded_pages(path, encoding, zoom=1.5, parallel=True, segments=SegmentPolicy())
+
+        sequential = pdf_to_encoded_pages(path, encoding, zoom=1.5, parallel=False, segments=SegmentPolicy())
+        assert [page.data for page in parallel] == [page.data for page in sequential]
+        assert [(page.block, page.blocks) for page in parallel] == [(0, 1), (0, 2), (1, 2), (0, 3), (1, 3), (2, 3), (0, 4), (1, 4), (2, 4), (3, 4)]
+
+    def test_windowed_rendering_matches_in_process(self, pool, sample_pdf):
+        """Test rendering the pool's pages window by window keeps every page, in order."""
+        budget = MemoryBudget(window=2)
+        with patch("core.services.file_processor.get_render_pool", return_value=pool), \
+                patch.object(pool, "render_encoded", wraps=pool.render_encoded) as render_encoded:
+            windowed, _ = process_file(sample_pdf, page_filter=PageFilter(), budget=budget)
+
+        sequential = pdf_to_base64_images(sample_pdf, format=None, parallel=False)
+        assert windowed == sequential
+        assert [call.kwargs["start"] for call in render_encoded.call_args_list] == [0, 2, 4]
+
+    def test_lazy_pages_render_one_page_per_worker(self, pool, sample_pdf):
+        """Test iter_file_pages renders on the pool a window of one page per worker at a time."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool), \
+                patch.object(pool, "render_encoded", wraps=pool.render_encoded) as render_encoded:
+            lazy = list(iter_file_pages(sample_pdf, page_filter=PageFilter()))
+
+        assert lazy == pdf_to_base64_images(sample_pdf, format=None, parallel=False)
+        assert [call.kwargs["start"] for call in render_encoded.call_args_list] == [0, 2, 4]
+
+    def test_text_layer_sends_scanned_pages_to_pool(self, pool, scanned_pdf):
+        """Test with the text layer on, pages needing whole-page OCR are still rendered on the pool."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool), \
+                patch.object(pool, "render_encoded", wraps=pool.render_encoded) as render_encoded:
+            pooled = list(iter_file_pages(scanned_pdf, page_filter=PageFilter(), text_layer=TextLayerPolicy()))
+
+        with patch("core.services.file_processor.get_render_pool", return_value=None):
+            sequential = list(iter_file_pages(scanned_pdf, page_filter=PageFilter(), text_layer=TextLayerPolicy()))
+
+        assert [call.kwargs["pages"] for call in render_encoded.call_args_list] == [[1], [2], [4]]
+        assert [type(item) for item in pooled] == [PageText, PageImage, PageImage, PageText, PageImage]
+        assert pooled == sequential
+        assert [item.page for item in pooled] == [1, 2, 3, 4, 5]
+
+    def test_parallel_images_use_configured_zoom(self, pool, sample_pdf):
+        """Test raw renders in workers apply OCR_PDF_ZOOM."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool), \
+                patch.dict(os.environ, {"OCR_PDF_ZOOM": "2"}):
+            images = pdf_to_images(sample_pdf, parallel=True)
+
+        assert images[0].size == (400, 600)
+
+    def test_parallel_images_match_in_process(self, pool, sample_pdf):
+        """Test raw renders come back as the same PIL images."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            parallel = pdf_to_images(sample_pdf, parallel=True)
+
+        sequential = pdf_to_images(sample_pdf, parallel=False)
+        assert [img.tobytes() for img in parallel] == [img.tobytes() for img in sequential]
+
+    def test_parallel_files_are_written_in_order(self, pool, sample_pdf, tmp_path):
+        """Test every page is saved to its numbered file."""
+        with patch("core.services.file_processor.get_render_pool", return_value=pool):
+            saved = pdf_to_image_files(sample_pdf, str(tmp_path), zoom=2.0, parallel=True)
+
+        assert [os.path.basename(path) for path in saved] == [f"sample_page_{i:03d}.png" for i in range(1, 6)]
+        assert all(os.path.getsize(path) > 0 for path in saved)
+
+    def test_small_documents_stay_in_process(self, pool):
+        """Test documents under min_pages are not sent to the pool."""
+        assert not pool.should_parallelize(3)
+        assert pool.should_parallelize(4)
+
+
+class TestGetRenderPool:
+    """Test cases for the shared render pool."""
+
+    def test_single_worker_disables_pool(self, reset_pool):
+        """Test one worker means in-process rendering."""
+        with patch.dict(os.environ, {"OCR_RENDER_WORKERS": "1"}):
+            assert get_render_pool() is None
+
+    def test_pool_is_shared(self, reset_pool):
+        """Test the same pool is returned across calls."""
+        with patch.dict(os.environ, {"OCR_RENDER_WORKERS": "2", "OCR_RENDER_MIN_PAGES": "8"}):
+            pool = get_render_pool()
+
+        assert pool is get_render_pool()
+        assert pool.workers == 2
+        assert pool.min_pages == 8
+
+
+# Pytest fixtures
+@pytest.fixture(scope="module")
+def pool():
+    """Create a two-worker render pool, shut down after the module."""
+    render_pool = RenderPool(workers=2, min_pages=4)
+    yield render_pool
+    render_pool.shutdown()
+
+
+@pytest.fixture
+def reset_pool():
+    """Clear the shared render pool before and after a test."""
+    rasterizer.close_render_pool()
+    yield
+    rasterizer.close_render_pool()
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """Create a five-page PDF with text on each page."""
+    doc = fitz.open()
+    for page_num in range(5):
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 50), f"Page {page_num + 1}: y = {page_num}x + 1")
+    path = tmp_path / "sample.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def scanned_pdf(tmp_path):
+    """Create a five-page PDF whose first and fourth pages have a text layer and the rest are scans."""
+    doc = fitz.open()
+    for page_num in range(5):
+        page = doc.new_page(width=200, height=300)
+        if page_num in (0, 3):
+            page.insert_text((20, 50), f"Question {page_num + 1}. A train travels", fontsize=9)
+            continue
+        source = fitz.open()
+        source.new_page(width=200, height=300).draw_rect(fitz.Rect(20, 40 * page_num, 180, 40 * page_num + 60), fill=(0, 0, 0))
+        page.insert_image(page.rect, pixmap=source[0].get_pixmap())
+        source.close()
+    path = tmp_path / "scanned.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
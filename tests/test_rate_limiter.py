@@ -0,0 +1,231 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import patch
+
+from core.services.rate_limiter import (
+    KeyedTokenBuckets,
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    is_retryable_status,
+    parse_retry_after,
+    try_acquire_all
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Test cases for the token bucket."""
+
+    def test_burst_then_wait(self, clock):
+        """Test a full bucket allows a burst, then reports the refill wait."""
+        bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=clock)
+
+        assert bucket.try_acquire() == 0.0
+        assert bucket.try_acquire() == 0.0
+        assert bucket.try_acquire() == pytest.approx(1.0)
+
+        clock.now += 1.0
+        assert bucket.try_acquire() == 0.0
+
+    def test_oversized_request_is_clamped(self, clock):
+        """Test requests larger than the bucket can still proceed."""
+        bucket = TokenBucket(rate_per_minute=600, capacity=100, clock=clock)
+
+        assert bucket.try_acquire(500) == 0.0
+        assert bucket.wait_time(500) == pytest.approx(10.0)
+
+
+class TestKeyedTokenBuckets:
+    """Test cases for per-key token buckets."""
+
+    def test_keys_are_limited_separately(self, clock):
+        """Test each key spends its own bucket."""
+        buckets = KeyedTokenBuckets(rate_per_minute=60, capacity=1, clock=clock)
+
+        assert buckets.try_acquire("a") == 0.0
+        assert buckets.try_acquire("a") == pytest.approx(1.0)
+        assert buckets.try_acquire("b") == 0.0
+
+        clock.now += 1.0
+        assert buckets.try_acquire("a") == 0.0
+
+    def test_least_recently_used_key_is_evicted(self, clock):
+        """Test only max_keys buckets are kept, dropping the least recently used."""
+        buckets = KeyedTokenBuckets(rate_per_minute=60, capacity=1, max_keys=2, clock=clock)
+
+        first = buckets.bucket("a")
+        buckets.bucket("b")
+        assert buckets.bucket("a") is first
+        buckets.bucket("c")
+
+        assert len(buckets) == 2
+        assert buckets.bucket("a") is first
+        assert buckets.try_acquire("b") == 0.0
+
+
+class TestTryAcquireAll:
+    """Test cases for spending several buckets together."""
+
+    def test_refusal_spends_nothing(self, clock):
+        """Test tokens are only taken when every bucket has them."""
+        client = TokenBucket(rate_per_minute=60, capacity=3, clock=clock)
+        first = TokenBucket(rate_per_minute=60, capacity=1, clock=clock)
+
+        assert try_acquire_all(client, first) == 0.0
+        assert try_acquire_all(client, first) == pytest.approx(1.0)
+        assert client.wait_time(2) == 0.0
+
+    def test_shared_bucket_caps_rotating_keys(self, clock):
+        """Test new session keys from one client still share the client's bucket."""
+        clients = KeyedTokenBuckets(rate_per_minute=60, capacity=2, clock=clock)
+        sessions = KeyedTokenBuckets(rate_per_minute=60, capacity=2, clock=clock)
+
+        delays = [
+            try_acquire_all(clients.bucket("10.0.0.1"), sessions.bucket(f"session-{i}"))
+            for i in range(4)
+        ]
+
+        assert delays[:2] == [0.0, 0.0]
+        assert delays[2] == pytest.approx(1.0)
+        assert try_acquire_all(clients.bucket("10.0.0.2"), sessions.bucket("session-9")) == 0.0
+
+
+class TestRateLimiter:
+    """Test cases for the adaptive rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_refill(self, clock):
+        """Test callers sleep until a request token is available."""
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        limiter._request_bucket._tokens = 0
+
+        async def fake_sleep(seconds):
+            clock.now += seconds
+
+        with patch("core.services.rate_limiter.asyncio.sleep", side_effect=fake_sleep):
+            waited = await limiter.acquire()
+
+        assert waited == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_all_callers(self, clock):
+        """Test a throttle with Retry-After holds back the next acquire."""
+        limiter = RateLimiter(requests_per_minute=600, clock=clock)
+        limiter.on_throttle(retry_after=5.0)
+
+        async def fake_sleep(seconds):
+            clock.now += seconds
+
+        with patch("core.services.rate_limiter.asyncio.sleep", side_effect=fake_sleep):
+            waited = await limiter.acquire()
+
+        assert waited == pytest.approx(5.0)
+
+    @pytest.mark.asyncio
+    async def test_non_finite_pause_is_ignored(self, clock):
+        """Test an infinite pause does not freeze every caller."""
+        limiter = RateLimiter(requests_per_minute=600, clock=clock)
+        limiter.pause(float("inf"))
+
+        assert await limiter.acquire() == 0.0
+
+    @pytest.mark.asyncio
+    async def test_pause_is_waited_out_concurrently(self):
+        """Test callers held by a pause wait for it together, not one after another."""
+        limiter = RateLimiter(requests_per_minute=6000)
+        limiter.pause(0.2)
+
+        start = time.monotonic()
+        waits = await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+
+        assert time.monotonic() - start < 0.5
+        assert all(wait >= 0.15 for wait in waits)
+
+    @pytest.mark.asyncio
+    async def test_reservations_are_served_in_order(self, clock):
+        """Test each waiting caller is scheduled after the reservations before it."""
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        limiter._request_bucket._tokens = 0
+        delays = []
+
+        async def fake_sleep(seconds):
+            delays.append(seconds)
+
+        with patch("core.services.rate_limiter.asyncio.sleep", side_effect=fake_sleep):
+            await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+
+        assert delays == [pytest.approx(1.0), pytest.approx(2.0), pytest.approx(3.0)]
+
+    def test_throttle_halves_rate_and_success_recovers(self, clock):
+        """Test AIMD adjustment of the request rate."""
+        limiter = RateLimiter(requests_per_minute=100, clock=clock)
+
+        limiter.on_throttle()
+        assert limiter.requests_per_minute == 50
+        limiter.on_success()
+        assert limiter.requests_per_minute == 55
+
+        for _ in range(20):
+            limiter.on_success()
+        assert limiter.requests_per_minute == 100
+        assert limiter.stats()["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unlimited_limiter_never_waits(self):
+        """Test a limiter without limits returns immediately."""
+        limiter = RateLimiter()
+
+        assert await limiter.acquire(10000) == 0.0
+
+
+class TestRetryHelpers:
+    """Test cases for backoff and Retry-After helpers."""
+
+    def test_backoff_delay_is_full_jitter(self):
+        """Test delay is drawn from [0, min(cap, base * 2**attempt)]."""
+        assert backoff_delay(0, base=1.0, rng=lambda: 1.0) == 1.0
+        assert backoff_delay(3, base=1.0, rng=lambda: 0.5) == 4.0
+        assert backoff_delay(10, base=1.0, cap=30.0, rng=lambda: 1.0) == 30.0
+        assert backoff_delay(2, base=1.0, rng=lambda: 0.0) == 0.0
+
+    def test_parse_retry_after(self):
+        """Test Retry-After in seconds and HTTP-date form."""
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after(" 1.5 ") == 1.5
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_parse_retry_after_rejects_unusable_waits(self):
+        """Test non-finite values are rejected and long waits are clamped to the maximum."""
+        assert parse_retry_after("inf") is None
+        assert parse_retry_after("nan") is None
+        assert parse_retry_after("86400", max_delay=30.0) == 30.0
+        assert parse_retry_after("Fri, 01 Jan 2100 00:00:00 GMT", max_delay=30.0) == 30.0
+        assert parse_retry_after("3", max_delay=30.0) == 3.0
+
+    def test_is_retryable_status(self):
+        """Test only transient statuses are retryable."""
+        assert is_retryable_status(429)
+        assert is_retryable_status(503)
+        assert not is_retryable_status(400)
+        assert not is_retryable_status(404)
+
+
+# Pytest fixtures
+@pytest.fixture
+def clock():
+    """Create a manually advanced clock."""
+    return FakeClock()
@@ -0,0 +1,165 @@
+import base64
+from io import BytesIO
+
+import fitz
+import pytest
+from PIL import Image, ImageDraw
+
+from core.services.file_processor import pdf_to_base64_images
+from core.services.resolution import (
+    ZoomPolicy,
+    choose_zoom,
+    measure_page,
+    page_zoom,
+    parse_zoom
+)
+from core.utils.validators import ValidationError
+
+
+def text_page(doc, font_size, lines=30, text="f(x) = x + 1, solve for x"):
+    """Add an A4 page filled with lines of text at `font_size` points."""
+    page = doc.new_page(width=595, height=842)
+    for i in range(lines):
+        page.insert_text((50, 60 + i * font_size * 1.5), text, fontsize=font_size)
+    return page
+
+
+class TestParseZoom:
+    """Test cases for zoom settings."""
+
+    @pytest.mark.parametrize("value", [None, "auto", "AUTO", ""])
+    def test_auto_values(self, value):
+        """Test missing and "auto" settings select adaptive zoom."""
+        assert parse_zoom(value) is None
+
+    def test_number(self):
+        """Test numeric settings are used as-is."""
+        assert parse_zoom("1.5") == 1.5
+        assert parse_zoom(2) == 2.0
+
+    @pytest.mark.parametrize("value", ["big", 0, -1])
+    def test_invalid(self, value):
+        """Test invalid settings are rejected."""
+        with pytest.raises(ValidationError):
+            parse_zoom(value)
+
+
+class TestChooseZoom:
+    """Test cases for picking a zoom per page."""
+
+    def test_small_text_gets_more_pixels(self, policy):
+        """Test zoom scales inversely with the font size."""
+        doc = fitz.open()
+        small = choose_zoom(text_page(doc, 8), policy)
+        large = choose_zoom(text_page(doc, 24, lines=10), policy)
+
+        assert small == 2.0
+        assert large == policy.min_zoom
+
+    def test_dense_formulas_get_more_pixels(self, policy):
+        """Test many small scripts lower the measured text size."""
+        doc = fitz.open()
+        plain = choose_zoom(text_page(doc, 12), policy)
+        formulas = text_page(doc, 12)
+        for i in range(30):
+            formulas.insert_text((300, 60 + i * 18), "2  n  i", fontsize=7)
+
+        assert choose_zoom(formulas, policy) > plain
+
+    def test_few_scripts_do_not_raise_zoom(self, policy):
+        """Test a couple of small characters do not decide the zoom."""
+        doc = fitz.open()
+        plain = choose_zoom(text_page(doc, 12), policy)
+        page = text_page(doc, 12)
+        page.insert_text((300, 60), "2", fontsize=6)
+
+        assert choose_zoom(page, policy) == plain
+
+    def test_blank_page_uses_min_zoom(self, policy):
+        """Test a page without content is rendered small."""
+        doc = fitz.open()
+
+        assert choose_zoom(doc.new_page(), policy) == policy.min_zoom
+
+    def test_longest_side_is_capped(self):
+        """Test no page side exceeds max_side pixels."""
+        doc = fitz.open()
+        page = text_page(doc, 6)
+
+        assert choose_zoom(page, ZoomPolicy(max_zoom=4.0, max_side=1000)) == round(1000 / 842, 2)
+
+    def test_scanned_page_is_measured_from_ink(self, policy):
+        """Test pages without a text layer are measured from a probe render."""
+        doc = fitz.open()
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=scan_png(bar_height=9, scale=2))
+
+        measure = measure_page(page)
+        assert measure.source == "scan"
+        assert measure.native_zoom == pytest.approx(2.0, rel=0.01)
+        assert measure.text_size == pytest.approx(10.0, rel=0.15)
+
+    def test_scan_is_not_upsampled(self, policy):
+        """Test a scan is never rendered above its own resolution."""
+        doc = fitz.open()
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=scan_png(bar_height=5, scale=1))
+
+        assert choose_zoom(page, policy) <= 1.0
+
+    def test_explicit_zoom_wins(self, policy):
+        """Test an explicit zoom is used without measuring the page."""
+        doc = fitz.open()
+
+        assert page_zoom(text_page(doc, 8), 1.25, policy) == 1.25
+
+
+class TestAdaptiveRendering:
+    """Test cases for rendering PDFs with adaptive zoom."""
+
+    def test_pages_are_rendered_at_their_own_zoom(self, tmp_path, monkeypatch):
+        """Test each page of a document gets its own resolution."""
+        monkeypatch.setenv("OCR_PDF_ZOOM", "auto")
+        doc = fitz.open()
+        text_page(doc, 8)
+        text_page(doc, 24, lines=10)
+        path = str(tmp_path / "mixed.pdf")
+        doc.save(path)
+
+        widths = [image_width(b64) for b64 in pdf_to_base64_images(path)]
+
+        assert widths[0] > widths[1]
+
+    def test_fixed_zoom_from_environment(self, tmp_path, monkeypatch):
+        """Test OCR_PDF_ZOOM sets a fixed default zoom."""
+        monkeypatch.setenv("OCR_PDF_ZOOM", "1.0")
+        doc = fitz.open()
+        text_page(doc, 8)
+        path = str(tmp_path / "fixed.pdf")
+        doc.save(path)
+
+        assert image_width(pdf_to_base64_images(path)[0]) == 595
+
+
+def image_width(image_b64):
+    """Width of a base64 encoded image."""
+    with Image.open(BytesIO(base64.b64decode(image_b64))) as img:
+        return img.width
+
+
+def scan_png(bar_height, scale):
+    """A page-sized image of black bars `bar_height` points tall, `scale` pixels per point."""
+    img = Image.new("L", (595 * scale, 842 * scale), 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(40 * scale, 800 * scale, bar_height * 2 * scale):
+        draw.rectangle([40 * scale, y, 550 * scale, y + bar_height * scale - 1], fill=0)
+    buffer = BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+# Pytest fixtures
+@pytest.fixture
+def policy():
+    """Adaptive zoom policy with the defaults, independent of the environment."""
+    return ZoomPolicy(target_text_px=16.0, min_zoom=0.75, max_zoom=2.5, max_side=2048)
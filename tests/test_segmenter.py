@@ -0,0 +1,207 @@
+import fitz
+import numpy as np
+import pytest
+
+from core.services.file_processor import iter_file_pages, process_file
+from core.services.page_filter import PageFilter
+from core.services.segmenter import (
+    SegmentPolicy,
+    crop_pixmap,
+    find_blocks,
+    ink_mask,
+    segment_page
+)
+from core.utils.metrics import PAGE_BLOCKS
+
+
+def question(page, x, y, number, lines=4, width=40):
+    """Insert a numbered question with a few lines of working."""
+    page.insert_text((x, y), f"{number}. Solve the equations for x and y:", fontsize=11)
+    for i in range(lines):
+        page.insert_text((x + 10, y + 20 + i * 16), f"{i + 2}x + {number}y = {i * 7} and x - y = {i}"[:width], fontsize=11)
+
+
+def render(page):
+    return page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5), colorspace=fitz.csGRAY, alpha=False)
+
+
+def tops(blocks):
+    return [y0 for _, y0, _, _ in blocks]
+
+
+class TestFindBlocks:
+    """Test cases for finding question blocks."""
+
+    def test_questions_separated_by_whitespace(self, doc):
+        """Test each question becomes a block, top to bottom."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(3):
+            question(page, 50, 80 + i * 220, i + 1)
+
+        blocks = find_blocks(ink_mask(render(page)))
+
+        assert len(blocks) == 3
+        assert tops(blocks) == sorted(tops(blocks))
+
+    def test_line_spacing_does_not_split(self, doc):
+        """Test a page of evenly spaced lines stays one block."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(30):
+            page.insert_text((50, 60 + i * 18), f"{i}. x + {i} = {2 * i}", fontsize=11)
+
+        assert len(find_blocks(ink_mask(render(page)))) == 1
+
+    def test_label_goes_with_its_question(self, doc):
+        """Test a short label above a gap is kept with the question below it."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(2):
+            page.insert_text((50, 60 + i * 300), f"Q{i + 1}", fontsize=8)
+            question(page, 50, 120 + i * 300, i + 1)
+
+        blocks = find_blocks(ink_mask(render(page)))
+
+        assert len(blocks) == 2
+        assert blocks[0][1] < 60 * 1.5
+
+    def test_two_columns_under_a_header(self, doc):
+        """Test columns are read one after the other, below a full-width header."""
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 50), "Midterm exam - grade 5 mathematics - name: ______  class: ______", fontsize=12)
+        for column, x in enumerate((50, 320)):
+            for i in range(3):
+                question(page, x, 100 + i * 240, column * 3 + i + 1)
+
+        blocks = find_blocks(ink_mask(render(page)))
+
+        assert len(blocks) == 7
+        header, left, right = blocks[0], blocks[1:4], blocks[4:]
+        assert header[2] - header[0] > 0.5 * render(page).width
+        assert all(x1 < 320 * 1.5 for _, _, x1, _ in left)
+        assert all(x0 >= 320 * 1.5 for x0, _, _, _ in right)
+        assert tops(left) == sorted(tops(left))
+
+    def test_side_by_side_figures_are_not_columns(self, doc):
+        """Test a short row with a wide gap is not split into columns."""
+        page = doc.new_page(width=595, height=842)
+        question(page, 50, 80, 1)
+        page.draw_rect(fitz.Rect(60, 200, 220, 280), fill=(0, 0, 0))
+        page.draw_rect(fitz.Rect(340, 200, 500, 280), fill=(0, 0, 0))
+
+        blocks = find_blocks(ink_mask(render(page)), SegmentPolicy(block_gap_lines=100))
+
+        assert len(blocks) == 1
+
+    def test_blank_page(self):
+        """Test a page without ink has no blocks."""
+        assert find_blocks(np.zeros((100, 80), dtype=bool)) == []
+
+
+class TestSegmentPage:
+    """Test cases for cropping pages into blocks."""
+
+    def test_crops_in_reading_order(self, doc):
+        """Test each block is cropped, with its content and some padding."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(3):
+            question(page, 50, 80 + i * 220, i + 1)
+        pix = render(page)
+
+        crops = segment_page(pix, SegmentPolicy())
+
+        assert len(crops) == 3
+        assert all(crop.width < pix.width and crop.height < pix.height / 2 for crop in crops)
+        assert all(ink_mask(crop).any() for crop in crops)
+
+    def test_single_block_page_is_unchanged(self, doc):
+        """Test a page that does not split is returned as-is."""
+        page = doc.new_page(width=595, height=842)
+        question(page, 50, 80, 1)
+        pix = render(page)
+
+        assert segment_page(pix, SegmentPolicy()) == [pix]
+
+    def test_disabled(self, doc):
+        """Test segmentation can be turned off."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(3):
+            question(page, 50, 80 + i * 220, i + 1)
+        pix = render(page)
+
+        assert segment_page(pix, SegmentPolicy(enabled=False)) == [pix]
+
+    def test_crop_pixmap_keeps_colorspace(self, doc):
+        """Test crops are copies of the source pixels."""
+        page = doc.new_page(width=100, height=100)
+        page.draw_rect(fitz.Rect(10, 10, 30, 30), fill=(1, 0, 0))
+        pix = page.get_pixmap()
+
+        crop = crop_pixmap(pix, (10, 10, 30, 30))
+
+        assert (crop.width, crop.height, crop.n) == (20, 20, 3)
+        assert crop.pixel(5, 5) == (255, 0, 0)
+
+    def test_from_env(self, monkeypatch):
+        """Test the policy is read from the environment."""
+        monkeypatch.setenv("OCR_SEGMENT_PAGES", "false")
+        monkeypatch.setenv("OCR_SEGMENT_MAX_BLOCKS", "4")
+
+        policy = SegmentPolicy.from_env()
+
+        assert not policy.enabled
+        assert policy.max_blocks == 4
+
+
+class TestSegmentedRendering:
+    """Test cases for sending question blocks to OCR."""
+
+    def test_iter_file_pages_yields_blocks(self, exam_pdf):
+        """Test a segmented page yields one image per question."""
+        before = PAGE_BLOCKS.value()
+
+        images = list(iter_file_pages(exam_pdf, zoom=1.5, segments=SegmentPolicy()))
+
+        assert len(images) == 4
+        assert PAGE_BLOCKS.value() - before == 3
+
+    def test_process_file_matches_iterator(self, exam_pdf):
+        """Test the eager and lazy paths produce the same blocks."""
+        images, num_pages = process_file(exam_pdf, zoom=1.5, segments=SegmentPolicy())
+
+        assert num_pages == 2
+        assert images == list(iter_file_pages(exam_pdf, zoom=1.5, segments=SegmentPolicy()))
+
+    def test_blocks_of_skipped_pages_are_dropped(self, exam_pdf):
+        """Test a duplicate page contributes no blocks."""
+        doc = fitz.open(exam_pdf)
+        doc.insert_pdf(fitz.open(exam_pdf), from_page=0, to_page=0)
+        doc.saveIncr()
+        doc.close()
+        page_filter = PageFilter()
+
+        images, num_pages = process_file(exam_pdf, zoom=1.5, page_filter=page_filter, segments=SegmentPolicy())
+
+        assert (len(images), num_pages) == (4, 3)
+        assert page_filter.duplicate_pages == {3: 1}
+
+
+# Pytest fixtures
+@pytest.fixture
+def doc():
+    """An empty PDF document."""
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+@pytest.fixture
+def exam_pdf(tmp_path):
+    """A PDF with three questions on page 1 and one on page 2."""
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    for i in range(3):
+        question(page, 50, 80 + i * 220, i + 1)
+    question(document.new_page(width=595, height=842), 50, 80, 4)
+    path = str(tmp_path / "exam.pdf")
+    document.save(path)
+    document.close()
+    return path
@@ -1,17 +1,19 @@
 import asyncio
+import json
 import os
 import pytest
 from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from typing import List
 
-from src.server import (
+from servers.mcp import (
     server,
+    handle_call_tool,
     read_math_file_handler,
     InvalidArgumentError,
     ProcessingError
 )
-from src.services.file_processor import process_file, get_file_info
-from src.services.ocr_service import create_ocr_service
+from core.services.file_processor import process_file, get_file_info
+from core.services.ocr_service import create_ocr_service
 
 
 class TestReadMathFileHandler:
@@ -20,14 +22,14 @@ class TestReadMathFileHandler:
     @pytest.mark.asyncio
     async def test_read_math_file_handler_success(self, mock_file_path, mock_process_result):
         """Test successful file reading and processing."""
-        with patch('src.server.process_file', return_value=mock_process_result):
-            with patch('src.server.get_file_info', return_value={"file_size_mb": 1.5}):
-                with patch('src.server.create_ocr_service', return_value=AsyncMock()):
+        with patch('servers.mcp.process_file', return_value=mock_process_result):
+            with patch('servers.mcp.get_file_info', return_value={"file_size_mb": 1.5}):
+                with patch('servers.mcp.create_ocr_service', return_value=AsyncMock()):
                     # Mock OCR service
                     mock_ocr = AsyncMock()
                     mock_ocr.recognize_text = AsyncMock(return_value="## 测试数学题\n已知函数 $f(x) = x^2 + 2x + 1$")
                     
-                    with patch('src.server.create_ocr_service', return_value=mock_ocr):
+                    with patch('servers.mcp.create_ocr_service', return_value=mock_ocr):
                         result = await read_math_file_handler(mock_file_path)
                         
                         assert result["success"] is True
@@ -57,25 +59,25 @@ class TestReadMathFileHandler:
     @pytest.mark.asyncio
     async def test_read_math_file_handler_no_images_extracted(self, mock_file_path):
         """Test handler when no images can be extracted."""
-        with patch('src.server.process_file', return_value=([], 0)):
+        with patch('servers.mcp.process_file', return_value=([], 0)):
             with pytest.raises(ProcessingError, match="No images could be extracted"):
                 await read_math_file_handler(mock_file_path)
     
     @pytest.mark.asyncio
     async def test_read_math_file_handler_ocr_empty_result(self, mock_file_path):
         """Test handler when OCR returns empty result."""
-        with patch('src.server.process_file', return_value=([], 1)):
+        with patch('servers.mcp.process_file', return_value=([], 1)):
             mock_ocr = AsyncMock()
             mock_ocr.recognize_text = AsyncMock(return_value="")
             
-            with patch('src.server.create_ocr_service', return_value=mock_ocr):
+            with patch('servers.mcp.create_ocr_service', return_value=mock_ocr):
                 with pytest.raises(ProcessingError, match="OCR returned empty result"):
                     await read_math_file_handler(mock_file_path)
     
     @pytest.mark.asyncio
     async def test_read_math_file_handler_validation_error(self, mock_file_path):
         """Test handler propagates validation errors."""
-        with patch('src.server.process_file', side_effect=Exception("Processing failed")):
+        with patch('servers.mcp.process_file', side_effect=Exception("Processing failed")):
             with pytest.raises(ProcessingError, match="Failed to process file"):
                 await read_math_file_handler(mock_file_path)
 
@@ -104,7 +106,7 @@ class TestServer:
     @pytest.mark.asyncio
     async def test_call_tool_read_math_file_success(self, mock_file_path):
         """Test successful tool call."""
-        with patch('src.server.read_math_file_handler', return_value={
+        with patch('servers.mcp.read_math_file_handler', return_value={
             "success": True,
             "file_path": mock_file_path,
             "content": "## 测试数学题\n已知函数 $f(x) = x^2 + 2x + 1$"
@@ -130,7 +132,7 @@ class TestServer:
     @pytest.mark.asyncio
     async def test_call_tool_unknown_tool(self):
         """Test calling unknown tool."""
-        with patch('src.server.read_math_file_handler') as mock_handler:
+        with patch('servers.mcp.read_math_file_handler') as mock_handler:
             mock_handler.side_effect = Exception("Unknown tool")
             
             result = await server.call_tool("unknown_tool", {})
@@ -142,17 +144,45 @@ class TestServer:
     @pytest.mark.asyncio
     async def test_call_tool_invalid_argument_error(self, mock_file_path):
         """Test tool call with invalid argument error."""
-        with patch('src.server.read_math_file_handler', side_effect=InvalidArgumentError("Invalid path")):
+        with patch('servers.mcp.read_math_file_handler', side_effect=InvalidArgumentError("Invalid path")):
             result = await server.call_tool("read_math_file", {"file_path": mock_file_path})
             
             assert len(result) == 1
             assert "错误" in result[0].text
             assert "Invalid path" in result[0].text
     
+    @pytest.mark.asyncio
+    async def test_call_tool_read_math_file_reports_skipped_pages(self, mock_file_path):
+        """Test the tool reply carries the skipped page counts and the duplicate mapping."""
+        result = {
+            "success": True,
+            "file_path": mock_file_path,
+            "content": "## 第一题",
+            "pages_processed": 4,
+            "images_processed": 2,
+            "blank_pages_skipped": 1,
+            "duplicate_pages_skipped": 1,
+            "blank_pages": [3],
+            "duplicate_pages": {"4": 2}
+        }
+        with patch('servers.mcp.read_math_file_handler', AsyncMock(return_value=result)):
+            reply = await handle_call_tool("read_math_file", {"file_path": mock_file_path})
+        
+        assert len(reply) == 2
+        assert "## 第一题" in reply[0].text
+        assert json.loads(reply[1].text) == {
+            "pages_processed": 4,
+            "images_processed": 2,
+            "blank_pages_skipped": 1,
+            "duplicate_pages_skipped": 1,
+            "blank_pages": [3],
+            "duplicate_pages": {"4": 2}
+        }
+    
     @pytest.mark.asyncio
     async def test_call_tool_processing_error(self, mock_file_path):
         """Test tool call with processing error."""
-        with patch('src.server.read_math_file_handler', side_effect=ProcessingError("Processing failed")):
+        with patch('servers.mcp.read_math_file_handler', side_effect=ProcessingError("Processing failed")):
             result = await server.call_tool("read_math_file", {"file_path": mock_file_path})
             
             assert len(result) == 1
@@ -162,7 +192,7 @@ class TestServer:
     @pytest.mark.asyncio
     async def test_call_tool_unexpected_error(self, mock_file_path):
         """Test tool call with unexpected error."""
-        with patch('src.server.read_math_file_handler', side_effect=Exception("Unexpected error")):
+        with patch('servers.mcp.read_math_file_handler', side_effect=Exception("Unexpected error")):
             result = await server.call_tool("read_math_file", {"file_path": mock_file_path})
             
             assert len(result) == 1
@@ -193,7 +223,7 @@ class TestServerIntegration:
     async def test_server_error_handling(self, mock_file_path):
         """Test server error handling end-to-end."""
         # Test that errors are properly handled and returned to the user
-        with patch('src.server.read_math_file_handler', side_effect=InvalidArgumentError("Test error")):
+        with patch('servers.mcp.read_math_file_handler', side_effect=InvalidArgumentError("Test error")):
             result = await server.call_tool("read_math_file", {"file_path": mock_file_path})
             
             # Should return error message in Chinese
@@ -205,8 +235,8 @@ class TestServerIntegration:
     async def test_server_logging_configuration(self):
         """Test server logging configuration."""
         with patch.dict(os.environ, {"LOG_LEVEL": "DEBUG"}):
-            with patch('src.server.setup_logger') as mock_logger:
-                with patch('src.server.main', new_callable=AsyncMock) as mock_main:
+            with patch('servers.mcp.setup_logger') as mock_logger:
+                with patch('servers.mcp.main', new_callable=AsyncMock) as mock_main:
                     # This would test the logging setup in main()
                     # For now we just verify the logger is configured
                     pass
@@ -0,0 +1,180 @@
+import fitz
+import pytest
+
+from core.services.file_processor import iter_file_pages
+from core.services.page_encoder import PageImage
+from core.services.text_layer import (
+    MODE_MIXED,
+    MODE_OCR,
+    MODE_TEXT,
+    PageText,
+    TextLayerPolicy,
+    analyze_page,
+    is_bad_char,
+    layout_items
+)
+from core.utils.metrics import TEXT_LAYER_PAGES
+
+
+def write_question(page, y, number):
+    page.insert_text((50, y), f"{number}. A train travels 120 km in 2 hours.", fontsize=11)
+    page.insert_text((50, y + 16), "What is its average speed in km per hour?", fontsize=11)
+
+
+def write_formula(page, y):
+    """x squared (a superscript) and a fraction with its bar."""
+    page.insert_text((50, y), "3. Simplify x", fontsize=11)
+    page.insert_text((118, y - 5), "2", fontsize=7)
+    page.insert_text((300, y - 8), "a + b", fontsize=11)
+    page.draw_line((298, y - 4), (330, y - 4))
+    page.insert_text((308, y + 8), "c", fontsize=11)
+
+
+def texts(layout):
+    return [item.text for item in layout_items(layout) if isinstance(item, PageText)]
+
+
+def rects(layout):
+    return [item for item in layout_items(layout) if isinstance(item, fitz.Rect)]
+
+
+class TestAnalyzePage:
+    """Test cases for deciding what the text layer can provide."""
+
+    def test_plain_text_page(self, doc):
+        """Test a page of plain text is read entirely from the text layer."""
+        page = doc.new_page(width=595, height=842)
+        write_question(page, 80, 1)
+        write_question(page, 160, 2)
+
+        layout = analyze_page(page, TextLayerPolicy())
+
+        assert layout.mode == MODE_TEXT
+        assert rects(layout) == []
+        assert "1. A train travels 120 km in 2 hours." in texts(layout)[0]
+        assert "2. A train" in texts(layout)[0]
+
+    def test_formula_is_ocr_region(self, doc):
+        """Test a superscript and a fraction are sent to OCR, the rest is text."""
+        page = doc.new_page(width=595, height=842)
+        write_question(page, 80, 1)
+        write_formula(page, 200)
+        write_question(page, 320, 4)
+
+        layout = analyze_page(page, TextLayerPolicy())
+
+        assert layout.mode == MODE_MIXED
+        items = layout_items(layout)
+        assert [type(item) for item in items] == [PageText, fitz.Rect, PageText]
+        formula = items[1]
+        assert formula.contains(fitz.Rect(50, 185, 330, 210))
+        assert formula.y1 < 300
+        assert "1. A train" in items[0].text and "4. A train" in items[2].text
+
+    def test_math_font_is_unreliable(self, doc):
+        """Test text in a math font is OCR'd."""
+        page = doc.new_page(width=595, height=842)
+        write_question(page, 80, 1)
+        page.insert_text((50, 200), "abc", fontsize=11, fontname="symb")
+        write_question(page, 320, 2)
+
+        layout = analyze_page(page, TextLayerPolicy())
+
+        assert layout.mode == MODE_MIXED
+        assert len(rects(layout)) == 1
+
+    def test_bad_chars(self):
+        """Test unmapped glyphs are recognized."""
+        assert is_bad_char("�")
+        assert is_bad_char("")
+        assert not is_bad_char("x")
+        assert not is_bad_char("中")
+
+    def test_scan_is_ocr(self, doc):
+        """Test a page covered by an image is OCR'd whole, even with text."""
+        source = fitz.open()
+        write_question(source.new_page(width=595, height=842), 80, 1)
+        pix = source[0].get_pixmap()
+        source.close()
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, pixmap=pix)
+        page.insert_text((50, 80), "hidden OCR text", fontsize=11, render_mode=3)
+
+        assert analyze_page(page, TextLayerPolicy()).mode == MODE_OCR
+
+    def test_page_without_text_is_ocr(self, doc):
+        """Test a page with no text layer is OCR'd."""
+        page = doc.new_page(width=595, height=842)
+        page.draw_rect(fitz.Rect(50, 50, 200, 200), fill=(0, 0, 0))
+
+        assert analyze_page(page, TextLayerPolicy()).mode == MODE_OCR
+
+    def test_mostly_formulas_is_ocr(self, doc):
+        """Test a page whose OCR regions exceed max_ocr_area is OCR'd whole."""
+        page = doc.new_page(width=595, height=842)
+        for i in range(6):
+            write_formula(page, 80 + i * 60)
+        write_question(page, 500, 1)
+
+        assert analyze_page(page, TextLayerPolicy()).mode == MODE_OCR
+        assert analyze_page(page, TextLayerPolicy(max_ocr_area=1.0)).mode == MODE_MIXED
+
+    def test_from_env(self, monkeypatch):
+        """Test the policy is read from the environment."""
+        monkeypatch.setenv("OCR_TEXT_LAYER", "false")
+        monkeypatch.setenv("OCR_TEXT_LAYER_MAX_OCR_AREA", "0.3")
+
+        policy = TextLayerPolicy.from_env()
+
+        assert not policy.enabled
+        assert policy.max_ocr_area == 0.3
+
+
+class TestTextLayerRendering:
+    """Test cases for skipping OCR of born-digital pages."""
+
+    def test_iter_file_pages_yields_text(self, digital_pdf):
+        """Test text pages yield text and only formula regions are rendered."""
+        before = TEXT_LAYER_PAGES.value(mode=MODE_TEXT)
+
+        items = list(iter_file_pages(digital_pdf, zoom=1.5, text_layer=TextLayerPolicy()))
+
+        assert [type(item) for item in items] == [PageText, PageText, PageImage, PageText]
+        assert [item.page for item in items] == [1, 2, 2, 2]
+        assert TEXT_LAYER_PAGES.value(mode=MODE_TEXT) - before == 1
+
+    def test_default_is_ocr_only(self, digital_pdf):
+        """Test the text layer is not used unless asked for."""
+        items = list(iter_file_pages(digital_pdf, zoom=1.5))
+
+        assert all(isinstance(item, str) for item in items)
+
+    def test_disabled(self, digital_pdf):
+        """Test a disabled policy renders every page."""
+        items = list(iter_file_pages(digital_pdf, zoom=1.5, text_layer=TextLayerPolicy(enabled=False)))
+
+        assert all(isinstance(item, str) for item in items)
+
+
+# Pytest fixtures
+@pytest.fixture
+def doc():
+    """An empty PDF document."""
+    document = fitz.open()
+    yield document
+    document.close()
+
+
+@pytest.fixture
+def digital_pdf(tmp_path):
+    """A PDF with a plain text page and a page with a formula between questions."""
+    document = fitz.open()
+    write_question(document.new_page(width=595, height=842), 80, 1)
+    page = document.new_page(width=595, height=842)
+    write_question(page, 80, 2)
+    write_formula(page, 200)
+    write_question(page, 320, 4)
+    path = str(tmp_path / "digital.pdf")
+    document.save(path)
+    document.close()
+    return path
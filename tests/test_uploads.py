@@ -0,0 +1,173 @@
+import hashlib
+import os
+
+import pytest
+
+from core.utils import uploads
+from core.utils.uploads import MultipartFile, limit_stream, max_upload_bytes, save_stream
+from core.utils.validators import FileSizeExceededError, InvalidUploadError
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def multipart_body(content, filename="exam.pdf"):
+    """A multipart/form-data body with a text field before the file field."""
+    return (
+        b"--B\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+        + f'--B\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode("utf-8")
+        + b"Content-Type: application/pdf\r\n\r\n"
+        + content
+        + b"\r\n--B--\r\n"
+    )
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestSaveStream:
+    """Test cases for writing uploads to disk chunk by chunk."""
+
+    @pytest.mark.asyncio
+    async def test_writes_file_and_digest(self, tmp_path):
+        """Test the chunks are written in order with their SHA-256."""
+        path = str(tmp_path / "exam.pdf")
+
+        saved = await save_stream(stream(b"%PDF-", b"1.4 ", b"body"), path)
+
+        with open(path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 body"
+        assert saved.size == 13
+        assert saved.sha256 == hashlib.sha256(b"%PDF-1.4 body").hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_large_writes_are_batched(self, tmp_path, monkeypatch):
+        """Test chunks are gathered into writes of WRITE_SIZE bytes."""
+        monkeypatch.setattr(uploads, "WRITE_SIZE", 10)
+        path = str(tmp_path / "page.png")
+        chunks = [bytes([i]) * 4 for i in range(7)]
+
+        saved = await save_stream(stream(*chunks), path)
+
+        with open(path, "rb") as f:
+            assert f.read() == b"".join(chunks)
+        assert saved.sha256 == hashlib.sha256(b"".join(chunks)).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_size_limit_aborts_early(self, tmp_path):
+        """Test the stream stops being read once it exceeds the limit, leaving nothing behind."""
+        read = []
+
+        async def chunks():
+            for i in range(10):
+                read.append(i)
+                yield b"x" * 100
+
+        with pytest.raises(FileSizeExceededError):
+            await save_stream(chunks(), str(tmp_path / "big.pdf"), max_bytes=250)
+
+        assert read == [0, 1, 2]
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_leaves_nothing(self, tmp_path):
+        """Test a broken upload never appears under its final name."""
+        async def chunks():
+            yield b"partial"
+            raise ConnectionResetError("client went away")
+
+        with pytest.raises(ConnectionResetError):
+            await save_stream(chunks(), str(tmp_path / "exam.pdf"))
+
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_replaces_existing_file(self, tmp_path):
+        """Test the finished upload replaces a file of the same name."""
+        path = tmp_path / "exam.pdf"
+        path.write_bytes(b"old")
+
+        await save_stream(stream(b"new"), str(path))
+
+        assert path.read_bytes() == b"new"
+        assert os.listdir(tmp_path) == ["exam.pdf"]
+
+    def test_max_upload_bytes(self, monkeypatch):
+        """Test the limit is read from the environment, 10 MB by default."""
+        monkeypatch.delenv("OCR_MAX_UPLOAD_MB", raising=False)
+        assert max_upload_bytes() == 10 * 1024 * 1024
+
+        monkeypatch.setenv("OCR_MAX_UPLOAD_MB", "2.5")
+        assert max_upload_bytes() == int(2.5 * 1024 * 1024)
+
+
+class TestLimitStream:
+    """Test cases for capping a request body while it is read."""
+
+    @pytest.mark.asyncio
+    async def test_passes_chunks_within_limit(self):
+        """Test a body within the limit is passed through unchanged."""
+        chunks = [chunk async for chunk in limit_stream(stream(b"ab", b"cd"), max_bytes=4)]
+
+        assert chunks == [b"ab", b"cd"]
+
+    @pytest.mark.asyncio
+    async def test_stops_reading_past_limit(self):
+        """Test the body stops being read once it exceeds the limit."""
+        read = []
+
+        async def chunks():
+            for i in range(10):
+                read.append(i)
+                yield b"x" * 100
+
+        with pytest.raises(FileSizeExceededError):
+            async for _ in limit_stream(chunks(), max_bytes=250):
+                pass
+
+        assert read == [0, 1, 2]
+
+
+class TestMultipartFile:
+    """Test cases for streaming the file field out of a multipart body."""
+
+    CONTENT_TYPE = "multipart/form-data; boundary=B"
+
+    @pytest.mark.asyncio
+    async def test_file_streams_into_save_stream(self, tmp_path):
+        """Test the file's bytes go straight to save_stream, however the body is chunked."""
+        content = bytes(range(256)) * 40
+        upload = MultipartFile(stream(*split(multipart_body(content, "试卷.pdf"), 7)), self.CONTENT_TYPE)
+
+        assert await upload.open() == "试卷.pdf"
+        saved = await save_stream(upload.chunks(), str(tmp_path / "exam.pdf"))
+
+        assert (tmp_path / "exam.pdf").read_bytes() == content
+        assert saved.sha256 == hashlib.sha256(content).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_truncated_body_saves_nothing(self, tmp_path):
+        """Test a body that ends inside the file is rejected and leaves nothing behind."""
+        body = multipart_body(b"x" * 1000)[:-200]
+        upload = MultipartFile(stream(body), self.CONTENT_TYPE)
+
+        with pytest.raises(InvalidUploadError):
+            await save_stream(upload.chunks(), str(tmp_path / "exam.pdf"))
+
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_missing_file_field(self):
+        """Test a body without the file field is rejected."""
+        body = b"--B\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n--B--\r\n"
+
+        with pytest.raises(InvalidUploadError, match="Missing file field"):
+            await MultipartFile(stream(body), self.CONTENT_TYPE).open()
+
+    def test_missing_boundary(self):
+        """Test a multipart content type without a boundary is rejected."""
+        with pytest.raises(InvalidUploadError, match="boundary"):
+            MultipartFile(stream(b""), "multipart/form-data")
@@ -2,7 +2,7 @@ import os
 import tempfile
 import pytest
 
-from src.utils.validators import (
+from core.utils.validators import (
     validate_file_path,
     validate_file_type,
     validate_file_size,
@@ -8,16 +8,21 @@ import uuid
 import base64
 import asyncio
 import re
-import logging
+import json
+import time
+import atexit
+import math
+import random
 from pathlib import Path
-from typing import Optional, List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List
+from urllib.parse import unquote
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -30,46 +35,73 @@ PROJECT_ROOT = Path(__file__).parent
 SRC_DIR = PROJECT_ROOT / "src"
 sys.path.insert(0, str(SRC_DIR))
 
-from services.file_processor import process_file, pdf_to_image_files
-from services.ocr_service import create_ocr_service
+from core.services.blocking import close_blocking_executor, run_blocking
+from core.services.file_processor import aiter_file_pages, count_pages, pdf_to_image_files
+from core.services.jobs import JOB_SUCCEEDED, Job, JobNotFoundError, JobQueue, JobQueueFullError
+from core.services.ocr_service import create_ocr_service, close_ocr_service
+from core.services.ocr_cache import get_ocr_cache
+from core.services.page_filter import PageFilter
+from core.services.rasterizer import close_render_pool
+from core.services.rate_limiter import KeyedTokenBuckets, try_acquire_all
+from core.services.text_layer import TextLayerPolicy
+from core.utils.log_writer import BatchedLogWriter
+from core.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, IN_FLIGHT, REGISTRY, span
+from core.utils.uploads import MULTIPART_OVERHEAD, MultipartFile, limit_stream, max_upload_bytes, save_stream
+from core.utils.validators import FileSizeExceededError, InvalidUploadError
 
 # ============ 日志配置 ============
 
 LOG_DIR = PROJECT_ROOT / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-# 简单的文件日志函数
+# 日志写入：请求处理中只把日志行放入队列，由后台线程批量写入文件并同步输出到控制台，
+# 文件按大小轮转（LOG_FILE_MAX_MB、LOG_FILE_BACKUPS），队列满时丢弃并计数
+log_writer = BatchedLogWriter.from_env(str(LOG_DIR / "wrongmath.log"), echo=sys.stdout)
+atexit.register(log_writer.close)
+
+# 请求/响应调试日志的采样比例（0-1），高负载下避免每个请求都写日志
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "0.1"))
+
 def log_to_file(level: str, message: str, data: Optional[dict] = None):
-    """写入日志到文件"""
+    """写入日志（入队后立即返回，不阻塞事件循环）"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     log_line = f"[{timestamp}] [{level}] {message}"
     if data:
         log_line += f" | {data}"
-    log_line += "\n"
-    
-    log_file = LOG_DIR / "wrongmath.log"
-    try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_line)
-    except Exception:
-        pass  # 静默失败，避免日志写入失败影响主程序
+    log_writer.write(log_line)
 
 def log_info(message: str, data: Optional[dict] = None):
-    print(f"[INFO] {message}")
     log_to_file("INFO", message, data)
 
 def log_error(message: str, data: Optional[dict] = None):
-    print(f"[ERROR] {message}")
     log_to_file("ERROR", message, data)
 
 def log_debug(message: str, data: Optional[dict] = None):
-    print(f"[DEBUG] {message}")
     log_to_file("DEBUG", message, data)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时创建共享 OCR 客户端，关闭时释放连接池和渲染进程池"""
+    try:
+        await create_ocr_service()
+    except Exception as e:
+        # 未配置 API 密钥时仍允许启动，首次识别请求时再创建
+        log_error(f"OCR 服务初始化失败: {e}")
+    job_queue.start()
+    yield
+    await job_queue.close()
+    await close_ocr_service()
+    close_render_pool()
+    close_blocking_executor()
+    log_writer.flush()
+    frontend_log_writer.flush()
+
+
 app = FastAPI(
     title="WrongMath OCR API",
     description="数学题目 OCR 识别 Web API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS 配置
@@ -81,15 +113,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# HTTP 请求指标（按路由模板统计，避免文件名等路径参数导致标签爆炸）
+HTTP_REQUESTS = REGISTRY.counter(
+    "wrongmath_http_requests_total",
+    "HTTP requests handled by the web API",
+    ["method", "route", "status"]
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "wrongmath_http_request_duration_seconds",
+    "HTTP request handling time until response headers",
+    ["method", "route"]
+)
+
 # 添加请求日志中间件
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    log_debug(f"Request: {request.method} {request.url}", {
-        "headers": dict(request.headers),
-        "query_params": dict(request.query_params)
-    })
-    response = await call_next(request)
-    log_debug(f"Response: {response.status_code}")
+    # 按比例采样；只记录与排查相关的请求头，不写出 Cookie、Authorization 等全部头信息
+    sampled = random.random() < REQUEST_LOG_SAMPLE_RATE
+    if sampled:
+        log_debug(f"Request: {request.method} {request.url}", {
+            "content_type": request.headers.get("content-type"),
+            "content_length": request.headers.get("content-length"),
+            "user_agent": request.headers.get("user-agent"),
+            "query_params": dict(request.query_params)
+        })
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route_path)
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=str(status))
+    if sampled:
+        log_debug(f"Response: {status} ({time.perf_counter() - start:.3f}s)")
     return response
 
 # 上传文件存储目录
@@ -100,12 +159,20 @@ RESULTS_DIR = PROJECT_ROOT / "output"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# OCR 任务队列：工作协程数和排队上限按服务商限流配置
+# （OCR_JOB_WORKERS、OCR_JOB_QUEUE_SIZE、OCR_JOB_RETENTION_SECONDS）
+job_queue = JobQueue.from_env()
+
+# 上传文件大小上限（OCR_MAX_UPLOAD_MB，默认 10 MB）
+MAX_UPLOAD_BYTES = max_upload_bytes()
+
 # ============ 数据模型 ============
 
 class OCRRequest(BaseModel):
     """OCR 识别请求"""
     file_path: Optional[str] = None
-    zoom: float = 1.0
+    # PDF 渲染缩放倍数；不传则按每页内容自适应（小字号、密集公式放大，稀疏页面缩小）
+    zoom: Optional[float] = Field(default=None, gt=0, le=4)
     clean_numbers: bool = True
 
 class OCRResponse(BaseModel):
@@ -150,6 +217,22 @@ def clean_question_numbers(text: str) -> str:
     
     return result.strip()
 
+
+def save_ocr_result(file_path: str, content: str) -> Path:
+    """保存识别结果到 output 目录，返回输出路径"""
+    filename = Path(file_path).stem + ".md"
+    output_path = RESULTS_DIR / filename
+    
+    with span("save_result"), open(output_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    
+    return output_path
+
+
+def format_sse(event: str, data: dict) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 # ============ API 端点 ============
 
 @app.get("/")
@@ -170,42 +253,52 @@ async def upload_file(request: Request):
     支持两种方式：
     1. multipart/form-data (常规方式) - field name: file
     2. 原始二进制 + X-File-Name header (Safari 兼容)
+    
+    文件按块写入临时文件并同时计算 SHA-256，不在内存中保留整个文件；
+    multipart 请求边接收边解析，文件数据直接写入同一个临时文件。
+    超过大小上限时立即中止 (413)，写完后原子重命名为最终文件名。
+    没有 Content-Length 的分块请求在解析过程中检查大小。
     """
+    # 生成唯一文件名
+    file_id = str(uuid.uuid4())[:8]
+    
+    # 声明的长度已超过上限时不读取请求体
+    content_length = request.headers.get('Content-Length', '')
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        log_error(f"上传文件过大: {content_length} 字节")
+        raise HTTPException(status_code=413, detail=f"文件超过大小上限 ({MAX_UPLOAD_BYTES // 1024 // 1024} MB)")
+    
     try:
         content_type = request.headers.get('Content-Type', '')
         
-        # 生成唯一文件名
-        file_id = str(uuid.uuid4())[:8]
-        
-        # 从 header 获取文件名（Safari 上传方式）
+        # 从 header 获取文件名（Safari 上传方式，前端做了 URL 编码）
         header_filename = request.headers.get('X-File-Name')
         
-        # 读取原始 body
-        content = await request.body()
-        
-        # 检查是否是 multipart
         if 'multipart/form-data' in content_type and not header_filename:
-            # 使用临时解析 - 简化的方式
-            # 实际应该使用 UploadFile，但这里我们用 filename 参数
-            return {"message": "Use multipart with 'file' field"}
-        
-        if header_filename:
-            # Safari 原始二进制上传
-            original_name = header_filename
+            # multipart 边接收边解析，file 字段的数据直接交给 save_stream，不另行暂存；
+            # 分块传输 (chunked) 的请求没有 Content-Length，边读边检查大小，超过上限立即中止
+            upload = MultipartFile(
+                limit_stream(request.stream(), MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD),
+                content_type
+            )
+            original_name = await upload.open() or f'file_{file_id}'
+            chunks = upload.chunks()
         else:
-            # 没有文件名，尝试从 Content-Disposition 获取
-            content_disposition = request.headers.get('Content-Disposition', '')
-            if 'filename=' in content_disposition:
-                import re
+            if header_filename:
+                # Safari 原始二进制上传
+                original_name = unquote(header_filename)
+            else:
+                # 没有文件名，尝试从 Content-Disposition 获取
+                content_disposition = request.headers.get('Content-Disposition', '')
                 match = re.search(r'filename="?([^";\n]+)"?', content_disposition)
                 original_name = match.group(1) if match else f'file_{file_id}'
-            else:
-                original_name = f'file_{file_id}'
+            chunks = request.stream()
         
+        # 只保留文件名部分，防止目录穿越
+        original_name = Path(original_name.replace("\\", "/")).name or f'file_{file_id}'
         ext = Path(original_name).suffix.lower()
-        log_info(f"上传文件: {original_name}, 扩展名: {ext}, 大小: {len(content)} 字节")
         
-        # 验证文件类型
+        # 验证文件类型（在读取文件内容之前）
         if ext not in {".pdf", ".jpg", ".jpeg", ".png"}:
             log_error(f"不支持的文件格式: {ext}")
             raise HTTPException(status_code=400, detail=f"不支持的文件格式: {ext}")
@@ -213,20 +306,27 @@ async def upload_file(request: Request):
         # 保存文件
         filename = f"{file_id}_{original_name}"
         file_path = UPLOAD_DIR / filename
+        saved = await save_stream(chunks, str(file_path), MAX_UPLOAD_BYTES)
         
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        log_info(f"文件上传成功: {file_path}")
+        log_info(f"文件上传成功: {file_path}, 大小: {saved.size} 字节, SHA-256: {saved.sha256}")
         
         return {
             "success": True,
             "file_id": file_id,
             "filename": original_name,
             "file_path": str(file_path),
-            "file_size": len(content)
+            "file_size": saved.size,
+            "sha256": saved.sha256
         }
         
+    except FileSizeExceededError as e:
+        log_error(f"上传文件过大: {e}")
+        raise HTTPException(status_code=413, detail=f"文件超过大小上限 ({MAX_UPLOAD_BYTES // 1024 // 1024} MB)")
+    except InvalidUploadError as e:
+        log_error(f"上传请求无效: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(f"文件上传失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -239,6 +339,12 @@ async def recognize_file(request: OCRRequest):
     
     对上传的文件进行 OCR 识别，提取数学题目
     """
+    with IN_FLIGHT.track(operation="recognize"), span("recognize"):
+        return await _recognize_file(request)
+
+
+async def _recognize_file(request: OCRRequest, job: Optional[Job] = None):
+    """OCR 识别的实际处理流程（job 不为空时记录逐页进度）"""
     try:
         if not request.file_path or not os.path.exists(request.file_path):
             raise HTTPException(status_code=400, detail="文件不存在")
@@ -246,29 +352,35 @@ async def recognize_file(request: OCRRequest):
         file_path = request.file_path
         log_info(f"开始 OCR 识别: {file_path}")
         
-        # 处理文件（PDF 转图片，或直接使用图片）
-        base64_images, num_pages = process_file(file_path)
-        
-        if not base64_images:
+        num_pages = await run_blocking(count_pages, file_path)
+        if not num_pages:
             raise HTTPException(status_code=400, detail="无法提取图片")
         
-        # 调用 OCR 服务
+        # 边渲染边识别：第 1 页已在识别时，后面的页面仍在渲染
+        # 空白页和重复页不送 OCR；电子版 PDF 的文字直接从文字层读取
+        page_filter = PageFilter.from_env()
         ocr_service = await create_ocr_service()
-        recognized_text = await ocr_service.recognize_text(base64_images)
+        pages = aiter_file_pages(
+            file_path, zoom=request.zoom, page_filter=page_filter, text_layer=TextLayerPolicy.from_env()
+        )
+        progress = None
+        if job is not None:
+            pages = track_rendered(pages, job)
+            
+            def progress(count: int) -> None:
+                job.advance(recognized=count)
+        recognized_text = await ocr_service.recognize_page_stream(pages, progress=progress, total_pages=num_pages)
         
         if not recognized_text or not recognized_text.strip():
             raise HTTPException(status_code=500, detail="OCR 返回空结果")
         
         # 清洗题号（如果需要）
         if request.clean_numbers:
-            recognized_text = clean_question_numbers(recognized_text)
+            with span("clean_question_numbers"):
+                recognized_text = clean_question_numbers(recognized_text)
         
         # 保存结果到 output 目录
-        filename = Path(file_path).stem + ".md"
-        output_path = RESULTS_DIR / filename
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(recognized_text)
+        output_path = await run_blocking(save_ocr_result, file_path, recognized_text)
         
         log_info(f"OCR 完成: {num_pages} 页, {len(recognized_text)} 字符")
         
@@ -278,7 +390,8 @@ async def recognize_file(request: OCRRequest):
             "content": recognized_text,
             "pages_processed": num_pages,
             "characters": len(recognized_text),
-            "output_path": str(output_path)
+            "output_path": str(output_path),
+            **page_filter.stats()
         }
         
     except HTTPException:
@@ -288,6 +401,196 @@ async def recognize_file(request: OCRRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def track_rendered(pages: AsyncIterator, job: Job) -> AsyncIterator:
+    """记录任务已渲染的页面数（按所属页计数，题目分块不重复计数）"""
+    try:
+        async for page in pages:
+            if page.page > job.rendered:
+                job.advance(rendered=page.page - job.rendered)
+            yield page
+        # 末尾跳过的空白页和重复页也已处理
+        job.advance(rendered=job.pages - job.rendered)
+    finally:
+        await pages.aclose()
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: OCRRequest):
+    """
+    提交异步 OCR 任务
+    
+    立即返回任务 ID，识别在后台工作协程中进行；
+    通过 GET /api/jobs/{job_id} 查询进度，GET /api/jobs/{job_id}/result 获取结果。
+    队列已满时返回 503。
+    """
+    if not request.file_path or not os.path.exists(request.file_path):
+        raise HTTPException(status_code=400, detail="文件不存在")
+    
+    try:
+        num_pages = await run_blocking(count_pages, request.file_path)
+    except Exception as e:
+        log_error(f"无法读取文件: {e}")
+        raise HTTPException(status_code=400, detail=f"无法读取文件: {e}")
+    
+    async def run(job: Job) -> dict:
+        with IN_FLIGHT.track(operation="recognize_job"), span("recognize"):
+            try:
+                return await _recognize_file(request, job)
+            except HTTPException as e:
+                raise RuntimeError(e.detail)
+    
+    try:
+        job = job_queue.submit(run, pages=num_pages)
+    except JobQueueFullError as e:
+        log_error(f"任务队列已满: {e}")
+        raise HTTPException(status_code=503, detail="任务队列已满，请稍后重试", headers={"Retry-After": "5"})
+    
+    log_info(f"提交 OCR 任务: {job.id}, 文件: {request.file_path}")
+    return {
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+
+def get_job(job_id: str) -> Job:
+    try:
+        return job_queue.get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """查询任务状态和逐页进度"""
+    return get_job(job_id).to_dict()
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    获取任务结果
+    
+    任务未完成时返回 202 和当前状态；失败或已取消时返回 409。
+    """
+    job = get_job(job_id)
+    if not job.finished:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    if job.status != JOB_SUCCEEDED:
+        return JSONResponse(status_code=409, content=job.to_dict())
+    return job.result
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """取消排队中或运行中的任务"""
+    try:
+        job = job_queue.cancel(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    log_info(f"取消 OCR 任务: {job_id}")
+    return job.to_dict()
+
+
+@app.post("/api/recognize/stream")
+async def recognize_file_stream(request: OCRRequest):
+    """
+    流式 OCR 识别 (Server-Sent Events)
+    
+    页面边渲染边识别；第一批页面的识别结果逐字推送 (event: delta)，
+    其余页面并行识别，按页序完成后推送 (event: page)，最后推送完整结果 (event: done)。
+    出错时推送 event: error。
+    """
+    if not request.file_path or not os.path.exists(request.file_path):
+        raise HTTPException(status_code=400, detail="文件不存在")
+    
+    file_path = request.file_path
+    log_info(f"开始流式 OCR 识别: {file_path}")
+    
+    # 推送开始前的错误（如 API key 缺失或无效）与 /api/recognize 一样以 HTTP 错误返回
+    try:
+        num_pages = await run_blocking(count_pages, file_path)
+        if not num_pages:
+            raise HTTPException(status_code=400, detail="无法提取图片")
+        ocr_service = await create_ocr_service()
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"OCR 识别失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # 边渲染边识别：页面在共享线程池中逐页渲染，第 1 页识别时后面的页面仍在渲染
+    page_filter = PageFilter.from_env()
+    pages = aiter_file_pages(
+        file_path, zoom=request.zoom, page_filter=page_filter, text_layer=TextLayerPolicy.from_env()
+    )
+    
+    async def event_stream():
+        page_texts = []
+        IN_FLIGHT.inc(operation="recognize_stream")
+        try:
+            async for event in ocr_service.stream_pages(pages, total_pages=num_pages):
+                if event["type"] == "page":
+                    page_texts.append(event["text"])
+                yield format_sse(event["type"], event)
+            
+            recognized_text = "\n\n".join(page_texts)
+            if not recognized_text.strip():
+                yield format_sse("error", {"detail": "OCR 返回空结果"})
+                return
+            
+            if request.clean_numbers:
+                with span("clean_question_numbers"):
+                    recognized_text = clean_question_numbers(recognized_text)
+            
+            output_path = await run_blocking(save_ocr_result, file_path, recognized_text)
+            log_info(f"流式 OCR 完成: {num_pages} 页, {len(recognized_text)} 字符")
+            
+            yield format_sse("done", {
+                "success": True,
+                "file_path": file_path,
+                "content": recognized_text,
+                "pages_processed": num_pages,
+                "characters": len(recognized_text),
+                "output_path": str(output_path),
+                **page_filter.stats()
+            })
+        except Exception as e:
+            log_error(f"流式 OCR 识别失败: {e}")
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            # 客户端断开时停止渲染并关闭文件
+            await pages.aclose()
+            IN_FLIGHT.dec(operation="recognize_stream")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/cache")
+async def cache_stats():
+    """
+    OCR 结果缓存统计（命中/未命中次数、占用空间）
+    """
+    cache = get_ocr_cache()
+    return {
+        "success": True,
+        "enabled": cache is not None,
+        "stats": cache.stats() if cache is not None else None
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus 指标：各阶段耗时直方图、页数/发送字节/重试/缓存命中计数、进行中请求数
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post("/api/save")
 async def save_result(request: SaveRequest):
     """
@@ -303,8 +606,7 @@ async def save_result(request: SaveRequest):
         # 保存文件
         output_path = OUTPUT_DIR / request.filename
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(request.content)
+        await run_blocking(output_path.write_text, request.content, encoding="utf-8")
         
         log_info(f"结果已保存: {output_path}")
         
@@ -336,12 +638,8 @@ async def download_file(filename: str):
     )
 
 
-@app.get("/api/outputs")
-async def list_outputs():
-    """
-    列出所有输出文件
-    """
-    log_info("Listing outputs")
+def collect_outputs() -> List[dict]:
+    """读取 output 目录中的结果文件信息"""
     outputs = []
     for f in RESULTS_DIR.glob("*.md"):
         # 读取文件内容计算字符数
@@ -358,6 +656,16 @@ async def list_outputs():
             "time": datetime.fromtimestamp(f.stat().st_mtime).isoformat(),
             "characters": characters
         })
+    return outputs
+
+
+@app.get("/api/outputs")
+async def list_outputs():
+    """
+    列出所有输出文件
+    """
+    log_info("Listing outputs")
+    outputs = await run_blocking(collect_outputs)
     
     return {
         "success": True,
@@ -365,14 +673,19 @@ async def list_outputs():
     }
 
 
+def delete_uploads(file_id: str) -> None:
+    """删除某次上传的文件"""
+    for f in UPLOAD_DIR.glob(f"{file_id}_*"):
+        f.unlink()
+
+
 @app.delete("/api/upload/{file_id}")
 async def delete_uploaded_file(file_id: str):
     """
     删除上传的临时文件
     """
     try:
-        for f in UPLOAD_DIR.glob(f"{file_id}_*"):
-            f.unlink()
+        await run_blocking(delete_uploads, file_id)
         
         return {"success": True, "message": "文件已删除"}
         
@@ -390,32 +703,154 @@ class FrontendLogRequest(BaseModel):
     userAgent: Optional[str] = None
 
 
+# 前端日志：由后台线程批量写入 frontend.log；每个会话按令牌桶限流
+# （LOG_FRONTEND_RATE_PER_MINUTE 条/分钟，最多突发 LOG_FRONTEND_BURST 条）。
+# sessionId 由客户端提供，不断更换即可绕过会话限流，因此每个客户端地址另有一个令牌桶
+# （LOG_FRONTEND_CLIENT_RATE_PER_MINUTE、LOG_FRONTEND_CLIENT_BURST），两者都有余量才写入
+frontend_log_writer = BatchedLogWriter.from_env(str(LOG_DIR / "frontend.log"))
+atexit.register(frontend_log_writer.close)
+frontend_log_limits = KeyedTokenBuckets(
+    rate_per_minute=float(os.getenv("LOG_FRONTEND_RATE_PER_MINUTE", "120")),
+    capacity=float(os.getenv("LOG_FRONTEND_BURST", "60"))
+)
+frontend_log_client_limits = KeyedTokenBuckets(
+    rate_per_minute=float(os.getenv("LOG_FRONTEND_CLIENT_RATE_PER_MINUTE", "600")),
+    capacity=float(os.getenv("LOG_FRONTEND_CLIENT_BURST", "300"))
+)
+# 批量上报的请求体大小和记录条数上限
+MAX_LOG_BATCH_BYTES = 256 * 1024
+MAX_LOG_BATCH_RECORDS = 200
+
+FRONTEND_LOG_RECORDS = REGISTRY.counter(
+    "wrongmath_frontend_log_records_total",
+    "Frontend log records received, by outcome",
+    ["result"]
+)
+
+
+def format_frontend_log(record: FrontendLogRequest) -> str:
+    """格式化一条前端日志"""
+    log_line = (
+        f"[{record.timestamp}] [{record.level.upper()}] [frontend:{record.sessionId}] "
+        f"{record.message}"
+    )
+    if record.data:
+        log_line += f"\n  Data: {record.data}"
+    if record.userAgent:
+        log_line += f"\n  UserAgent: {record.userAgent[:100]}"
+    return log_line
+
+
+def client_address(request: Request) -> str:
+    """请求的客户端地址（未知时为 "unknown"）"""
+    return request.client.host if request.client else "unknown"
+
+
+def accept_frontend_logs(records: List[FrontendLogRequest], client: str) -> dict:
+    """
+    按会话和客户端地址限流后把前端日志放入写入队列（不阻塞事件循环）
+
+    Args:
+        records: 日志记录
+        client: 客户端地址
+
+    Returns:
+        dict: accepted（已写入队列）、rate_limited（被限流丢弃）、dropped（写入队列已满）
+            的条数，以及被限流时建议的重试等待秒数 retry_after
+    """
+    counts = {"accepted": 0, "rate_limited": 0, "dropped": 0}
+    retry_after = 0.0
+    for record in records:
+        delay = try_acquire_all(
+            frontend_log_client_limits.bucket(client),
+            frontend_log_limits.bucket(record.sessionId)
+        )
+        if delay > 0:
+            result = "rate_limited"
+            retry_after = max(retry_after, delay)
+        elif frontend_log_writer.write(format_frontend_log(record)):
+            result = "accepted"
+        else:
+            result = "dropped"
+        counts[result] += 1
+        FRONTEND_LOG_RECORDS.inc(result=result)
+    counts["retry_after"] = retry_after
+    return counts
+
+
+def rate_limited(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="日志上报过于频繁",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
 @app.post("/api/logs")
-async def receive_frontend_log(request: FrontendLogRequest):
+async def receive_frontend_log(request: FrontendLogRequest, http_request: Request):
+    """
+    接收单条前端日志（批量上报请使用 /api/logs/batch）
     """
-    接收前端日志并写入文件
+    counts = accept_frontend_logs([request], client_address(http_request))
+    if counts["rate_limited"]:
+        raise rate_limited(counts["retry_after"])
+    return {"success": True}
+
+
+@app.post("/api/logs/batch")
+async def receive_frontend_logs(request: Request):
     """
+    批量接收前端日志
+
+    请求体为日志记录的 JSON 数组，或 {"sessionId": ..., "userAgent": ..., "records": [...]}
+    （记录中缺少的 sessionId、userAgent 取外层的值）。不检查 Content-Type，
+    因此页面关闭时可以用 navigator.sendBeacon 以 text/plain 发送。
+    无效记录跳过；超出会话或客户端地址限流的记录丢弃，全部被限流时返回 429。
+    """
+    content_length = request.headers.get('Content-Length', '')
+    if content_length.isdigit() and int(content_length) > MAX_LOG_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"日志批量超过大小上限 ({MAX_LOG_BATCH_BYTES // 1024} KB)")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_LOG_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"日志批量超过大小上限 ({MAX_LOG_BATCH_BYTES // 1024} KB)")
+
     try:
-        log_line = (
-            f"[{request.timestamp}] [{request.level.upper()}] [frontend:{request.sessionId}] "
-            f"{request.message}"
-        )
-        if request.data:
-            log_line += f"\n  Data: {request.data}"
-        if request.userAgent:
-            log_line += f"\n  UserAgent: {request.userAgent[:100]}"
-        log_line += "\n"
-        
-        # 写入前端日志文件
-        frontend_log_file = LOG_DIR / "frontend.log"
-        with open(frontend_log_file, "a", encoding="utf-8") as f:
-            f.write(log_line)
-        
-        return {"success": True}
-        
-    except Exception as e:
-        log_error(f"Failed to write frontend log: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="请求体不是有效的 JSON")
+
+    defaults = {}
+    items = payload
+    if isinstance(payload, dict):
+        defaults = {key: payload[key] for key in ("sessionId", "userAgent") if key in payload}
+        items = payload.get("records")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="请求体应为日志记录数组")
+    if len(items) > MAX_LOG_BATCH_RECORDS:
+        raise HTTPException(status_code=413, detail=f"单次最多上报 {MAX_LOG_BATCH_RECORDS} 条日志")
+
+    records = []
+    invalid = 0
+    for item in items:
+        try:
+            records.append(FrontendLogRequest.model_validate({**defaults, **item} if isinstance(item, dict) else item))
+        except ValidationError:
+            invalid += 1
+    if invalid:
+        FRONTEND_LOG_RECORDS.inc(invalid, result="invalid")
+
+    counts = accept_frontend_logs(records, client_address(request))
+    if counts["rate_limited"] and not counts["accepted"] and not counts["dropped"]:
+        raise rate_limited(counts["retry_after"])
+    return {
+        "success": True,
+        "accepted": counts["accepted"],
+        "rate_limited": counts["rate_limited"],
+        "dropped": counts["dropped"],
+        "invalid": invalid
+    }
 
 
 @app.get("/api/logs")